@@ -3,13 +3,25 @@ Database Admin — FastAPI router for browsing/editing database.db.
 Mounts at /admin and provides both HTML pages and JSON API endpoints.
 """
 
-import math
+import json
+import logging
+import tempfile
+import threading
+import time
 from fastapi import APIRouter, HTTPException, Request, Query
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from sqlalchemy import inspect, text
 
+from admin_bulk import FORMATS, IMPORT_SPOOL_BYTES, BulkImportError, export_rows, export_stats, import_rows
+from admin_search import create_search_index, drop_search_index, fts_name, indexed_tables, is_index_table, match_query, search_join
 from admin_templates import render_dashboard, render_table_view, render_row_detail
 
+logger = logging.getLogger(__name__)
+
+# The dashboard and table pages recount a table in the background at most this often.
+ROW_COUNT_MAX_AGE = 30
+
 # Lazy import — engine is set by main.py
 _engine = None
 
@@ -18,6 +30,8 @@ def init(engine):
     """Called from main.py to inject the SQLAlchemy engine."""
     global _engine
     _engine = engine
+    # Schema versions of different databases can coincide.
+    _metadata.invalidate()
 
 
 router = APIRouter(prefix="/admin")
@@ -34,14 +48,194 @@ def _get_engine():
 
 def _get_table_info(table_name: str):
     """Return columns list and primary key column name for a table."""
-    eng = _get_engine()
-    insp = inspect(eng)
-    if table_name not in insp.get_table_names():
+    tables = _metadata.get(_get_engine())
+    if table_name not in tables:
         raise HTTPException(404, f"Table '{table_name}' not found")
-    columns = insp.get_columns(table_name)
-    pk_cols = insp.get_pk_constraint(table_name).get("constrained_columns", [])
-    pk_col = pk_cols[0] if pk_cols else None
-    return columns, pk_col
+    return tables[table_name]
+
+
+# ──────────────────────── Metadata Cache ─────────────────────────
+
+
+class _MetadataCache:
+    """Columns and primary key of every table, inspected once per schema.
+    Search index tables are left out and tracked in `indexed`.
+
+    SQLite bumps PRAGMA schema_version on every DDL statement from any
+    connection, so a changed version is the signal to inspect again."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.schema_version = None
+        self.tables: dict[str, tuple[list[dict], str | None]] = {}
+        self.indexed: set[str] = set()
+
+    def get(self, eng) -> dict[str, tuple[list[dict], str | None]]:
+        with eng.connect() as conn:
+            version = conn.execute(text("PRAGMA schema_version")).scalar()
+            with self.lock:
+                if version != self.schema_version:
+                    self._load(eng, conn, version)
+                return self.tables
+
+    def _load(self, eng, conn, version):
+        indexed = indexed_tables(conn)
+        insp = inspect(eng)
+        tables = {}
+        for name in insp.get_table_names():
+            if is_index_table(name, indexed):
+                continue
+            pk_cols = insp.get_pk_constraint(name).get("constrained_columns", [])
+            tables[name] = (insp.get_columns(name), pk_cols[0] if pk_cols else None)
+        self.tables = tables
+        self.indexed = indexed
+        self.schema_version = version
+        _row_counts.retain(tables)
+
+    def searchable(self, eng, table_name: str) -> bool:
+        self.get(eng)
+        return table_name in self.indexed
+
+    def invalidate(self):
+        with self.lock:
+            self.schema_version = None
+
+
+class _RowCounts:
+    """Row counts for the dashboard.
+
+    Exact counts are taken by a background thread and kept current by the
+    admin's own inserts and deletes. Tables without one yet show the
+    sqlite_stat1 estimate left by ANALYZE, if any."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.exact: dict[str, int] = {}
+        self.counted_at: dict[str, float] = {}
+        self.worker: threading.Thread | None = None
+
+    def snapshot(self, eng, names) -> dict[str, dict]:
+        with self.lock:
+            exact = dict(self.exact)
+        estimates = _stat1_estimates(eng) if any(n not in exact for n in names) else {}
+        return {
+            n: {"count": exact[n], "exact": True} if n in exact else {"count": estimates.get(n), "exact": False}
+            for n in names
+        }
+
+    @property
+    def refreshing(self) -> bool:
+        return self.worker is not None and self.worker.is_alive()
+
+    def refresh(self, eng, names, max_age: float = 0):
+        """Recounts, in the background, the tables not counted in the last
+        `max_age` seconds, unless a recount is already running."""
+        now = time.monotonic()
+        names = [n for n in names if now - self.counted_at.get(n, -max_age) >= max_age]
+        with self.lock:
+            if self.refreshing or not names:
+                return
+            self.worker = threading.Thread(target=self._count, args=(eng, list(names)), daemon=True)
+            self.worker.start()
+
+    def _count(self, eng, names):
+        with eng.connect() as conn:
+            for name in names:
+                try:
+                    self.set(name, conn.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar())
+                except Exception:
+                    logger.exception("Failed to count rows of table %s", name)
+
+    def set(self, name: str, count: int):
+        with self.lock:
+            self.exact[name] = count
+            self.counted_at[name] = time.monotonic()
+
+    def adjust(self, name: str, delta: int):
+        with self.lock:
+            if name in self.exact:
+                self.exact[name] += delta
+
+    def retain(self, names):
+        with self.lock:
+            self.exact = {n: c for n, c in self.exact.items() if n in names}
+            self.counted_at = {n: t for n, t in self.counted_at.items() if n in names}
+
+
+def _stat1_estimates(eng) -> dict[str, int]:
+    """Row estimates from sqlite_stat1; empty until ANALYZE has been run."""
+    try:
+        with eng.connect() as conn:
+            rows = conn.execute(text("SELECT tbl, stat FROM sqlite_stat1")).all()
+    except Exception:
+        return {}
+    estimates = {}
+    for tbl, stat in rows:
+        # The first number of each index's stat is the number of rows it covers.
+        estimates[tbl] = max(estimates.get(tbl, 0), int(stat.split()[0]))
+    return estimates
+
+
+_metadata = _MetadataCache()
+_row_counts = _RowCounts()
+
+
+# Column carrying each row's rowid, the tiebreaker of the keyset order.
+_ROWID = "__admin_rowid"
+
+
+def _keyset_condition(table_name: str, sort: str, ascending: bool, cursor: list) -> tuple[str, dict]:
+    """WHERE condition for the rows after `cursor` = [sort value, rowid] in
+    (sort column, rowid) order. SQLite sorts NULLs first."""
+    rid = f'"{table_name}".rowid'
+    op = ">" if ascending else "<"
+    params = {"k_id": cursor[1]}
+    if not sort:
+        return f"{rid} {op} :k_id", params
+    col = f'"{table_name}"."{sort}"'
+    if cursor[0] is None:
+        if ascending:
+            return f"(({col} IS NULL AND {rid} > :k_id) OR {col} IS NOT NULL)", params
+        return f"({col} IS NULL AND {rid} < :k_id)", params
+    params["k_val"] = cursor[0]
+    condition = f"{col} {op} :k_val OR ({col} = :k_val AND {rid} {op} :k_id)"
+    if not ascending:
+        condition += f" OR {col} IS NULL"
+    return f"({condition})", params
+
+
+class _PageRows:
+    """One page of rows, fetched when first iterated. Remembers the keyset
+    cursors of its first and last rows and whether more rows follow."""
+
+    def __init__(self, eng, sql: str, params: dict, per_page: int, sort: str, reverse: bool):
+        self.eng = eng
+        self.sql = sql
+        self.params = params
+        self.per_page = per_page
+        self.sort = sort
+        self.reverse = reverse
+        self.first = None
+        self.last = None
+        self.has_more = False
+
+    def _cursor(self, row) -> str:
+        return json.dumps([row[self.sort] if self.sort else None, row[_ROWID]], default=str)
+
+    def __iter__(self):
+        # One extra row tells whether another page follows.
+        with self.eng.connect() as conn:
+            rows = conn.execute(text(self.sql), {**self.params, "lim": self.per_page + 1}).mappings().all()
+        self.has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if self.reverse:
+            rows.reverse()
+        if rows:
+            self.first, self.last = self._cursor(rows[0]), self._cursor(rows[-1])
+        for row in rows:
+            row = dict(row)
+            del row[_ROWID]
+            yield row
 
 
 # ──────────────────────── HTML Page Routes ───────────────────────
@@ -49,19 +243,23 @@ def _get_table_info(table_name: str):
 
 @router.get("/", response_class=HTMLResponse)
 def admin_dashboard():
-    """Dashboard — list all tables with row counts."""
+    """Dashboard — list all tables with row counts.
+
+    Counts come from the row count cache; counts older than ROW_COUNT_MAX_AGE
+    are refreshed in the background and picked up by the page from
+    /admin/api/row-counts."""
     eng = _get_engine()
-    insp = inspect(eng)
+    metadata = _metadata.get(eng)
+    counts = _row_counts.snapshot(eng, metadata)
+    _row_counts.refresh(eng, metadata, max_age=ROW_COUNT_MAX_AGE)
     tables = []
-    with eng.connect() as conn:
-        for name in insp.get_table_names():
-            cols = insp.get_columns(name)
-            row_count = conn.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
-            tables.append({
-                "name": name,
-                "row_count": row_count,
-                "column_count": len(cols),
-            })
+    for name, (cols, _) in metadata.items():
+        tables.append({
+            "name": name,
+            "row_count": counts[name]["count"],
+            "exact": counts[name]["exact"],
+            "column_count": len(cols),
+        })
     return HTMLResponse(render_dashboard(tables))
 
 
@@ -73,51 +271,126 @@ def admin_table_view(
     search: str = Query(""),
     sort: str = Query(""),
     dir: str = Query("asc"),
+    after: str = Query(""),
+    before: str = Query(""),
+    last: bool = Query(False),
 ):
-    """Table view — paginated rows with search and sorting."""
+    """Table view — paginated rows with search and sorting, streamed as rendered.
+
+    Pages are addressed by the (sort column, rowid) key of the row before or
+    after them, so a deep page costs the same as the first. Full-text matches
+    in rank order and ?page= links without a cursor use OFFSET."""
     eng = _get_engine()
     columns, pk_col = _get_table_info(table_name)
     col_names = [c["name"] for c in columns]
-
-    with eng.connect() as conn:
-        # Build WHERE clause for search
-        where = ""
-        params = {}
-        if search:
-            conditions = []
-            for i, cn in enumerate(col_names):
-                param_key = f"s{i}"
-                conditions.append(f'CAST("{cn}" AS TEXT) LIKE :{param_key}')
-                params[param_key] = f"%{search}%"
-            where = "WHERE " + " OR ".join(conditions)
-
-        # Count
-        total_rows = conn.execute(
-            text(f'SELECT COUNT(*) FROM "{table_name}" {where}'), params
-        ).scalar()
-        total_pages = max(1, math.ceil(total_rows / per_page))
-        page = min(page, total_pages)
-
-        # Order
-        order = ""
-        if sort and sort in col_names:
-            direction = "DESC" if dir == "desc" else "ASC"
-            order = f'ORDER BY "{sort}" {direction}'
-
-        # Fetch rows
+    searchable = _metadata.searchable(eng, table_name)
+    fts_query = match_query(search) if search and searchable else None
+    sort = sort if sort in col_names else ""
+    ranked = bool(fts_query) and not sort
+
+    # Build WHERE clause for search
+    source = f'"{table_name}"'
+    conditions = []
+    params = {}
+    if fts_query:
+        # Indexed tables search their FTS5 shadow table, best matches first.
+        fts = fts_name(table_name)
+        with eng.connect() as conn:
+            source = f'"{table_name}" JOIN "{fts}" ON {search_join(conn, table_name)}'
+        conditions.append(f'"{fts}" MATCH :q')
+        params["q"] = fts_query
+    elif search:
+        likes = []
+        for i, cn in enumerate(col_names):
+            param_key = f"s{i}"
+            likes.append(f'CAST("{cn}" AS TEXT) LIKE :{param_key}')
+            params[param_key] = f"%{search}%"
+        conditions.append("(" + " OR ".join(likes) + ")")
+
+    # Count, only where it is cheap: the row count cache, or the FTS index.
+    # A LIKE search would have to scan the table, so it is shown without a
+    # total, as is a table not counted yet while the background recount runs.
+    if fts_query:
+        with eng.connect() as conn:
+            total_rows = conn.execute(
+                text(f'SELECT COUNT(*) FROM "{fts_name(table_name)}" WHERE "{fts_name(table_name)}" MATCH :q'),
+                {"q": fts_query},
+            ).scalar()
+    elif search:
+        total_rows = None
+    else:
+        cached = _row_counts.snapshot(eng, [table_name])[table_name]
+        total_rows = cached["count"] if cached["exact"] else None
+        _row_counts.refresh(eng, [table_name], max_age=ROW_COUNT_MAX_AGE)
+    total_pages = max(1, -(-total_rows // per_page)) if total_rows is not None else None
+
+    # Order and page position
+    rid = f'"{table_name}".rowid'
+    offset = 0
+    reverse = False
+    if ranked:
+        order = f'ORDER BY "{fts_name(table_name)}".rank'
         offset = (page - 1) * per_page
-        rows_raw = conn.execute(
-            text(f'SELECT * FROM "{table_name}" {where} {order} LIMIT :lim OFFSET :off'),
-            {**params, "lim": per_page, "off": offset},
-        ).mappings().all()
-        rows = [dict(r) for r in rows_raw]
+    else:
+        # Earlier pages and the last page are read backwards from their end.
+        reverse = bool(before) or last
+        scan_asc = (dir != "desc") != reverse
+        cursor = before or after
+        if cursor:
+            try:
+                key = json.loads(cursor)
+                condition, key_params = _keyset_condition(table_name, sort, scan_asc, key)
+            except (ValueError, TypeError, IndexError):
+                raise HTTPException(400, "Invalid page cursor")
+            conditions.append(condition)
+            params.update(key_params)
+        elif not last:
+            offset = (page - 1) * per_page
+        direction = "ASC" if scan_asc else "DESC"
+        order = f"ORDER BY {rid} {direction}"
+        if sort:
+            order = f'ORDER BY "{table_name}"."{sort}" {direction}, {rid} {direction}'
+    page_size = per_page
+    if last and total_pages is not None:
+        page = total_pages
+        if not ranked and total_rows:
+            # Only what the full pages before it leave over, so the rows line
+            # up with the page numbers and offsets of the other pages.
+            page_size = total_rows - (total_pages - 1) * per_page
+
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    rows = _PageRows(
+        eng,
+        f'SELECT {rid} AS {_ROWID}, "{table_name}".* FROM {source} {where} {order} LIMIT :lim OFFSET {offset}',
+        params, page_size, sort, reverse,
+    )
+
+    def pager() -> dict:
+        if ranked:
+            at_start, at_end = page == 1, not rows.has_more
+            return {
+                "first": None if at_start else {"page": 1},
+                "prev": None if at_start else {"page": page - 1},
+                "next": None if at_end else {"page": page + 1},
+                "last": None if at_end else {"page": total_pages},
+            }
+        if before or last:
+            at_start, at_end = not rows.has_more, last
+        else:
+            at_start, at_end = not after and page == 1, not rows.has_more
+        return {
+            "first": None if at_start else {"page": 1},
+            "prev": None if at_start or rows.first is None else {"before": rows.first, "page": max(1, page - 1)},
+            "next": None if at_end or rows.last is None else {"after": rows.last, "page": page + 1},
+            "last": None if at_end or total_pages is None else {"last": 1, "page": total_pages},
+        }
 
     col_dicts = [{"name": c["name"], "type": str(c["type"])} for c in columns]
     html = render_table_view(
-        table_name, col_dicts, rows, page, total_pages, total_rows, per_page,
-        search=search, sort_col=sort, sort_dir=dir, pk_col=pk_col,
+        table_name, col_dicts, rows, page, total_rows, per_page, pager,
+        search=search, sort_col=sort, sort_dir=dir, pk_col=pk_col, search_indexed=searchable,
     )
-    return HTMLResponse(html)
+    return StreamingResponse(html, media_type="text/html")
 
 
 @router.get("/table/{table_name}/new", response_class=HTMLResponse)
@@ -153,6 +426,103 @@ def admin_row_detail(table_name: str, row_id: str):
 # ──────────────────────── JSON API Routes ────────────────────────
 
 
+@router.get("/api/row-counts")
+def api_row_counts():
+    """Current row counts and whether a background recount is still running."""
+    eng = _get_engine()
+    return JSONResponse({
+        "counts": _row_counts.snapshot(eng, _metadata.get(eng)),
+        "refreshing": _row_counts.refreshing,
+    })
+
+
+
+@router.post("/api/table/{table_name}/search-index")
+def api_create_search_index(table_name: str):
+    """Build (or rebuild) the FTS5 search index of a table."""
+    eng = _get_engine()
+    _get_table_info(table_name)
+    try:
+        with eng.begin() as conn:
+            create_search_index(conn, table_name)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return JSONResponse({"message": "Search index built"})
+
+
+@router.delete("/api/table/{table_name}/search-index")
+def api_drop_search_index(table_name: str):
+    """Drop the search index of a table; search falls back to LIKE."""
+    eng = _get_engine()
+    _get_table_info(table_name)
+    with eng.begin() as conn:
+        drop_search_index(conn, table_name)
+    return JSONResponse({"message": "Search index dropped"})
+
+
+@router.post("/api/table/{table_name}/import")
+async def api_import_rows(
+    table_name: str,
+    request: Request,
+    format: str = Query("csv"),
+    mode: str = Query("insert"),
+):
+    """Bulk insert, or upsert on the primary key, the CSV or NDJSON request body."""
+    eng = _get_engine()
+    columns, pk_col = _get_table_info(table_name)
+    if format not in FORMATS:
+        raise HTTPException(400, f"Format must be one of: {', '.join(FORMATS)}")
+    if mode not in ("insert", "upsert"):
+        raise HTTPException(400, "Mode must be insert or upsert")
+    if mode == "upsert" and not pk_col:
+        raise HTTPException(400, "Table has no primary key")
+
+    upload = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    try:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        stats = await run_in_threadpool(
+            import_rows, eng, table_name, [c["name"] for c in columns], pk_col, upload, format, mode == "upsert",
+        )
+    except BulkImportError as e:
+        _row_counts.refresh(eng, [table_name])
+        return JSONResponse({"detail": f"Import stopped: {e}", **e.stats}, status_code=400)
+    finally:
+        upload.close()
+
+    if mode == "insert":
+        _row_counts.adjust(table_name, stats["rows"])
+    else:
+        _row_counts.refresh(eng, [table_name])
+    return JSONResponse({"message": f"Imported {stats['rows']} records", **stats})
+
+
+@router.get("/api/table/{table_name}/export")
+def api_export_rows(table_name: str, format: str = Query("csv")):
+    """Stream the whole table as CSV or NDJSON. Its throughput is reported by
+    /export/stats once the download has finished."""
+    eng = _get_engine()
+    columns, _ = _get_table_info(table_name)
+    if format not in FORMATS:
+        raise HTTPException(400, f"Format must be one of: {', '.join(FORMATS)}")
+    return StreamingResponse(
+        export_rows(eng, table_name, [c["name"] for c in columns], format),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{format}"'},
+    )
+
+
+@router.get("/api/table/{table_name}/export/stats")
+def api_export_stats(table_name: str):
+    """Rows, seconds and rows_per_second of the table's latest finished export."""
+    _get_table_info(table_name)
+    stats = export_stats(table_name)
+    if stats is None:
+        raise HTTPException(404, "No finished export of this table")
+    return JSONResponse(stats)
+
+
 @router.post("/api/table/{table_name}")
 async def api_create_row(table_name: str, request: Request):
     """Create a new record."""
@@ -178,6 +548,7 @@ async def api_create_row(table_name: str, request: Request):
     with eng.connect() as conn:
         conn.execute(text(f'INSERT INTO "{table_name}" ({cols_str}) VALUES ({vals_str})'), data)
         conn.commit()
+    _row_counts.adjust(table_name, 1)
 
     return JSONResponse({"message": "Record created"})
 
@@ -227,5 +598,6 @@ def api_delete_row(table_name: str, row_id: str):
         conn.commit()
         if result.rowcount == 0:
             raise HTTPException(404, "Record not found")
+    _row_counts.adjust(table_name, -1)
 
     return JSONResponse({"message": "Record deleted"})
@@ -0,0 +1,179 @@
+"""
+Bulk import and export of admin tables.
+
+Imports read a CSV or NDJSON upload and write it with executemany, one
+transaction per chunk of rows. Exports stream a table in rowid order, one
+short read per chunk, so neither side holds the whole table in memory.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+from typing import IO, Iterator
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_ROWS = int(os.getenv("DATANEXUS_ADMIN_IMPORT_CHUNK_ROWS", "1000"))
+EXPORT_CHUNK_ROWS = int(os.getenv("DATANEXUS_ADMIN_EXPORT_CHUNK_ROWS", "1000"))
+# Uploads larger than this are spooled to a temporary file while being read.
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+FORMATS = ("csv", "ndjson")
+
+# Throughput of the latest finished export of each table. The stream itself
+# carries only the table's rows, so clients read it from the stats endpoint.
+_export_stats: dict[str, dict] = {}
+_export_stats_lock = threading.Lock()
+
+
+class BulkImportError(Exception):
+    """An import stopped part way; the rows of earlier chunks are committed."""
+
+    def __init__(self, message: str, stats: dict):
+        super().__init__(message)
+        self.stats = stats
+
+
+def _read_rows(upload: IO[bytes], fmt: str) -> Iterator[dict]:
+    reader = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        # Empty cells are NULL, as in the admin forms.
+        for row in csv.DictReader(reader):
+            yield {k: (v if v != "" else None) for k, v in row.items() if k is not None}
+        return
+    for line_no, line in enumerate(reader, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Line {line_no} is not valid JSON")
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {line_no} is not a JSON object")
+        yield {k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in row.items()}
+
+
+def _statement(table_name: str, cols: tuple[str, ...], pk_col: str | None, upsert: bool):
+    cols_str = ", ".join(f'"{c}"' for c in cols)
+    vals_str = ", ".join(f":c{i}" for i in range(len(cols)))
+    sql = f'INSERT INTO "{table_name}" ({cols_str}) VALUES ({vals_str})'
+    if upsert:
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in cols if c != pk_col)
+        sql += f' ON CONFLICT("{pk_col}") DO ' + (f"UPDATE SET {updates}" if updates else "NOTHING")
+    return text(sql)
+
+
+def _write_chunk(eng, table_name: str, chunk: list[dict], pk_col: str | None, upsert: bool):
+    # NDJSON rows may carry different keys; rows with the same keys share one executemany.
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for row in chunk:
+        cols = tuple(row)
+        groups.setdefault(cols, []).append({f"c{i}": row[c] for i, c in enumerate(cols)})
+    with eng.begin() as conn:
+        for cols, params in groups.items():
+            conn.execute(_statement(table_name, cols, pk_col, upsert), params)
+
+
+def import_rows(eng, table_name: str, col_names: list[str], pk_col: str | None, upload: IO[bytes], fmt: str, upsert: bool) -> dict:
+    """Inserts (or upserts on the primary key) the rows of an upload in
+    chunks of IMPORT_CHUNK_ROWS, each in its own transaction. Unknown columns
+    are ignored. Returns row count, chunk count and throughput."""
+    if upsert and not pk_col:
+        raise ValueError("Upsert needs a table with a primary key")
+    valid = set(col_names)
+    stats = {"rows": 0, "chunks": 0}
+    started = time.perf_counter()
+
+    def finish() -> dict:
+        seconds = time.perf_counter() - started
+        return {**stats, "seconds": round(seconds, 3), "rows_per_second": round(stats["rows"] / seconds) if seconds else 0}
+
+    chunk = []
+    try:
+        for row in _read_rows(upload, fmt):
+            row = {k: v for k, v in row.items() if k in valid}
+            if not row:
+                continue
+            if upsert and row.get(pk_col) is None:
+                raise ValueError(f"Row {stats['rows'] + len(chunk) + 1} has no value for primary key '{pk_col}'")
+            chunk.append(row)
+            if len(chunk) == IMPORT_CHUNK_ROWS:
+                _write_chunk(eng, table_name, chunk, pk_col, upsert)
+                stats["rows"] += len(chunk)
+                stats["chunks"] += 1
+                chunk = []
+        if chunk:
+            _write_chunk(eng, table_name, chunk, pk_col, upsert)
+            stats["rows"] += len(chunk)
+            stats["chunks"] += 1
+    except Exception as e:
+        # Database errors report the driver's message without the statement.
+        raise BulkImportError(str(getattr(e, "orig", None) or e), finish()) from e
+
+    result = finish()
+    logger.info(
+        "Imported rows into %s | rows=%s chunks=%s rows_per_second=%s",
+        table_name, result["rows"], result["chunks"], result["rows_per_second"],
+    )
+    return result
+
+
+def export_rows(eng, table_name: str, col_names: list[str], fmt: str) -> Iterator[str]:
+    """Streams a table as CSV or NDJSON in rowid order. Each chunk is its own
+    short read keyed on the last rowid, so writers are never blocked for the
+    length of the download."""
+    started = time.perf_counter()
+    rows_out = 0
+    cols_str = ", ".join(f'"{c}"' for c in col_names)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(col_names)
+
+    last_rowid = None
+    while True:
+        where = "" if last_rowid is None else "WHERE rowid > :after"
+        with eng.connect() as conn:
+            rows = conn.execute(
+                text(f'SELECT rowid, {cols_str} FROM "{table_name}" {where} ORDER BY rowid LIMIT :lim'),
+                {"after": last_rowid, "lim": EXPORT_CHUNK_ROWS},
+            ).all()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+        rows_out += len(rows)
+        if fmt == "csv":
+            writer.writerows(row[1:] for row in rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(col_names, row[1:])), default=str) + "\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+    seconds = time.perf_counter() - started
+    stats = {
+        "format": fmt,
+        "rows": rows_out,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows_out / seconds) if seconds else 0,
+        "finished_at": time.time(),
+    }
+    with _export_stats_lock:
+        _export_stats[table_name] = stats
+    logger.info(
+        "Exported rows from %s | rows=%s seconds=%.2f rows_per_second=%s",
+        table_name, rows_out, seconds, stats["rows_per_second"],
+    )
+
+
+def export_stats(table_name: str) -> dict | None:
+    """Row count and throughput of the table's latest finished export, if any."""
+    with _export_stats_lock:
+        return _export_stats.get(table_name)
@@ -0,0 +1,134 @@
+"""
+FTS5 shadow indexes for the admin table search.
+
+An indexed table gets an FTS5 table named "<table>_fts" over its text
+columns, kept in sync by insert/update/delete triggers, so search is a MATCH
+on the index instead of a LIKE scan over every column.
+
+Index rows are keyed by the table's primary key, stored in UNINDEXED columns,
+not by rowid: VACUUM may renumber the rowids of a table without an INTEGER
+PRIMARY KEY, which would point an external-content index at the wrong rows.
+"""
+
+import logging
+import os
+import re
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Tables indexed on startup; others can be indexed from their admin page.
+FTS_TABLES = [t.strip() for t in os.getenv("DATANEXUS_ADMIN_FTS_TABLES", "chatsession").split(",") if t.strip()]
+FTS_SUFFIX = "_fts"
+
+
+def fts_name(table: str) -> str:
+    return f"{table}{FTS_SUFFIX}"
+
+
+def indexed_tables(conn) -> set[str]:
+    """Names of the tables that have a search index."""
+    names = conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%fts5%'"
+    )).scalars()
+    return {name[: -len(FTS_SUFFIX)] for name in names if name.endswith(FTS_SUFFIX)}
+
+
+def is_index_table(name: str, indexed: set[str]) -> bool:
+    """True for an FTS table or one of the shadow tables FTS5 creates for it."""
+    return any(name == fts_name(t) or name.startswith(fts_name(t) + "_") for t in indexed)
+
+
+def _columns(conn, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(text(f'PRAGMA table_info("{table}")'))]
+
+
+def _index_columns(conn, table: str) -> tuple[list[str], list[str]]:
+    """Primary key columns and the other text columns of a table."""
+    rows = conn.execute(text(f'PRAGMA table_info("{table}")')).all()
+    keys = [name for _, name, *_, pk in sorted(rows, key=lambda row: row[5]) if pk]
+    # Columns with TEXT affinity, by SQLite's rules for the declared type.
+    texts = [
+        name for _, name, declared, *_ in rows
+        if name not in keys and any(t in (declared or "").upper() for t in ("CHAR", "CLOB", "TEXT"))
+    ]
+    return keys, texts
+
+
+def search_join(conn, table: str) -> str:
+    """ON condition joining a table to its search index."""
+    keys, _ = _index_columns(conn, table)
+    fts = fts_name(table)
+    return " AND ".join(f'"{fts}"."{k}" = "{table}"."{k}"' for k in keys)
+
+
+def drop_search_index(conn, table: str):
+    fts = fts_name(table)
+    for action in ("insert", "update", "delete"):
+        conn.execute(text(f'DROP TRIGGER IF EXISTS "{fts}_{action}"'))
+    conn.execute(text(f'DROP TABLE IF EXISTS "{fts}"'))
+
+
+def create_search_index(conn, table: str):
+    """(Re)builds the search index of a table from its current columns."""
+    if not _columns(conn, table):
+        raise ValueError(f"Table '{table}' not found")
+    keys, texts = _index_columns(conn, table)
+    if not keys:
+        raise ValueError(f"Table '{table}' has no primary key")
+    if not texts:
+        raise ValueError(f"Table '{table}' has no text columns to index")
+    fts = fts_name(table)
+    columns = keys + texts
+    cols = ", ".join(f'"{c}"' for c in columns)
+    new_vals = ", ".join(f'new."{c}"' for c in columns)
+    old_key = " AND ".join(f'"{k}" = old."{k}"' for k in keys)
+
+    drop_search_index(conn, table)
+    definitions = [f'"{k}" UNINDEXED' for k in keys] + [f'"{c}"' for c in texts]
+    conn.execute(text(f'CREATE VIRTUAL TABLE "{fts}" USING fts5({", ".join(definitions)})'))
+    conn.execute(text(f'''
+        CREATE TRIGGER "{fts}_insert" AFTER INSERT ON "{table}" BEGIN
+            INSERT INTO "{fts}"({cols}) VALUES ({new_vals});
+        END'''))
+    conn.execute(text(f'''
+        CREATE TRIGGER "{fts}_delete" AFTER DELETE ON "{table}" BEGIN
+            DELETE FROM "{fts}" WHERE {old_key};
+        END'''))
+    # Only changes to indexed values touch the index, not e.g. timestamp
+    # updates. Removing a row's entry scans the key column of the index.
+    conn.execute(text(f'''
+        CREATE TRIGGER "{fts}_update" AFTER UPDATE OF {cols} ON "{table}" BEGIN
+            DELETE FROM "{fts}" WHERE {old_key};
+            INSERT INTO "{fts}"({cols}) VALUES ({new_vals});
+        END'''))
+    conn.execute(text(f'INSERT INTO "{fts}"({cols}) SELECT {cols} FROM "{table}"'))
+    logger.info("Built admin search index for table %s", table)
+
+
+def _is_current(conn, table: str) -> bool:
+    keys, texts = _index_columns(conn, table)
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": fts_name(table)}).scalar()
+    return _columns(conn, fts_name(table)) == keys + texts and "content=" not in sql
+
+
+def ensure_search_indexes(engine, tables: list[str] = FTS_TABLES):
+    """Creates the configured search indexes, rebuilding any whose table gained
+    or lost columns since it was built, or that was built keyed by rowid."""
+    with engine.begin() as conn:
+        indexed = indexed_tables(conn)
+        for table in tables:
+            if not _columns(conn, table):
+                continue
+            if table in indexed and _is_current(conn, table):
+                continue
+            create_search_index(conn, table)
+
+
+def match_query(search: str) -> str | None:
+    """FTS5 query for free text: every word must prefix a token of the row.
+    None when the text has no searchable words."""
+    words = re.findall(r"\w+", search)
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
@@ -3,9 +3,12 @@ HTML template rendering for the database admin UI.
 Dark-themed, modern design inspired by Django admin.
 """
 
+from typing import Callable, Iterable, Iterator
+from urllib.parse import urlencode
 
-def _base_html(title: str, body: str) -> str:
-    """Wrap body content in the base HTML shell with styles."""
+
+def _page_start(title: str) -> str:
+    """The base HTML shell with styles, up to where the body content goes."""
     return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -448,16 +451,25 @@ def _base_html(title: str, body: str) -> str:
         </div>
     </nav>
     <div class="container">
-        {body}
+        """
+
+
+_PAGE_END = """
     </div>
 </body>
 </html>"""
 
 
+def _base_html(title: str, body: str) -> str:
+    """Wrap body content in the base HTML shell with styles."""
+    return _page_start(title) + body + _PAGE_END
+
+
 def render_dashboard(tables: list[dict]) -> str:
     """
     Render the admin dashboard.
-    tables: list of {name, row_count, column_count}
+    tables: list of {name, row_count, exact, column_count}
+    row_count is an estimate when exact is false, or None when unknown.
     """
     if not tables:
         cards = """
@@ -468,12 +480,16 @@ def render_dashboard(tables: list[dict]) -> str:
     else:
         cards_html = ""
         for t in tables:
+            if t['row_count'] is None:
+                rows_label = "… rows"
+            else:
+                rows_label = f"{'' if t['exact'] else '~'}{t['row_count']} rows"
             cards_html += f"""
             <a href="/admin/table/{t['name']}" class="card">
                 <div class="card-icon">🗃️</div>
                 <div class="card-title">{t['name']}</div>
                 <div class="card-meta">
-                    <span class="badge badge-blue">{t['row_count']} rows</span>
+                    <span class="badge badge-blue" data-row-count="{t['name']}">{rows_label}</span>
                     <span class="badge badge-green">{t['column_count']} columns</span>
                 </div>
             </a>"""
@@ -485,24 +501,84 @@ def render_dashboard(tables: list[dict]) -> str:
         <p>Browse and manage your database tables</p>
     </div>
     {cards}
+
+    <script>
+        // Exact counts are computed in the background; show them once ready.
+        async function refreshRowCounts() {{
+            const res = await fetch('/admin/api/row-counts');
+            if (!res.ok) return;
+            const data = await res.json();
+            for (const [name, info] of Object.entries(data.counts)) {{
+                const badge = document.querySelector('[data-row-count="' + CSS.escape(name) + '"]');
+                if (badge && info.count !== null) badge.textContent = (info.exact ? '' : '~') + info.count + ' rows';
+            }}
+            if (data.refreshing) setTimeout(refreshRowCounts, 1000);
+        }}
+        setTimeout(refreshRowCounts, 300);
+    </script>
     """
     return _base_html("Dashboard", body)
 
 
+def _escape(val: str) -> str:
+    return val.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _render_row(row: dict, columns: list[dict], table_name: str, pk_col: str | None) -> str:
+    tds = ""
+    row_pk = ""
+    for col in columns:
+        val = row.get(col["name"], "")
+        if val is None:
+            val = '<span style="color:var(--text-muted)">NULL</span>'
+        else:
+            val = str(val)
+            if len(val) > 80:
+                val = val[:80] + "…"
+            val = _escape(val)
+        tds += f"<td>{val}</td>"
+        if col["name"] == pk_col:
+            row_pk = row.get(col["name"], "")
+    actions = ""
+    if pk_col and row_pk != "":
+        actions = f'''
+                <a href="/admin/table/{table_name}/{row_pk}" class="btn btn-secondary btn-sm">Edit</a>
+                <button onclick="deleteRow('{table_name}', '{row_pk}')" class="btn btn-danger btn-sm">Delete</button>'''
+    tds += f"<td style='white-space:nowrap'>{actions}</td>"
+    return f"<tr>{tds}</tr>"
+
+
 def render_table_view(
     table_name: str,
     columns: list[dict],
-    rows: list[dict],
+    rows: Iterable[dict],
     page: int,
-    total_pages: int,
-    total_rows: int,
+    total_rows: int | None,
     per_page: int,
+    pager: Callable[[], dict],
     search: str = "",
     sort_col: str = "",
     sort_dir: str = "asc",
     pk_col: str | None = None,
-) -> str:
-    """Render the table list view with pagination, search, and sorting."""
+    search_indexed: bool = False,
+) -> Iterator[str]:
+    """
+    Render the table list view with pagination, search, and sorting.
+    Yields the page in chunks, so the head goes out before the rows are
+    fetched and each row as soon as it is formatted.
+    total_rows is None when counting would cost a scan.
+    pager is called once the rows are consumed and returns the query params
+    of the first/prev/next/last links (None when there is no such page) and
+    the number of rows shown.
+    """
+    total_pages = max(1, -(-total_rows // per_page)) if total_rows is not None else None
+    base_params = {"per_page": per_page}
+    if search:
+        base_params["search"] = search
+    if sort_col:
+        base_params.update(sort=sort_col, dir=sort_dir)
+    safe_search = _escape(search).replace('"', "&quot;")
+
     # Table header
     ths = ""
     for col in columns:
@@ -514,50 +590,23 @@ def render_table_view(
         ths += f'<th onclick="sortBy(\'{col_name}\', \'{new_dir}\')">{col_name}{arrow}</th>'
     ths += "<th>Actions</th>"
 
-    # Table rows
-    trs = ""
-    if not rows:
-        trs = f'<tr><td colspan="{len(columns) + 1}" style="text-align:center; padding:2rem; color:var(--text-muted)">No records found</td></tr>'
+    if search_indexed:
+        search_index_toggle = f'''
+            <span class="badge badge-green">Full-text search</span>
+            <button onclick="setSearchIndex('{table_name}', 'DELETE')" class="btn btn-secondary btn-sm">Drop index</button>'''
     else:
-        for row in rows:
-            tds = ""
-            row_pk = ""
-            for col in columns:
-                val = row.get(col["name"], "")
-                if val is None:
-                    val = '<span style="color:var(--text-muted)">NULL</span>'
-                else:
-                    val = str(val)
-                    if len(val) > 80:
-                        val = val[:80] + "…"
-                    # Escape HTML
-                    val = val.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-                tds += f"<td>{val}</td>"
-                if col["name"] == pk_col:
-                    row_pk = row.get(col["name"], "")
-            actions = ""
-            if pk_col and row_pk != "":
-                actions = f'''
-                <a href="/admin/table/{table_name}/{row_pk}" class="btn btn-secondary btn-sm">Edit</a>
-                <button onclick="deleteRow('{table_name}', '{row_pk}')" class="btn btn-danger btn-sm">Delete</button>'''
-            tds += f"<td style='white-space:nowrap'>{actions}</td>"
-            trs += f"<tr>{tds}</tr>"
+        search_index_toggle = f'''
+            <button onclick="setSearchIndex('{table_name}', 'POST')" class="btn btn-secondary btn-sm">Build search index</button>'''
 
-    # Pagination
-    pagination_info = f"Showing {(page - 1) * per_page + 1}–{min(page * per_page, total_rows)} of {total_rows}"
-    page_btns = ""
-    for p in range(1, total_pages + 1):
-        if p == page:
-            page_btns += f'<span class="active">{p}</span>'
-        else:
-            url = f"/admin/table/{table_name}?page={p}&per_page={per_page}"
-            if search:
-                url += f"&search={search}"
-            if sort_col:
-                url += f"&sort={sort_col}&dir={sort_dir}"
-            page_btns += f'<a href="{url}">{p}</a>'
+    if total_rows is None:
+        records = "Matching records" if search else "Counting records…"
+        page_label = f"Page {page}"
+    else:
+        records = f"{total_rows} record{'s' if total_rows != 1 else ''}"
+        page_label = f"Page {page} of {total_pages}"
 
-    body = f"""
+    yield _page_start(table_name)
+    yield f"""
     <div class="breadcrumb">
         <a href="/admin/">Dashboard</a>
         <span>›</span>
@@ -566,24 +615,59 @@ def render_table_view(
     <div class="page-header" style="display:flex; justify-content:space-between; align-items:flex-start; flex-wrap:wrap; gap:1rem;">
         <div>
             <h1>{table_name}</h1>
-            <p>{total_rows} record{"s" if total_rows != 1 else ""} · {len(columns)} columns</p>
+            <p>{records} · {len(columns)} columns</p>
+        </div>
+        <div style="display:flex; gap:0.5rem; flex-wrap:wrap;">
+            <a href="/admin/api/table/{table_name}/export?format=csv" class="btn btn-secondary">Export CSV</a>
+            <a href="/admin/api/table/{table_name}/export?format=ndjson" class="btn btn-secondary">Export NDJSON</a>
+            <button onclick="document.getElementById('importInput').click()" class="btn btn-secondary">Import</button>
+            <input type="file" id="importInput" accept=".csv,.ndjson,.jsonl" style="display:none"
+                   onchange="importRows('{table_name}', this)">
+            <a href="/admin/table/{table_name}/new" class="btn btn-primary">+ Add Record</a>
         </div>
-        <a href="/admin/table/{table_name}/new" class="btn btn-primary">+ Add Record</a>
     </div>
 
     <div class="table-wrapper">
         <div class="table-toolbar">
             <div class="search-box">
                 <span>🔍</span>
-                <input type="text" id="searchInput" placeholder="Search records…" value="{search}"
+                <input type="text" id="searchInput" placeholder="Search records…" value="{safe_search}"
                        onkeydown="if(event.key==='Enter')doSearch()">
             </div>
-            <div style="font-size:0.8rem; color:var(--text-muted)">Page {page} of {total_pages}</div>
+            {search_index_toggle}
+            <div style="font-size:0.8rem; color:var(--text-muted)">{page_label}</div>
         </div>
         <div style="overflow-x:auto">
             <table>
                 <thead><tr>{ths}</tr></thead>
-                <tbody>{trs}</tbody>
+                <tbody>"""
+
+    # Table rows
+    shown = 0
+    for row in rows:
+        shown += 1
+        yield _render_row(row, columns, table_name, pk_col)
+    if not shown:
+        yield f'<tr><td colspan="{len(columns) + 1}" style="text-align:center; padding:2rem; color:var(--text-muted)">No records found</td></tr>'
+
+    # Pagination: a fixed set of links however large the table is.
+    links = pager()
+    start = (page - 1) * per_page + 1
+    if not shown:
+        pagination_info = "No records"
+    elif total_rows is None:
+        pagination_info = f"Showing {start}–{start + shown - 1}"
+    else:
+        pagination_info = f"Showing {start}–{start + shown - 1} of {total_rows}"
+    page_btns = ""
+    for key, label in (("first", "«"), ("prev", "‹"), (None, page), ("next", "›"), ("last", "»")):
+        if key is None:
+            page_btns += f'<span class="active">{label}</span>'
+        elif links.get(key) is not None:
+            url = f"/admin/table/{table_name}?{urlencode({**base_params, **links[key]})}"
+            page_btns += f'<a href="{url}">{label}</a>'
+
+    yield f"""</tbody>
             </table>
         </div>
         <div class="pagination">
@@ -597,13 +681,14 @@ def render_table_view(
             const url = new URL(window.location);
             url.searchParams.set('sort', col);
             url.searchParams.set('dir', dir);
+            for (const key of ['page', 'after', 'before', 'last']) url.searchParams.delete(key);
             window.location = url;
         }}
         function doSearch() {{
             const val = document.getElementById('searchInput').value;
             const url = new URL(window.location);
             url.searchParams.set('search', val);
-            url.searchParams.set('page', '1');
+            for (const key of ['page', 'after', 'before', 'last']) url.searchParams.delete(key);
             window.location = url;
         }}
         async function deleteRow(table, pk) {{
@@ -617,6 +702,36 @@ def render_table_view(
                 showToast(data.detail || 'Error deleting record', 'error');
             }}
         }}
+        async function importRows(table, input) {{
+            const file = input.files[0];
+            input.value = '';
+            if (!file) return;
+            const format = file.name.toLowerCase().endsWith('.csv') ? 'csv' : 'ndjson';
+            const mode = confirm('Update records whose primary key already exists?\n(Cancel to only insert new records.)') ? 'upsert' : 'insert';
+            showToast('Importing ' + file.name + '…', 'success');
+            const res = await fetch('/admin/api/table/' + table + '/import?format=' + format + '&mode=' + mode, {{
+                method: 'POST',
+                body: file,
+            }});
+            const data = await res.json();
+            const rate = data.rows_per_second !== undefined ? ' (' + data.rows_per_second + ' rows/s)' : '';
+            if (res.ok) {{
+                showToast(data.message + rate, 'success');
+                setTimeout(() => location.reload(), 1500);
+            }} else {{
+                showToast((data.detail || 'Error importing records') + rate, 'error');
+            }}
+        }}
+        async function setSearchIndex(table, method) {{
+            const res = await fetch('/admin/api/table/' + table + '/search-index', {{ method }});
+            const data = await res.json();
+            if (res.ok) {{
+                showToast(data.message, 'success');
+                setTimeout(() => location.reload(), 500);
+            }} else {{
+                showToast(data.detail || 'Error updating search index', 'error');
+            }}
+        }}
         function showToast(msg, type) {{
             const t = document.createElement('div');
             t.className = 'toast toast-' + type;
@@ -626,7 +741,7 @@ def render_table_view(
         }}
     </script>
     """
-    return _base_html(table_name, body)
+    yield _PAGE_END
 
 
 def render_row_detail(
@@ -0,0 +1,388 @@
+"""Offline benchmark for the agent graph.
+
+Compiles the real `workflow` from ai_agent.agent with scripted fake chat
+models in place of Ollama, runs question sets against a generated DuckDB
+dataset and reports per-node and end-to-end latency, checkpoint write volume
+and peak memory.
+
+Usage:
+    python agent_benchmark.py --rows 1000000 --iterations 3
+    python agent_benchmark.py --sets basic --eval-rate 200 --json results.json
+    python agent_benchmark.py --questions my_questions.json
+
+A questions file maps set names to {"same_thread": bool, "questions": [...]}.
+Each question has a "question", the "plan" the planner returns, the
+"queries" the SQL agent returns and optionally the analyst/synthesizer "text".
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Any, AsyncIterator
+
+import duckdb
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from ai_agent import checkpoints
+from ai_agent.agent import RECURSION_LIMIT, build_serializer, workflow
+from ai_agent.utils import nodes
+from ai_agent.utils.sampling import SAMPLE_CATALOG
+from ai_agent.utils.schemas import ExecutionPlan, GeneratedQueries
+from ai_agent.utils.tracing import RunTracer, aggregate_traces
+
+FULL_PLAN = ["sql_agent", "executor_tool", "analyst_agent", "synthesizer_node"]
+DEFAULT_TEXT = "Manhattan has the most trips, followed by Brooklyn and Queens, with fares broadly similar across boroughs."
+
+def _period(start: str, end: str) -> list[dict]:
+    return [
+        {"name": "start_date", "default": start, "type": "TIMESTAMP", "description": "Start of the period"},
+        {"name": "end_date", "default": end, "type": "TIMESTAMP", "description": "End of the period"},
+    ]
+
+QUESTION_SETS = {
+    "basic": {
+        "same_thread": False,
+        "questions": [
+            {
+                "question": "How many trips were there in January 2025?",
+                "plan": FULL_PLAN,
+                "queries": [{"sql_query": "SELECT count(*) AS trips FROM trips WHERE pickup_at BETWEEN $start_date AND $end_date", "sql_params": _period("2025-01-01", "2025-01-31 23:59:59")}],
+            },
+            {
+                "question": "What is the average fare by borough?",
+                "plan": FULL_PLAN,
+                "queries": [{"sql_query": "SELECT z.borough, avg(t.fare) AS avg_fare, count(*) AS trips FROM trips t JOIN zones z ON t.zone_id = z.zone_id GROUP BY z.borough ORDER BY trips DESC", "sql_params": []}],
+            },
+            {
+                "question": "Show daily revenue for February.",
+                "plan": FULL_PLAN,
+                "queries": [{"sql_query": "SELECT date_trunc('day', pickup_at) AS day, sum(fare) AS revenue FROM trips WHERE pickup_at BETWEEN $start_date AND $end_date GROUP BY day ORDER BY day", "sql_params": _period("2025-02-01", "2025-02-28 23:59:59")}],
+            },
+        ],
+    },
+    "parallel": {
+        "same_thread": False,
+        "questions": [
+            {
+                "question": "Compare revenue and trip counts by borough for January vs February.",
+                "plan": FULL_PLAN,
+                "queries": [
+                    {"sql_query": "SELECT z.borough, sum(t.fare) AS revenue, count(*) AS trips FROM trips t JOIN zones z ON t.zone_id = z.zone_id WHERE t.pickup_at BETWEEN $start_date AND $end_date GROUP BY z.borough", "sql_params": _period("2025-01-01", "2025-01-31 23:59:59")},
+                    {"sql_query": "SELECT z.borough, sum(t.fare) AS revenue, count(*) AS trips FROM trips t JOIN zones z ON t.zone_id = z.zone_id WHERE t.pickup_at BETWEEN $start_date AND $end_date GROUP BY z.borough", "sql_params": _period("2025-02-01", "2025-02-28 23:59:59")},
+                ],
+            },
+        ],
+    },
+    "repair": {
+        "same_thread": False,
+        "questions": [
+            {
+                "question": "Average distance by vendor?",
+                "plan": FULL_PLAN,
+                # Misspelled column, fixed by sql_validator without another LLM call.
+                "queries": [{"sql_query": "SELECT vendor_id, avg(distanse) AS avg_distance FROM trips GROUP BY vendor_id", "sql_params": []}],
+            },
+        ],
+    },
+    "follow_up": {
+        "same_thread": True,
+        "questions": [
+            {
+                "question": "What is the total revenue in January?",
+                "plan": FULL_PLAN,
+                "queries": [{"sql_query": "SELECT sum(fare) AS revenue FROM trips WHERE pickup_at BETWEEN $start_date AND $end_date", "sql_params": _period("2025-01-01", "2025-01-31 23:59:59")}],
+            },
+            {
+                "question": "Now split that by vendor.",
+                "plan": FULL_PLAN,
+                "queries": [{"sql_query": "SELECT vendor_id, sum(fare) AS revenue FROM trips WHERE pickup_at BETWEEN $start_date AND $end_date GROUP BY vendor_id ORDER BY vendor_id", "sql_params": _period("2025-01-01", "2025-01-31 23:59:59")}],
+            },
+            {
+                "question": "And by borough?",
+                "plan": FULL_PLAN,
+                "queries": [{"sql_query": "SELECT z.borough, sum(t.fare) AS revenue FROM trips t JOIN zones z ON t.zone_id = z.zone_id WHERE t.pickup_at BETWEEN $start_date AND $end_date GROUP BY z.borough", "sql_params": _period("2025-01-01", "2025-01-31 23:59:59")}],
+            },
+        ],
+    },
+}
+
+class Script:
+    """Canned outputs for the question being run, shared by all fake models."""
+
+    def __init__(self):
+        self.responses: dict[str, Any] = {"text": DEFAULT_TEXT}
+
+    def load(self, question: dict):
+        self.responses = {
+            "ExecutionPlan": {"plan": question.get("plan", FULL_PLAN)},
+            "GeneratedQueries": {"queries": question.get("queries", [])},
+            "text": question.get("text", DEFAULT_TEXT),
+        }
+
+class ScriptedChatModel(BaseChatModel):
+    """Fake chat model returning the script's canned output after a delay that
+    mimics Ollama: a fixed overhead, prompt evaluation and token generation."""
+
+    script: Any
+    latency_ms: float = 0.0
+    prompt_eval_rate: float = 2000.0
+    eval_rate: float = 50.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def with_structured_output(self, schema, **kwargs):
+        return self.bind(output_schema=schema.__name__) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
+
+    def _content(self, output_schema: str | None) -> str:
+        if output_schema is None:
+            return self.script.responses["text"]
+        return json.dumps(self.script.responses[output_schema])
+
+    def _metadata(self, messages: list[BaseMessage], content: str) -> dict:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        prompt_s = prompt_tokens / self.prompt_eval_rate
+        eval_s = completion_tokens / self.eval_rate
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "prompt_s": self.latency_ms / 1000 + prompt_s,
+            "eval_s": eval_s,
+            "response_metadata": {
+                "model": "scripted",
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_s * 1e9),
+                "eval_count": completion_tokens,
+                "eval_duration": int(eval_s * 1e9),
+                "load_duration": 0,
+                "total_duration": int((self.latency_ms / 1000 + prompt_s + eval_s) * 1e9),
+            },
+        }
+
+    def _usage(self, meta: dict) -> dict:
+        return {
+            "input_tokens": meta["prompt_tokens"],
+            "output_tokens": meta["completion_tokens"],
+            "total_tokens": meta["prompt_tokens"] + meta["completion_tokens"],
+        }
+
+    def _result(self, content: str, meta: dict) -> ChatResult:
+        message = AIMessage(content=content, usage_metadata=self._usage(meta), response_metadata=meta["response_metadata"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, output_schema: str | None = None, **kwargs) -> ChatResult:
+        content = self._content(output_schema)
+        meta = self._metadata(messages, content)
+        time.sleep(meta["prompt_s"] + meta["eval_s"])
+        return self._result(content, meta)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, output_schema: str | None = None, **kwargs) -> ChatResult:
+        content = self._content(output_schema)
+        meta = self._metadata(messages, content)
+        await asyncio.sleep(meta["prompt_s"] + meta["eval_s"])
+        return self._result(content, meta)
+
+    async def _astream(
+        self,
+        messages,
+        stop=None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        output_schema: str | None = None,
+        **kwargs,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        content = self._content(output_schema)
+        meta = self._metadata(messages, content)
+        await asyncio.sleep(meta["prompt_s"])
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        for piece in pieces:
+            await asyncio.sleep(meta["eval_s"] / len(pieces))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            usage_metadata=self._usage(meta),
+            response_metadata=meta["response_metadata"],
+        ))
+
+def install_fake_models(script: Script, latency_ms: float, prompt_eval_rate: float, eval_rate: float):
+    """Points the graph nodes at scripted models instead of Ollama."""
+    def make():
+        return ScriptedChatModel(script=script, latency_ms=latency_ms, prompt_eval_rate=prompt_eval_rate, eval_rate=eval_rate)
+    nodes.router_llm = make().with_structured_output(ExecutionPlan)
+    nodes.sql_generator_llm = make().with_structured_output(GeneratedQueries)
+    nodes.analyst_llm = make()
+    nodes.synthesizer_llm = make()
+
+def generate_dataset(path: str, rows: int) -> duckdb.DuckDBPyConnection:
+    """Taxi-like dataset with deterministic values so runs are comparable."""
+    conn = duckdb.connect(path)
+    conn.execute("""
+        CREATE TABLE zones AS
+        SELECT z AS zone_id, ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island'][z % 5 + 1] AS borough
+        FROM range(1, 266) t(z)
+    """)
+    conn.execute(f"""
+        CREATE TABLE trips AS
+        SELECT
+            i AS trip_id,
+            i % 3 + 1 AS vendor_id,
+            TIMESTAMP '2025-01-01' + to_seconds(i % (59 * 86400)) AS pickup_at,
+            hash(i) % 265 + 1 AS zone_id,
+            round((hash(i * 7) % 3000) / 100.0, 2) AS distance,
+            round(3 + (hash(i * 13) % 6000) / 100.0, 2) AS fare
+        FROM range({rows}) t(i)
+    """)
+    return conn
+
+def table_schema(conn: duckdb.DuckDBPyConnection) -> str:
+    schema_df = conn.execute("DESCRIBE;").df()
+    return schema_df[schema_df["database"] != SAMPLE_CATALOG].to_string()
+
+async def checkpoint_volume(saver: AsyncSqliteSaver) -> dict:
+    async with saver.conn.execute(
+        "SELECT count(*), COALESCE(sum(length(checkpoint) + length(metadata)), 0) FROM checkpoints"
+    ) as cur:
+        checkpoint_rows, checkpoint_bytes = await cur.fetchone()
+    async with saver.conn.execute("SELECT count(*), COALESCE(sum(length(value)), 0) FROM writes") as cur:
+        write_rows, write_bytes = await cur.fetchone()
+    return {"rows": checkpoint_rows + write_rows, "bytes": checkpoint_bytes + write_bytes}
+
+async def run_question(agent, conn, schema: str, thread_id: str, question: dict) -> dict:
+    config = {"configurable": {"thread_id": thread_id, "conn": conn, "table_schema": schema, "fast_mode": question.get("fast_mode", False)}}
+    tracer = RunTracer(thread_id)
+    async for event in agent.astream_events({"messages": [HumanMessage(content=question["question"])]}, config=config, version="v2"):
+        tracer.observe(event)
+    return tracer.finish()
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+async def run_set(agent, saver, conn, schema: str, name: str, question_set: dict, iterations: int, warmup: int) -> dict:
+    traces = []
+    write_bytes = []
+    write_rows = []
+    peak_heap = 0
+    for iteration in range(warmup + iterations):
+        for index, question in enumerate(question_set["questions"]):
+            thread_id = f"bench-{name}-{iteration}" if question_set.get("same_thread") else f"bench-{name}-{iteration}-{index}"
+            SCRIPT.load(question)
+            before = await checkpoint_volume(saver)
+            tracemalloc.reset_peak()
+            trace = await run_question(agent, conn, schema, thread_id, question)
+            peak_heap = max(peak_heap, tracemalloc.get_traced_memory()[1]) if iteration >= warmup else peak_heap
+            after = await checkpoint_volume(saver)
+            if iteration < warmup:
+                continue
+            traces.append(trace)
+            write_bytes.append(after["bytes"] - before["bytes"])
+            write_rows.append(after["rows"] - before["rows"])
+
+    stats = aggregate_traces(traces)
+    return {
+        "set": name,
+        "runs": len(traces),
+        "total_ms": stats["total_ms"],
+        "nodes": stats["nodes"],
+        "checkpoint_bytes_per_run": round(sum(write_bytes) / len(write_bytes)) if write_bytes else 0,
+        "checkpoint_rows_per_run": round(sum(write_rows) / len(write_rows), 1) if write_rows else 0,
+        "peak_python_heap_mb": round(peak_heap / (1024 * 1024), 1),
+    }
+
+def print_report(results: list[dict], checkpoint_file_mb: float):
+    for result in results:
+        total = result["total_ms"]
+        print(f"\n== {result['set']} ({result['runs']} runs)")
+        print(f"end-to-end ms   p50={total.get('p50')}  p90={total.get('p90')}  p99={total.get('p99')}")
+        print(f"checkpoints     {result['checkpoint_bytes_per_run']} bytes / {result['checkpoint_rows_per_run']} rows per run")
+        print(f"peak heap       {result['peak_python_heap_mb']} MB")
+        print(f"{'node':<18}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'tok/s p50':>12}{'retries':>9}")
+        for node, stats in result["nodes"].items():
+            wall = stats["wall_ms"]
+            print(f"{node:<18}{wall.get('p50', '-'):>10}{wall.get('p90', '-'):>10}{wall.get('p99', '-'):>10}{stats['tokens_per_sec'].get('p50', '-'):>12}{stats['retries']:>9}")
+    print(f"\ncheckpoint file {checkpoint_file_mb} MB, peak RSS {_peak_rss_mb()} MB")
+
+SCRIPT = Script()
+
+async def run_benchmark(args) -> list[dict]:
+    question_sets = QUESTION_SETS
+    if args.questions:
+        with open(args.questions) as f:
+            question_sets = json.load(f)
+    selected = args.sets.split(",") if args.sets else list(question_sets)
+
+    install_fake_models(SCRIPT, args.latency_ms, args.prompt_eval_rate, args.eval_rate)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="datanexus-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    checkpoint_path = os.path.join(workdir, "agent_checkpoint.db")
+
+    started = time.perf_counter()
+    conn = generate_dataset(os.path.join(workdir, "bench.duckdb"), args.rows)
+    print(f"generated {args.rows} rows in {time.perf_counter() - started:.1f}s | workdir={workdir}")
+    schema = table_schema(conn)
+
+    db_conn = await checkpoints.connect(checkpoint_path)
+    saver = AsyncSqliteSaver(db_conn, serde=build_serializer())
+    await saver.setup()
+    agent = workflow.compile(checkpointer=saver).with_config({"recursion_limit": RECURSION_LIMIT})
+
+    tracemalloc.start()
+    try:
+        results = []
+        for name in selected:
+            results.append(await run_set(agent, saver, conn, schema, name, question_sets[name], args.iterations, args.warmup))
+    finally:
+        tracemalloc.stop()
+        await db_conn.close()
+        conn.close()
+
+    checkpoint_file_mb = round(sum(
+        os.path.getsize(checkpoint_path + suffix)
+        for suffix in ("", "-wal")
+        if os.path.exists(checkpoint_path + suffix)
+    ) / (1024 * 1024), 2)
+    print_report(results, checkpoint_file_mb)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results, "checkpoint_file_mb": checkpoint_file_mb, "peak_rss_mb": _peak_rss_mb()}, f, indent=2)
+    if not args.workdir and not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline agent benchmark with scripted fake LLMs")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the generated trips table")
+    parser.add_argument("--iterations", type=int, default=3, help="Measured runs of each question set")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs before the measured ones")
+    parser.add_argument("--sets", help="Comma-separated question sets to run (default: all)")
+    parser.add_argument("--questions", help="JSON file with question sets replacing the built-in ones")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed overhead per LLM call")
+    parser.add_argument("--prompt-eval-rate", type=float, default=2000.0, help="Simulated prompt tokens per second")
+    parser.add_argument("--eval-rate", type=float, default=50.0, help="Simulated generated tokens per second")
+    parser.add_argument("--workdir", help="Directory for the dataset and checkpoint DB (kept)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary workdir")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args))
+
+if __name__ == "__main__":
+    main()
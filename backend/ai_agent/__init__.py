@@ -1 +1,68 @@
-from ai_agent.agent import init_agent, get_agent, close_agent
\ No newline at end of file
+"""
+The agent stack (LangGraph, LangChain, the Ollama clients) takes most of the
+backend's import time, so it is loaded on first use rather than when this
+package is imported. `start_loading()` imports and initialises it in a worker
+thread while the API serves everything else; agent endpoints `await ready()`.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_AGENT_EXPORTS = {"init_agent", "get_agent", "close_agent", "get_thread_history", "sync_thread_history", "prune_thread", "delete_thread"}
+
+_load_task: asyncio.Task | None = None
+state = "idle"
+
+def __getattr__(name):
+    if name in _AGENT_EXPORTS:
+        return getattr(importlib.import_module("ai_agent.agent"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def _load():
+    global state
+    state = "loading"
+    started = time.perf_counter()
+    try:
+        agent_module = await asyncio.to_thread(importlib.import_module, "ai_agent.agent")
+        await agent_module.init_agent()
+    except asyncio.CancelledError:
+        state = "idle"
+        raise
+    except Exception:
+        state = "failed"
+        logger.exception("ai_agent: failed to load the agent")
+        raise
+    state = "ready"
+    logger.info("ai_agent: agent loaded | elapsed_ms=%.0f", (time.perf_counter() - started) * 1000)
+
+def start_loading() -> asyncio.Task:
+    """Starts loading the agent in the background, once per process (again after a failure)."""
+    global _load_task
+    if _load_task is None or (_load_task.done() and state != "ready"):
+        _load_task = asyncio.create_task(_load())
+    return _load_task
+
+async def ready():
+    """Waits for the agent to be loaded, starting the load if needed. A
+    cancelled caller doesn't cancel the load for everyone else."""
+    await asyncio.shield(start_loading())
+
+async def close():
+    """Stops a load still in progress, or closes the loaded agent."""
+    global _load_task, state
+    if _load_task is None:
+        return
+    if not _load_task.done():
+        _load_task.cancel()
+        try:
+            await _load_task
+        except BaseException:
+            pass
+    elif state == "ready":
+        await importlib.import_module("ai_agent.agent").close_agent()
+    _load_task = None
+    state = "idle"
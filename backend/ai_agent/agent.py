@@ -1,31 +1,43 @@
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
-from ai_agent.utils import AppState, router_node, planner_node, sql_agent, executor_tool, analyst_node, synthesizer_node
-import aiosqlite
+from ai_agent.utils import AppState, router_node, planner_node, sql_agent, sql_validator, executor_tool, analyst_node, synthesizer_node, full_results_node, memory_node
+from ai_agent import checkpoints
+import asyncio
 
 workflow = StateGraph(AppState)
 workflow.add_node("router", router_node)
 workflow.add_node("planner", planner_node)
 workflow.add_node("sql_agent", sql_agent)
+workflow.add_node("sql_validator", sql_validator)
 workflow.add_node("executor_tool", executor_tool)
 workflow.add_node("analyst_agent", analyst_node)
 workflow.add_node("synthesizer_node", synthesizer_node)
+workflow.add_node("full_results", full_results_node)
+workflow.add_node("memory", memory_node)
 
 workflow.set_entry_point("planner")
 
 workflow.add_conditional_edges("planner", router_node)
-workflow.add_conditional_edges("sql_agent", router_node)
+workflow.add_edge("sql_agent", "sql_validator")
+workflow.add_conditional_edges("sql_validator", router_node)
 workflow.add_conditional_edges("executor_tool", router_node)
 workflow.add_conditional_edges("analyst_agent", router_node)
 workflow.add_conditional_edges("synthesizer_node", router_node)
+workflow.add_conditional_edges("full_results", router_node)
+workflow.add_edge("memory", END)
+
+# A full turn is up to eight steps (including full_results and memory); this
+# leaves room for one SQL regeneration after a failed validation or execution.
+RECURSION_LIMIT = 12
 
 agent = None
 db_conn = None
+checkpoint_saver = None
+maintenance_task = None
 
-async def init_agent():
-    global agent, db_conn
-    db_conn = await aiosqlite.connect("agent_checkpoint.db")
+def build_serializer() -> JsonPlusSerializer:
+    """Checkpoint serializer that can load the agent's own message and schema types."""
     serializer = JsonPlusSerializer()
     if isinstance(serializer._allowed_msgpack_modules, bool):
         serializer._allowed_msgpack_modules = set()
@@ -33,17 +45,70 @@ async def init_agent():
         ("ai_agent.utils.messages", "CanvasMessage"),
         ("ai_agent.utils.schemas", "SQLVariable"),
         ("ai_agent.utils.schemas", "GeneratedQuery"),
+        ("ai_agent.utils.schemas", "GeneratedQueries"),
     ])
-    checkpoint_saver = AsyncSqliteSaver(db_conn, serde=serializer)
-    agent = workflow.compile(checkpointer=checkpoint_saver).with_config({"recursion_limit": 5})
+    return serializer
+
+async def init_agent():
+    global agent, db_conn, checkpoint_saver, maintenance_task
+    db_conn = await checkpoints.connect()
+    checkpoint_saver = AsyncSqliteSaver(db_conn, serde=build_serializer())
+    agent = workflow.compile(checkpointer=checkpoint_saver).with_config({"recursion_limit": RECURSION_LIMIT})
+    maintenance_task = asyncio.create_task(checkpoints.run_maintenance(checkpoint_saver))
 
 async def close_agent():
-    global db_conn
+    global db_conn, checkpoint_saver, maintenance_task
+    if maintenance_task:
+        maintenance_task.cancel()
+        try:
+            await maintenance_task
+        except asyncio.CancelledError:
+            pass
+        maintenance_task = None
     if db_conn:
         await db_conn.close()
         db_conn = None
+        checkpoint_saver = None
 
 def get_agent():
     if agent is None:
         raise RuntimeError("Agent not initialized. Call init_agent() first.")
     return agent
+
+def get_checkpointer():
+    if checkpoint_saver is None:
+        raise RuntimeError("Agent not initialized. Call init_agent() first.")
+    return checkpoint_saver
+
+def history_entry(m) -> dict | None:
+    """The chat history entry the client shows for a message, if any."""
+    from langchain_core.messages import HumanMessage, AIMessage
+    from ai_agent.utils.messages import CanvasMessage
+    if isinstance(m, HumanMessage):
+        content = m.content if isinstance(m.content, str) else str(m.content)
+        return {"role": "user", "content": content}
+    elif isinstance(m, AIMessage):
+        content = m.content if isinstance(m.content, str) else ""
+        if content:
+            return {"role": "assistant", "content": content}
+    elif isinstance(m, CanvasMessage):
+        return {"role": "canvas", "sql_query": m.sql_data.sql_query, "sql_params": [var.model_dump_json() for var in m.sql_data.sql_params]}
+    return None
+
+async def sync_thread_history(thread_id: str) -> int:
+    """Copies a finished turn's messages into the paged history table."""
+    return await checkpoints.sync_messages(get_checkpointer(), thread_id, history_entry)
+
+async def get_thread_history(thread_id: str, limit: int, before: int | None = None) -> tuple[list[dict], int | None]:
+    """Reads one page of a thread's history. Threads with turns not yet in
+    the history table (older chats, or a stream that was dropped before the
+    turn was copied) are caught up first."""
+    if before is None:
+        await sync_thread_history(thread_id)
+    return await checkpoints.read_messages(get_checkpointer(), thread_id, limit, before)
+
+async def prune_thread(thread_id: str):
+    await checkpoints.prune_thread(get_checkpointer(), thread_id)
+
+async def delete_thread(thread_id: str):
+    await checkpoints.delete_thread(get_checkpointer(), thread_id)
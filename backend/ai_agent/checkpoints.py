@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Callable
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DB_PATH = "agent_checkpoint.db"
+# Number of checkpoints kept per thread; only the newest one is needed to
+# resume a chat, the rest are kept for debugging recent runs.
+CHECKPOINT_KEEP_LATEST = int(os.getenv("DATANEXUS_CHECKPOINT_KEEP_LATEST", "10"))
+CHECKPOINT_MAINTENANCE_INTERVAL = float(os.getenv("DATANEXUS_CHECKPOINT_MAINTENANCE_INTERVAL", "600"))
+
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA journal_size_limit=67108864",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+]
+
+PRUNE_CHECKPOINTS_SQL = """
+    DELETE FROM checkpoints WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid, ROW_NUMBER() OVER (
+                PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC
+            ) AS rn
+            FROM checkpoints WHERE thread_id = ?
+        ) WHERE rn > ?
+    )
+"""
+
+PRUNE_WRITES_SQL = """
+    DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = writes.thread_id
+          AND c.checkpoint_ns = writes.checkpoint_ns
+          AND c.checkpoint_id = writes.checkpoint_id
+    )
+"""
+
+# Chat history as the client shows it, one row per message, so opening a chat
+# reads a page of rows instead of deserializing the whole checkpoint. `seq`
+# is the message's index in the thread's messages channel.
+MESSAGES_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS chat_messages (
+        thread_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        entry TEXT NOT NULL,
+        PRIMARY KEY (thread_id, seq)
+    ) WITHOUT ROWID""",
+    # Newest checkpoint already copied into chat_messages, per thread.
+    """CREATE TABLE IF NOT EXISTS chat_messages_synced (
+        thread_id TEXT PRIMARY KEY,
+        checkpoint_id TEXT NOT NULL
+    )""",
+]
+
+async def connect(path: str = CHECKPOINT_DB_PATH) -> aiosqlite.Connection:
+    """Opens the checkpoint database with WAL and incremental vacuum enabled.
+    `auto_vacuum` only applies to new files; existing ones are converted by
+    the first compaction pass."""
+    conn = await aiosqlite.connect(path)
+    await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    for pragma in CONNECTION_PRAGMAS:
+        await conn.execute(pragma)
+    for statement in MESSAGES_SCHEMA:
+        await conn.execute(statement)
+    await conn.commit()
+    return conn
+
+async def prune_thread(saver: AsyncSqliteSaver, thread_id: str, keep: int = CHECKPOINT_KEEP_LATEST) -> int:
+    """Deletes all but the newest `keep` checkpoints of a thread and their writes."""
+    await saver.setup()
+    async with saver.lock:
+        cur = await saver.conn.execute(PRUNE_CHECKPOINTS_SQL, (thread_id, keep))
+        deleted = cur.rowcount
+        await saver.conn.execute(PRUNE_WRITES_SQL, (thread_id,))
+        await saver.conn.commit()
+    if deleted:
+        logger.info("prune_thread: removed %s checkpoints | thread_id=%s", deleted, thread_id)
+    return deleted
+
+async def delete_thread(saver: AsyncSqliteSaver, thread_id: str):
+    await saver.setup()
+    await saver.adelete_thread(thread_id)
+    async with saver.lock:
+        await saver.conn.execute("DELETE FROM chat_messages WHERE thread_id = ?", (thread_id,))
+        await saver.conn.execute("DELETE FROM chat_messages_synced WHERE thread_id = ?", (thread_id,))
+        await saver.conn.commit()
+
+async def sync_messages(saver: AsyncSqliteSaver, thread_id: str, to_entry: Callable[[object], dict | None]) -> int:
+    """Copies messages added since the last sync from the thread's newest
+    checkpoint into chat_messages. `to_entry` turns a message into the entry
+    the client shows, or None to leave it out. Does nothing, without loading
+    the checkpoint, if the newest checkpoint was already copied."""
+    await saver.setup()
+    async with saver.lock:
+        async with saver.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' ORDER BY checkpoint_id DESC LIMIT 1",
+            (thread_id,),
+        ) as cur:
+            newest = await cur.fetchone()
+        async with saver.conn.execute(
+            "SELECT checkpoint_id FROM chat_messages_synced WHERE thread_id = ?", (thread_id,)
+        ) as cur:
+            synced = await cur.fetchone()
+        if newest is None or (synced is not None and synced[0] == newest[0]):
+            return 0
+        async with saver.conn.execute(
+            "SELECT MAX(seq) FROM chat_messages WHERE thread_id = ?", (thread_id,)
+        ) as cur:
+            last_seq = (await cur.fetchone())[0]
+
+    checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": thread_id}})
+    if checkpoint_tuple is None:
+        return 0
+    messages = checkpoint_tuple.checkpoint["channel_values"].get("messages", [])
+    start = 0 if last_seq is None else last_seq + 1
+    rows = []
+    for seq in range(start, len(messages)):
+        entry = to_entry(messages[seq])
+        if entry is not None:
+            rows.append((thread_id, seq, json.dumps(entry)))
+
+    async with saver.lock:
+        await saver.conn.executemany(
+            "INSERT OR IGNORE INTO chat_messages (thread_id, seq, entry) VALUES (?, ?, ?)", rows
+        )
+        await saver.conn.execute(
+            "INSERT OR REPLACE INTO chat_messages_synced (thread_id, checkpoint_id) VALUES (?, ?)",
+            (thread_id, checkpoint_tuple.config["configurable"]["checkpoint_id"]),
+        )
+        await saver.conn.commit()
+    return len(rows)
+
+async def read_messages(saver: AsyncSqliteSaver, thread_id: str, limit: int, before: int | None = None) -> tuple[list[dict], int | None]:
+    """Returns the newest `limit` history entries with seq below `before`,
+    oldest first, and the cursor for the page before them (None at the start)."""
+    query = "SELECT seq, entry FROM chat_messages WHERE thread_id = ?"
+    params: tuple = (thread_id,)
+    if before is not None:
+        query += " AND seq < ?"
+        params += (before,)
+    query += " ORDER BY seq DESC LIMIT ?"
+    params += (limit + 1,)
+    async with saver.lock:
+        async with saver.conn.execute(query, params) as cur:
+            rows = await cur.fetchall()
+
+    next_before = rows[limit - 1][0] if len(rows) > limit else None
+    rows = rows[:limit]
+    rows.reverse()
+    return [json.loads(entry) for _, entry in rows], next_before
+
+async def prune_all(saver: AsyncSqliteSaver, keep: int = CHECKPOINT_KEEP_LATEST) -> int:
+    await saver.setup()
+    async with saver.lock:
+        async with saver.conn.execute(
+            "SELECT DISTINCT thread_id FROM checkpoints GROUP BY thread_id, checkpoint_ns HAVING COUNT(*) > ?",
+            (keep,),
+        ) as cur:
+            thread_ids = [row[0] for row in await cur.fetchall()]
+
+    deleted = 0
+    for thread_id in thread_ids:
+        deleted += await prune_thread(saver, thread_id, keep)
+    return deleted
+
+async def compact(saver: AsyncSqliteSaver):
+    """Returns free pages to the filesystem and truncates the WAL."""
+    await saver.setup()
+    async with saver.lock:
+        async with saver.conn.execute("PRAGMA auto_vacuum") as cur:
+            auto_vacuum = (await cur.fetchone())[0]
+        if auto_vacuum != 2:
+            logger.info("compact: converting checkpoint database to incremental auto_vacuum")
+            await saver.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await saver.conn.execute("VACUUM")
+        else:
+            # incremental_vacuum frees pages as its statement is stepped, so
+            # drain it; a half-read statement also blocks the WAL checkpoint.
+            async with saver.conn.execute("PRAGMA incremental_vacuum") as cur:
+                await cur.fetchall()
+        await saver.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        await saver.conn.commit()
+
+async def run_maintenance(saver: AsyncSqliteSaver, interval: float = CHECKPOINT_MAINTENANCE_INTERVAL):
+    """Background loop that applies the retention policy and compacts the file."""
+    while True:
+        try:
+            deleted = await prune_all(saver)
+            await compact(saver)
+            logger.info("run_maintenance: checkpoint maintenance complete | pruned=%s", deleted)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("run_maintenance: checkpoint maintenance failed")
+        await asyncio.sleep(interval)
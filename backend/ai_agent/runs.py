@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+# Events buffered between the agent and a slow HTTP client before the agent
+# is paused, so a stalled client cannot grow the buffer without bound.
+RUN_QUEUE_SIZE = int(os.getenv("DATANEXUS_RUN_QUEUE_SIZE", "256"))
+# How long a new run waits for the thread's cancelled run to stop writing
+# checkpoints before it starts anyway.
+RUN_CANCEL_TIMEOUT = float(os.getenv("DATANEXUS_RUN_CANCEL_TIMEOUT_SECONDS", "5"))
+
+_DONE = object()
+
+class AgentRun:
+    """Runs an agent event stream in its own task so it can be cancelled from
+    outside the request that started it (disconnects, newer messages, the
+    cancel endpoint). Cancelling the task cancels the node that is running,
+    which aborts the Ollama HTTP request or interrupts the DuckDB query."""
+
+    def __init__(self, thread_id: str, events: AsyncIterator[dict]):
+        self.thread_id = thread_id
+        self.cancelled = False
+        self.error: BaseException | None = None
+        # The queue itself is unbounded so the end-of-run marker can always be
+        # added; the semaphore bounds the events waiting in it.
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(RUN_QUEUE_SIZE)
+        self._next: asyncio.Future | None = None
+        self._task = asyncio.create_task(self._produce(events))
+
+    async def _produce(self, events: AsyncIterator[dict]):
+        try:
+            async for event in events:
+                await self._slots.acquire()
+                self._queue.put_nowait(event)
+        except asyncio.CancelledError:
+            logger.info("AgentRun: run cancelled | thread_id=%s", self.thread_id)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._queue.put_nowait(_DONE)
+
+    @property
+    def done(self) -> bool:
+        return self._task.done()
+
+    def cancel(self):
+        if self._next is not None:
+            self._next.cancel()
+        if not self._task.done():
+            self.cancelled = True
+            self._task.cancel()
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """Waits for the run's task to end; False if it is still going after `timeout`."""
+        done, _ = await asyncio.wait({self._task}, timeout=timeout)
+        return bool(done)
+
+    async def next_event(self, timeout: float | None = None) -> dict | None:
+        """Returns the next event, or None if none arrives within `timeout`.
+        Raises StopAsyncIteration at the end of the run. The pending get is
+        kept across timeouts so no event is lost."""
+        if self._next is None:
+            self._next = asyncio.ensure_future(self._queue.get())
+        done, _ = await asyncio.wait({self._next}, timeout=timeout)
+        if not done:
+            return None
+        item = self._next.result()
+        self._next = None
+        if item is _DONE:
+            # Leave the marker for any later call.
+            self._queue.put_nowait(_DONE)
+            if self.error is not None:
+                raise self.error
+            raise StopAsyncIteration
+        self._slots.release()
+        return item
+
+    async def events(self) -> AsyncIterator[dict]:
+        while True:
+            try:
+                yield await self.next_event()
+            except StopAsyncIteration:
+                return
+
+_active_runs: dict[str, AgentRun] = {}
+
+async def start_run(thread_id: str, events: AsyncIterator[dict]) -> AgentRun:
+    """Starts a run for a thread, cancelling any run still going for it. The
+    new run only starts once the old one has stopped (or RUN_CANCEL_TIMEOUT
+    passed), so the old run cannot write a checkpoint after the new one has
+    read the thread's state."""
+    while True:
+        previous = _active_runs.get(thread_id)
+        if previous is None or previous.done:
+            break
+        logger.info("start_run: cancelling previous run | thread_id=%s", thread_id)
+        previous.cancel()
+        if not await previous.wait(RUN_CANCEL_TIMEOUT):
+            logger.warning("start_run: previous run still going after %ss | thread_id=%s", RUN_CANCEL_TIMEOUT, thread_id)
+            break
+    run = AgentRun(thread_id, events)
+    _active_runs[thread_id] = run
+    return run
+
+def finish_run(run: AgentRun):
+    run.cancel()
+    if _active_runs.get(run.thread_id) is run:
+        del _active_runs[run.thread_id]
+
+def cancel_run(thread_id: str) -> bool:
+    run = _active_runs.get(thread_id)
+    if run is None or run.done:
+        return False
+    run.cancel()
+    return True
@@ -1,2 +1,13 @@
-from ai_agent.utils.nodes import *
-from ai_agent.utils.state import AppState
\ No newline at end of file
+import importlib
+
+# Node functions and AppState are resolved on first access, so importing a
+# light helper such as ai_agent.utils.sampling doesn't load the whole agent.
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    if name == "AppState":
+        return importlib.import_module("ai_agent.utils.state").AppState
+    try:
+        return getattr(importlib.import_module("ai_agent.utils.nodes"), name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
@@ -0,0 +1,118 @@
+import asyncio
+import collections
+import logging
+import os
+from contextlib import asynccontextmanager
+from langchain_core.callbacks.manager import adispatch_custom_event
+from ollama import AsyncClient
+from ai_agent.utils.models import OLLAMA_MODEL, OLLAMA_KEEP_ALIVE
+
+logger = logging.getLogger(__name__)
+
+# Requests allowed to run against Ollama at once; the rest wait in FIFO order.
+LLM_MAX_CONCURRENCY = int(os.getenv("DATANEXUS_LLM_MAX_CONCURRENCY", "1"))
+QUEUE_REPORT_INTERVAL = 1.0
+
+class LLMGateway:
+    """FIFO admission control for requests to the local Ollama server."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.active = 0
+        self.waiters: collections.deque[asyncio.Future] = collections.deque()
+        # One event per background slot holder, set to ask it to give the slot up.
+        self.background: set[asyncio.Event] = set()
+
+    @property
+    def queued(self) -> int:
+        return len(self.waiters)
+
+    @property
+    def idle(self) -> bool:
+        return self.active < self.max_concurrency and not self.waiters
+
+    def _release(self):
+        # Hand the slot straight to the next waiter so late arrivals can't jump the queue.
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    async def _wait_for_turn(self, on_queued):
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        # Background work holding a slot gives it up to the waiting request.
+        for preempted in self.background:
+            preempted.set()
+        reported = None
+        try:
+            while not waiter.done():
+                position = self.waiters.index(waiter) + 1
+                if on_queued is not None and position != reported:
+                    await on_queued(position)
+                    reported = position
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), QUEUE_REPORT_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, on_queued=None):
+        """Holds one request slot; `on_queued(position)` is awaited whenever
+        the caller's 1-based position in the wait queue changes."""
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+        else:
+            await self._wait_for_turn(on_queued)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def idle_slot(self):
+        """Low-priority slot for background work: taken only when no request is
+        running or waiting, and never queued. Yields None if it wasn't taken,
+        otherwise an event that is set as soon as a request has to wait for
+        the slot; the holder should then stop and leave."""
+        if not self.idle:
+            yield None
+            return
+        preempted = asyncio.Event()
+        self.active += 1
+        self.background.add(preempted)
+        try:
+            yield preempted
+        finally:
+            self.background.discard(preempted)
+            self._release()
+
+llm_gateway = LLMGateway(LLM_MAX_CONCURRENCY)
+
+@asynccontextmanager
+async def llm_slot(node: str):
+    """Gateway slot for graph nodes; queue positions are streamed as `llm_queue` events."""
+    async def report(position: int):
+        logger.info("llm_slot: waiting for model | node=%s | position=%s", node, position)
+        await adispatch_custom_event("llm_queue", {"node": node, "position": position})
+
+    async with llm_gateway.slot(on_queued=report):
+        yield
+
+async def warm_up(model: str = OLLAMA_MODEL):
+    """Loads the model into memory ahead of the first chat and pins it with keep_alive.
+    An empty prompt makes Ollama load the model without generating anything."""
+    logger.info("warm_up: preloading model '%s' | keep_alive=%s", model, OLLAMA_KEEP_ALIVE)
+    try:
+        await AsyncClient().generate(model=model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE)
+        logger.info("warm_up: model '%s' loaded", model)
+    except Exception:
+        logger.exception("warm_up: failed to preload model '%s'", model)
@@ -0,0 +1,72 @@
+import os
+
+# Rough budget for the conversation memory section of a prompt. Prompts are
+# built for gemma/qwen sized contexts, so a few hundred tokens of history
+# leaves room for the schema and the current results.
+MEMORY_TOKEN_BUDGET = int(os.getenv("DATANEXUS_MEMORY_TOKEN_BUDGET", "800"))
+# The newest turns keep their result digest and answer; older ones keep only
+# the question and SQL.
+DETAILED_TURNS = 2
+MAX_QUESTION_LEN = 300
+MAX_RESULTS_LEN = 400
+MAX_ANSWER_LEN = 300
+MAX_SQL_LEN = 300
+MAX_EARLIER_LEN = 400
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _clip(text: str, max_len: int) -> str:
+    text = " ".join((text or "").split())
+    if len(text) <= max_len:
+        return text
+    return text[: max_len - 3] + "..."
+
+def _render_turn(turn: dict) -> str:
+    lines = [f"User: {turn['question']}"]
+    lines += [f"SQL: {sql}" for sql in turn.get("sql", [])]
+    if turn.get("results"):
+        lines.append(f"Results: {turn['results']}")
+    if turn.get("answer"):
+        lines.append(f"Answer: {turn['answer']}")
+    return "\n".join(lines)
+
+def render_memory(memory: dict | None) -> str:
+    if not memory or not (memory.get("earlier") or memory.get("turns")):
+        return ""
+    parts = []
+    if memory.get("earlier"):
+        parts.append(f"Earlier questions: {memory['earlier']}")
+    parts += [_render_turn(turn) for turn in memory.get("turns", [])]
+    return "\n\n".join(parts)
+
+def _compress(turn: dict) -> dict:
+    return {"question": turn["question"], "sql": turn.get("sql", [])}
+
+def update_memory(memory: dict | None, question: str, sql: list[str], results: str, answer: str) -> dict:
+    """Adds one turn to the rolling memory and compresses the oldest turns
+    until it fits MEMORY_TOKEN_BUDGET. Only the new turn is clipped and the
+    older turns are only shortened or folded, so each update is constant work
+    regardless of how long the conversation is."""
+    memory = memory or {}
+    turns = [dict(turn) for turn in memory.get("turns", [])]
+    earlier = memory.get("earlier", "")
+
+    turns.append({
+        "question": _clip(question, MAX_QUESTION_LEN),
+        "sql": [_clip(q, MAX_SQL_LEN) for q in sql],
+        "results": _clip(results, MAX_RESULTS_LEN),
+        "answer": _clip(answer, MAX_ANSWER_LEN),
+    })
+    for index in range(len(turns) - DETAILED_TURNS):
+        turns[index] = _compress(turns[index])
+
+    updated = {"earlier": earlier, "turns": turns}
+    while len(turns) > 1 and estimate_tokens(render_memory(updated)) > MEMORY_TOKEN_BUDGET:
+        dropped = turns.pop(0)
+        earlier = f"{earlier}; {dropped['question']}" if earlier else dropped["question"]
+        # Folded questions keep their newest part.
+        if len(earlier) > MAX_EARLIER_LEN:
+            earlier = "..." + earlier[-(MAX_EARLIER_LEN - 3):]
+        updated = {"earlier": earlier, "turns": turns}
+    return updated
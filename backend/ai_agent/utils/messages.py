@@ -9,6 +9,9 @@ class CanvasMessage(BaseMessage):
 
     sql_data: GeneratedQuery
 
+    # Set while the canvas shows a result computed from table samples.
+    approximate: bool = False
+
     type: Literal["canvas"] = "canvas"
 
     @classmethod
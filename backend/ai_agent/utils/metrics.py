@@ -0,0 +1,248 @@
+"""
+In-process metrics in the Prometheus text format, served by /metrics.
+
+Each labelled series is a few floats behind its metric's lock, so recording
+costs a dict lookup and an add and can stay on in production. Gauges with a
+`collect` callback are computed when scraped instead of on every change.
+"""
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STREAM_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+TOKENS_PER_SECOND_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 50.0, 75.0, 100.0, 150.0, 250.0)
+
+_registry: list["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.lock = threading.Lock()
+        self.series: dict[tuple, object] = {}
+        _registry.append(self)
+
+    def labels(self, *values):
+        child = self.series.get(values)
+        if child is None:
+            with self.lock:
+                child = self.series.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+class _Value:
+    def __init__(self, lock: threading.Lock):
+        self.lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _Value(self.lock)
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v.value)}" for k, v in list(self.series.items())]
+
+class Gauge(_Metric):
+    """A value that goes up and down. With `collect`, a callable returning
+    {label values: value}, it is read when scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect: Callable[[], dict] | None = None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def _child(self):
+        return _Value(self.lock)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self):
+        values = {k: v.value for k, v in list(self.series.items())}
+        if self.collect is not None:
+            try:
+                values.update(self.collect())
+            except Exception:
+                logger.exception("metrics: collector failed | metric=%s", self.name)
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in values.items()]
+
+class _Buckets:
+    def __init__(self, lock: threading.Lock, bounds: tuple):
+        self.lock = lock
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def _child(self):
+        return _Buckets(self.lock, self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        lines = []
+        for key, child in list(self.series.items()):
+            with self.lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "datanexus_http_request_duration_seconds", "HTTP request latency by route template, until the last body byte.",
+    ("method", "route", "status"),
+)
+DUCKDB_QUERY_SECONDS = Histogram(
+    "datanexus_duckdb_query_duration_seconds", "DuckDB query time, excluding serialisation.", ("source",),
+)
+DUCKDB_ROWS = Counter("datanexus_duckdb_rows_returned_total", "Result rows returned to callers.", ("source",))
+DUCKDB_BYTES = Counter("datanexus_duckdb_result_bytes_total", "Bytes of JSON produced from results.", ("source",))
+SERIALIZATION_SECONDS = Histogram(
+    "datanexus_serialization_duration_seconds", "Time to turn a result DataFrame into JSON records.", ("source",),
+)
+CACHE_LOOKUPS = Counter("datanexus_cache_lookups_total", "Cache lookups by result (hit or miss).", ("cache", "result"))
+CACHE_ENTRIES = Gauge("datanexus_cache_entries", "Entries held by each cache.", ("cache",))
+SSE_STREAM_SECONDS = Histogram(
+    "datanexus_sse_stream_duration_seconds", "Agent SSE stream length by how it ended.", ("outcome",), STREAM_BUCKETS,
+)
+OLLAMA_REQUEST_SECONDS = Histogram(
+    "datanexus_ollama_request_duration_seconds", "Ollama-reported total time per LLM call.", ("node",),
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "datanexus_ollama_tokens_per_second", "Generation speed per LLM call.", ("node",), TOKENS_PER_SECOND_BUCKETS,
+)
+OLLAMA_TOKENS = Counter("datanexus_ollama_tokens_total", "Tokens evaluated by Ollama.", ("node", "kind"))
+
+def _checkpoint_db_bytes() -> dict:
+    from ai_agent.checkpoints import CHECKPOINT_DB_PATH
+    size = 0
+    for suffix in ("", "-wal"):
+        try:
+            size += os.path.getsize(CHECKPOINT_DB_PATH + suffix)
+        except OSError:
+            pass
+    return {(): size}
+
+CHECKPOINT_DB_BYTES = Gauge(
+    "datanexus_checkpoint_db_bytes", "Size of the agent checkpoint database and its WAL.", collect=_checkpoint_db_bytes,
+)
+
+def records_json(df, source: str) -> list[dict]:
+    """A result DataFrame as JSON records, counting its rows, bytes and
+    serialisation time under `source`."""
+    started = time.perf_counter()
+    payload = df.to_json(orient="records")
+    records = json.loads(payload)
+    SERIALIZATION_SECONDS.labels(source).observe(time.perf_counter() - started)
+    DUCKDB_ROWS.labels(source).inc(len(records))
+    DUCKDB_BYTES.labels(source).inc(len(payload))
+    return records
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware timing each request under its route template (e.g.
+    /get-chat-messages/{thread_id}), so paths don't each get a series."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
@@ -1,6 +1,16 @@
-from langchain_ollama import ChatOllama
 import os
-from ai_agent.utils.schemas import ExecutionPlan, GeneratedQuery
+from ai_agent.utils.schemas import ExecutionPlan, GeneratedQueries, ChatTitles
+
+OLLAMA_MODEL = os.getenv("DATANEXUS_OLLAMA_MODEL", "gemma3:4b")
+
+def _parse_keep_alive(value: str):
+    """Ollama takes either seconds (-1 keeps the model loaded forever) or a duration like '30m'."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+OLLAMA_KEEP_ALIVE = _parse_keep_alive(os.getenv("DATANEXUS_OLLAMA_KEEP_ALIVE", "-1"))
 
 def get_safe_thread_count():
     logical_cores = os.cpu_count() or 4
@@ -10,18 +20,32 @@ def get_safe_thread_count():
 
 def _make_llm(temperature: float, **kwargs):
     """Returns a ChatOllama with Qwen 3 thinking disabled.
-    `think` must be a root-level Ollama API body param, not an option."""
+    `think` must be a root-level Ollama API body param, not an option.
+    The server address comes from OLLAMA_HOST, which also lets tests point at ollama_stub.py."""
+    from langchain_ollama import ChatOllama
     return ChatOllama(
-        model="gemma3:4b",
+        model=OLLAMA_MODEL,
         temperature=temperature,
         num_ctx=8192,
         num_thread=get_safe_thread_count(),
+        keep_alive=OLLAMA_KEEP_ALIVE,
         extra_body={"think": False},
         **kwargs,
     )
 
-analyst_llm = _make_llm(temperature=0.7)
-sql_generator_llm = _make_llm(temperature=0.0).with_structured_output(GeneratedQuery)
-synthesizer_llm = _make_llm(temperature=0.8)
-router_llm = _make_llm(temperature=0.4).with_structured_output(ExecutionPlan)
+# The clients are built on first access, so importing this module for its
+# settings (as the gateway does) doesn't load langchain_ollama.
+_LLM_FACTORIES = {
+    "analyst_llm": lambda: _make_llm(temperature=0.7),
+    "sql_generator_llm": lambda: _make_llm(temperature=0.0).with_structured_output(GeneratedQueries),
+    "synthesizer_llm": lambda: _make_llm(temperature=0.8),
+    "router_llm": lambda: _make_llm(temperature=0.4).with_structured_output(ExecutionPlan),
+    "title_llm": lambda: _make_llm(temperature=0.3).with_structured_output(ChatTitles),
+}
 
+def __getattr__(name):
+    factory = _LLM_FACTORIES.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    llm = globals()[name] = factory()
+    return llm
@@ -1,11 +1,23 @@
 from ai_agent.utils.models import analyst_llm, sql_generator_llm, synthesizer_llm, router_llm
-from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, AnyMessage
+from langchain_core.messages import AIMessage, HumanMessage, AnyMessage
 from ai_agent.utils.state import AppState
 from langgraph.graph import END
 from langchain_core.runnables import RunnableConfig
 from langchain_core.callbacks.manager import dispatch_custom_event
 from ai_agent.utils.messages import CanvasMessage
+from ai_agent.utils.summarizer import summarize_results
+from ai_agent.utils.memory import estimate_tokens, render_memory, update_memory
+from ai_agent.utils.sampling import SAMPLE_PERCENT, bump_data_generation, ready_samples, referenced_tables, use_samples
+from ai_agent.utils.sql_repair import repair_sql
+from ai_agent.utils.gateway import llm_slot
+from ai_agent.utils.schemas import GeneratedQuery
+from ai_agent.utils.prompts import build_prompt, MAX_PARALLEL_QUERIES, PLANNER_INSTRUCTIONS, SQL_INSTRUCTIONS, ANALYST_INSTRUCTIONS, SYNTHESIZER_INSTRUCTIONS
+from ai_agent.utils.timing import timing_config
+from ai_agent.utils.metrics import records_json
+from ai_agent.utils.query_log import is_read_only, record_query
+import asyncio
 import logging
+from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +29,29 @@ def _preview_text(value, max_len: int = 160) -> str:
         return text
     return text[: max_len - 3] + "..."
 
+def _latest_question(state: AppState) -> str:
+    """Content of the newest user message; later nodes append canvas messages after it."""
+    for message in reversed(state.get("messages", [])):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return ""
+
+def _latest_answer(state: AppState) -> str:
+    """Content of the assistant reply to the newest user message, if any."""
+    for message in reversed(state.get("messages", [])):
+        if isinstance(message, HumanMessage):
+            return ""
+        if isinstance(message, AIMessage) and isinstance(message.content, str):
+            return message.content
+    return ""
+
+def _with_memory(state: AppState, sections: dict[str, str]) -> dict[str, str]:
+    """Puts the rolling summary of earlier turns ahead of the node's own sections."""
+    memory = render_memory(state.get("memory"))
+    if not memory:
+        return sections
+    return {"CONVERSATION SO FAR": memory, **sections}
+
 def router_node(state: AppState) -> str:
     logger.info(
         "router_node: evaluating route | has_errors=%s | plan_length=%s",
@@ -29,8 +64,11 @@ def router_node(state: AppState) -> str:
         return "sql_agent"
 
     if not state.get("plan") or len(state["plan"]) == 0:
-        logger.info("router_node: no plan steps remaining, routing to END")
-        return END
+        if state.get("full_results_pending"):
+            logger.info("router_node: no plan steps remaining, collecting full results")
+            return "full_results"
+        logger.info("router_node: no plan steps remaining, updating memory")
+        return "memory"
 
     next_node = state["plan"][0]
     if next_node not in VALID_NODES:
@@ -40,29 +78,16 @@ def router_node(state: AppState) -> str:
     logger.info("router_node: routing to next node '%s'", next_node)
     return next_node
 
-def planner_node(state: AppState):
+async def planner_node(state: AppState, config: RunnableConfig):
     logger.info("planner_node: started | message_count=%s", len(state.get("messages", [])))
     dispatch_custom_event("status", {"status": "Planning execution steps with LLM..."})
-    latest_message = state["messages"][-1].content
+    latest_message = _latest_question(state)
     logger.info("planner_node: latest user message preview='%s'", _preview_text(latest_message))
 
-    system_prompt = SystemMessage(content="""
-        You are a Project Manager for a Data Analysis team.
-        Your ONLY job is to create an Execution Plan (array of strings) based on the user's request.
-
-        ALLOWED NODES:
-        - 'sql_agent': Use if the question requires querying the database.
-        - 'executor_tool': Always follow 'sql_agent' if you need to run the query.
-        - 'analyst_agent': Use to explain data results or errors.
-        - 'synthesizer_node': Always the final step to provide the friendly answer.
+    prompt = build_prompt(config, PLANNER_INSTRUCTIONS, _with_memory(state, {"USER QUESTION": latest_message}))
 
-        RULES:
-        1. DO NOT answer the user's question directly.
-        2. DO NOT worry about whether the dates are in the future; assume the data exists in the table.
-        3. Output ONLY the JSON plan.
-    """)
-
-    plan_result = router_llm.invoke([system_prompt, HumanMessage(content=latest_message)])
+    async with llm_slot("planner"):
+        plan_result = await router_llm.ainvoke(prompt, config=timing_config(config, "planner"))
     logger.info("planner_node: raw plan result=%s", plan_result)
 
     invalid_steps = [step for step in plan_result.plan if step not in VALID_NODES]
@@ -70,86 +95,284 @@ def planner_node(state: AppState):
         raise ValueError(f"Invalid plan steps generated: {invalid_steps}")
 
     logger.info("planner_node: generated plan=%s", plan_result.plan)
-    return {"plan": plan_result.plan}
+    # Per-turn fields are cleared so the memory node only records this turn.
+    return {"plan": plan_result.plan, "errors": "", "queries": [], "db_results": "", "analysis": "", "full_results_pending": False}
 
-def sql_agent(state: AppState, config: RunnableConfig):
+async def sql_agent(state: AppState, config: RunnableConfig):
     logger.info("sql_agent: started")
     dispatch_custom_event("status", {"status": "Generating SQL query with LLM..."})
 
-    schema = config["configurable"].get("table_schema", "No schema provided")
-
-    prompt = f"""
-    You are an expert DuckDB SQL Developer.
+    sections = {"USER QUESTION": _latest_question(state)}
+    if state.get("errors"):
+        sections["PREVIOUS ATTEMPT FAILED"] = (
+            f"SQL:\n{_format_queries(state.get('queries') or [])}\n"
+            f"ERROR: {state['errors']}\n"
+            "Fix the error above in your new query."
+        )
+    prompt = build_prompt(config, SQL_INSTRUCTIONS, _with_memory(state, sections))
 
-    CURRENT TABLE SCHEMA:
-    {schema}
+    async with llm_slot("sql_agent"):
+        result = await sql_generator_llm.ainvoke(prompt, config=timing_config(config, "sql_agent"))
+    queries = result.queries[:MAX_PARALLEL_QUERIES]
+    for query in queries:
+        logger.info(
+            "sql_agent: generated SQL | sql_preview='%s' | param_keys=%s | defaults=%s",
+            _preview_text(query.sql_query),
+            [res.name for res in query.sql_params],
+            {res.name: res.default for res in query.sql_params},
+        )
 
-    USER QUESTION: {state["messages"][-1].content}
+    # When retrying after an error the plan no longer starts with this node.
+    plan = state.get("plan", [])
+    if plan and plan[0] == "sql_agent":
+        plan = plan[1:]
 
-    CRITICAL RULES:
-    1. Only use columns present in the schema above.
-    2. Use $variable_name syntax for all values.
-    3. Never wrap a variable in TIMESTAMP(), CAST(), DATE(), quotes, or any other SQL function. Write comparisons directly, for example: tpep_pickup_datetime BETWEEN $start_date AND $end_date.
-    4. The sql_params defaults must be plain ISO 8601 strings for date or timestamp values.
-    5. Return a GeneratedQuery object with 'sql_query' and 'sql_params'.
-    """
+    return {
+        "queries": queries,
+        "errors": "" if queries else "The SQL generator returned no queries.",
+        "plan" : plan
+    }
 
-    result = sql_generator_llm.invoke(prompt)
-    logger.info(
-        "sql_agent: generated SQL | sql_preview='%s' | param_keys=%s | defaults=%s",
-        _preview_text(result.sql_query),
-        [res.name for res in result.sql_params],
-        {res.name: res.default for res in result.sql_params},
+def _params_dict(query: GeneratedQuery) -> dict:
+    return {res.name: res.default for res in query.sql_params or []}
+
+def _format_queries(queries: list[GeneratedQuery]) -> str:
+    if not queries:
+        return "None"
+    return "\n".join(f"Query {i}: {q.sql_query}" for i, q in enumerate(queries, start=1))
+
+def sql_validator(state: AppState, config: RunnableConfig):
+    logger.info("sql_validator: started")
+    dispatch_custom_event("status", {"status": "Validating SQL query..."})
+
+    conn = config["configurable"]["conn"]
+    queries = []
+    errors = []
+    for i, query in enumerate(state.get("queries") or [], start=1):
+        # Its own cursor, like the other nodes, so parallel runs don't share statement state.
+        cursor = conn.cursor()
+        try:
+            sql_query, error, fixes = repair_sql(cursor, query.sql_query, _params_dict(query))
+        finally:
+            cursor.close()
+        if fixes:
+            logger.info(
+                "sql_validator: repaired SQL without LLM | query=%s | fixes=%s | sql_preview='%s'",
+                i,
+                fixes,
+                _preview_text(sql_query),
+            )
+        if error:
+            logger.warning("sql_validator: query %s failed validation | error='%s'", i, _preview_text(error))
+            errors.append(f"Query {i}: {error}")
+        queries.append(query.model_copy(update={"sql_query": sql_query}))
+
+    return {"queries": queries, "errors": "\n".join(errors)}
+
+def _fetch_df(conn, cursor, sql_query: str, params: dict, preview: bool, project: str | None):
+    try:
+        if preview:
+            use_samples(cursor)
+        source, setup = ("agent_preview", use_samples) if preview else ("agent", None)
+        with record_query(conn, project, source, sql_query, params, setup) as recorded:
+            writes = not preview and not is_read_only(cursor, sql_query)
+            try:
+                df = cursor.execute(sql_query, params).df()
+            finally:
+                if writes:
+                    bump_data_generation(project)
+            recorded.rows = len(df)
+        return df
+    finally:
+        cursor.close()
+
+async def run_query(conn, sql_query: str, params: dict, preview: bool = False, project: str | None = None):
+    """Runs a query on its own cursor in a worker thread so the event loop stays free.
+    If the run is cancelled the DuckDB query is interrupted instead of running to completion.
+    With `preview` the query reads the cached table samples instead of the full tables."""
+    cursor = conn.cursor()
+    try:
+        return await asyncio.to_thread(_fetch_df, conn, cursor, sql_query, params, preview, project)
+    except asyncio.CancelledError:
+        logger.info("run_query: run cancelled, interrupting DuckDB query")
+        cursor.interrupt()
+        raise
+
+# Full results still running for fast-mode runs, keyed by thread_id. They are
+# collected by full_results_node once the analyst has answered from the preview.
+_pending_full_results: dict[str, asyncio.Future] = {}
+
+def discard_full_results(thread_id: str):
+    """Cancels full queries left behind by a fast-mode run that did not finish."""
+    pending = _pending_full_results.pop(thread_id, None)
+    if pending is not None and not pending.done():
+        logger.info("discard_full_results: cancelling full queries | thread_id=%s", thread_id)
+        pending.cancel()
+
+def _run_all(conn, queries: list[GeneratedQuery], preview: bool = False, project: str | None = None) -> asyncio.Future:
+    return asyncio.gather(
+        *(run_query(conn, q.sql_query, _params_dict(q), preview, project) for q in queries),
+        return_exceptions=True,
     )
 
-    return {
-        "sql_query": result.sql_query,
-        "sql_params": result.sql_params,
-        "errors": "",
-        "plan" : state["plan"][1:] if len(state.get("plan", [])) > 1 else []
-    }
+def _failures(results) -> list[tuple[int, Exception]]:
+    return [(i, r) for i, r in enumerate(results, start=1) if isinstance(r, Exception)]
 
-async def executor_tool(state: AppState, config: RunnableConfig):
-    logger.info("executor_tool: started")
-    dispatch_custom_event("status", {"status": "Executing SQL query..."})
+async def _run_previews(conn, queries: list[GeneratedQuery], project: str | None):
+    """Runs the queries that read a sampled table against the samples; the
+    others would only run twice at full cost. Returns one preview per query
+    (None for those not previewed), or (None, ...) when no query reads a
+    sampled table or a preview fails."""
     try:
-        conn = config["configurable"]["conn"]
-        sql_query = state["sql_query"]
-        sql_params = state.get("sql_params", {})
-        sql_params_dict = {res.name: res.default for res in sql_params}
-        logger.info(
-            "executor_tool: executing SQL | sql_preview='%s' | param_keys=%s | params=%s",
-            _preview_text(sql_query),
-            sql_params_dict.keys(),
-            sql_params_dict,
-        )
-        results_df = conn.execute(sql_query, sql_params_dict).df()
-        data_json = results_df.to_json(orient="records")
-        import json
-        data_array = json.loads(data_json)
+        ready = await ready_samples(conn)
+    except Exception:
+        logger.exception("executor_tool: could not read table samples, skipping preview")
+        return None, []
+    sampled = [referenced_tables(q.sql_query, ready) for q in queries]
+    previewed = [i for i, tables in enumerate(sampled) if tables]
+    if not previewed:
+        return None, sampled
+    results = await _run_all(conn, [queries[i] for i in previewed], preview=True, project=project)
+    failures = [(previewed[i - 1] + 1, error) for i, error in _failures(results)]
+    if failures:
+        logger.warning("executor_tool: preview failed, waiting for full results | errors=%s", failures)
+        return None, sampled
+    previews = [None] * len(queries)
+    for i, result in zip(previewed, results):
+        previews[i] = result
+    return previews, sampled
+
+async def _emit_canvases(queries, results, canvas_ids, sampled: list[list[str]] | None = None):
+    """Dispatches one canvas per result and returns the canvas messages and result digests."""
+    canvas_messages = []
+    summaries = []
+    for i, (query, results_df, canvas_id) in enumerate(zip(queries, results, canvas_ids), start=1):
+        approximate = sampled is not None and bool(sampled[i - 1])
+        data_array = records_json(results_df, "agent")
+        columns = list(results_df.columns)
         logger.info(
-            "executor_tool: query succeeded | rows=%s | columns=%s",
+            "executor_tool: query %s succeeded | rows=%s | columns=%s | approximate=%s",
+            i,
             len(results_df),
-            list(results_df.columns),
+            columns,
+            approximate,
         )
 
-        render_event = dispatch_custom_event("render_canvas_table", {"columns": list(results_df.columns), "rows": data_array, "sql_query": sql_query, "sql_params": sql_params_dict})
-        if render_event is not None:
-            logger.info("executor_tool: waiting for render event to complete")
-        else:
-            logger.warning("executor_tool: no render event returned from dispatch")
+        render_event = dispatch_custom_event("render_canvas_table", {
+            "canvas_id": canvas_id,
+            "columns": columns,
+            "rows": data_array,
+            "sql_query": query.sql_query,
+            "sql_params": _params_dict(query),
+            "approximate": approximate,
+            "sample_percent": SAMPLE_PERCENT if approximate else None,
+        })
         if render_event is not None and hasattr(render_event, "__await__"):
             await render_event
 
-        canvas_message = CanvasMessage(content={"columns": list(results_df.columns), "rows": data_array}, sql_data={"sql_query": sql_query, "sql_params": sql_params})
+        canvas_messages.append(CanvasMessage(id=canvas_id, content={"columns": columns, "rows": data_array}, sql_data=query, approximate=approximate))
+        summary = summarize_results(results_df)
+        if approximate:
+            summary = (
+                f"Preview from a {SAMPLE_PERCENT:g}% sample of {', '.join(sampled[i - 1])}; "
+                f"counts and sums are roughly {SAMPLE_PERCENT:g}% of the full values.\n{summary}"
+            )
+        summaries.append(summary if len(queries) == 1 else f"Query {i}:\n{summary}")
+    return canvas_messages, "\n\n".join(summaries)
 
-        return {"messages": [canvas_message],  "db_results": data_json[:5], "errors": "", "plan": state["plan"][1:] if len(state.get("plan", [])) > 1 else []}
+async def executor_tool(state: AppState, config: RunnableConfig):
+    logger.info("executor_tool: started")
+    dispatch_custom_event("status", {"status": "Executing SQL query..."})
+    conn = config["configurable"]["conn"]
+    thread_id = config["configurable"]["thread_id"]
+    project = config["configurable"].get("project")
+    queries = state.get("queries") or []
+    for i, query in enumerate(queries, start=1):
+        logger.info(
+            "executor_tool: executing SQL | query=%s | sql_preview='%s' | params=%s",
+            i,
+            _preview_text(query.sql_query),
+            _params_dict(query),
+        )
+    canvas_ids = [f"canvas-{uuid4().hex}" for _ in queries]
+    plan = state["plan"][1:] if len(state.get("plan", [])) > 1 else []
 
-    except Exception as e:
-        logger.exception("executor_tool: query failed with exception")
-        return {"db_results": [], "errors": str(e)}
+    # Independent queries run concurrently on their own cursors, so the wait
+    # is as long as the slowest query rather than the sum of all of them.
+    full_tasks = [asyncio.ensure_future(run_query(conn, q.sql_query, _params_dict(q), project=project)) for q in queries]
+    full = asyncio.gather(*full_tasks, return_exceptions=True)
 
-def analyst_node(state: AppState, config: RunnableConfig):
+    try:
+        # Queries over large tables also run against the cached samples, so the
+        # canvas shows an approximate result while the full queries are running.
+        previews, sampled = await _run_previews(conn, queries, project)
+        if previews is not None and not full.done():
+            dispatch_custom_event("status", {"status": "Showing a preview while the full query runs..."})
+            previewed = [i for i, preview in enumerate(previews) if preview is not None]
+
+            if config["configurable"].get("fast_mode"):
+                # The analyst needs every query's result. Queries without a
+                # preview read only small tables, so their full results are waited for.
+                rest = await asyncio.gather(*(full_tasks[i] for i in range(len(queries)) if i not in previewed), return_exceptions=True)
+                if not _failures(rest):
+                    rest = iter(rest)
+                    merged = [preview if preview is not None else next(rest) for preview in previews]
+                    preview_messages, preview_summary = await _emit_canvases(queries, merged, canvas_ids, sampled)
+                    logger.info("executor_tool: fast mode, analysing the preview while full queries run")
+                    discard_full_results(thread_id)
+                    _pending_full_results[thread_id] = full
+                    return {"messages": preview_messages, "db_results": preview_summary, "errors": "", "full_results_pending": True, "plan": plan}
+
+            # Queries without a preview get their canvas with the full results.
+            await _emit_canvases(
+                [queries[i] for i in previewed],
+                [previews[i] for i in previewed],
+                [canvas_ids[i] for i in previewed],
+                [sampled[i] for i in previewed],
+            )
+
+        results = await full
+    except asyncio.CancelledError:
+        full.cancel()
+        raise
+
+    failures = _failures(results)
+    if failures:
+        for i, error in failures:
+            logger.error("executor_tool: query %s failed with exception: %s", i, error)
+        return {"db_results": "", "errors": "\n".join(f"Query {i}: {error}" for i, error in failures)}
+
+    canvas_messages, summary = await _emit_canvases(queries, results, canvas_ids)
+    return {"messages": canvas_messages, "db_results": summary, "errors": "", "full_results_pending": False, "plan": plan}
+
+async def full_results_node(state: AppState, config: RunnableConfig):
+    """Replaces the preview canvases of a fast-mode run with the full results."""
+    logger.info("full_results_node: started")
+    dispatch_custom_event("status", {"status": "Loading full query results..."})
+    thread_id = config["configurable"]["thread_id"]
+    queries = state.get("queries") or []
+    canvas_ids = [m.id for m in state.get("messages", []) if isinstance(m, CanvasMessage)][-len(queries):] if queries else []
+
+    full = _pending_full_results.pop(thread_id, None)
+    if full is None:
+        # The process restarted since the preview; run the queries again.
+        full = _run_all(config["configurable"]["conn"], queries, project=config["configurable"].get("project"))
+    try:
+        results = await full
+    except asyncio.CancelledError:
+        full.cancel()
+        raise
+
+    failures = _failures(results)
+    if failures or len(canvas_ids) != len(queries):
+        for i, error in failures:
+            logger.error("full_results_node: query %s failed, keeping the preview | error=%s", i, error)
+        return {"full_results_pending": False}
+
+    canvas_messages, _ = await _emit_canvases(queries, results, canvas_ids)
+    return {"messages": canvas_messages, "full_results_pending": False}
+
+async def analyst_node(state: AppState, config: RunnableConfig):
     logger.info(
         "analyst_node: started | has_db_results=%s | has_errors=%s",
         bool(state.get("db_results")),
@@ -157,50 +380,46 @@ def analyst_node(state: AppState, config: RunnableConfig):
     )
     dispatch_custom_event("status", {"status": "Analyzing SQL results with LLM..."})
 
-    schema = config["configurable"].get("table_schema", "No schema provided")
-
-    system_prompt = SystemMessage(content=f"""
-        You are a Senior Data Analyst. Your job is to interpret the results of a SQL query.
+    prompt = build_prompt(config, ANALYST_INSTRUCTIONS, _with_memory(state, {
+        "USER'S ORIGINAL QUESTION": _latest_question(state),
+        "SQL QUERIES EXECUTED": _format_queries(state.get("queries") or []),
+        "SQL RESULTS SUMMARY": state.get("db_results") or "None",
+        "EXECUTION ERRORS": state.get("errors") or "None",
+    }))
 
-        CONTEXT:
-        - Database Schema: {schema}
-
-        INSTRUCTIONS:
-        1. Keep the response short, clear, and direct.
-        2. If errors exist, explain the issue in plain language and, if useful, mention a simple fix.
-        3. If results exist, summarize the main finding only. Do not add extra caveats or commentary about placeholder variables, date parameters, or query mechanics.
-        4. If results are empty, say that no rows matched the query and keep it brief.
-
-        Be precise and avoid unnecessary explanation.
-    """)
-
-    human_msg = HumanMessage(content=f"""
-        User's Original Question: {state["messages"][-1].content}
-        SQL Query Executed: {state.get("sql_query", "None")}
-        SQL Results (JSON): {state.get("db_results", [])}
-        Execution Errors: {state.get("errors", "None")}
-    """)
-
-    insights = analyst_llm.invoke([system_prompt, human_msg])
+    async with llm_slot("analyst_agent"):
+        insights = await analyst_llm.ainvoke(prompt, config=timing_config(config, "analyst_agent"))
     logger.info("analyst_node: generated analysis | preview='%s'", _preview_text(insights.content))
     return {"analysis": insights.content, "plan": state["plan"][1:] if len(state.get("plan", [])) > 1 else []}
 
-async def synthesizer_node(state: AppState):
+async def synthesizer_node(state: AppState, config: RunnableConfig):
     logger.info("synthesizer_node: started")
     event = dispatch_custom_event("status", {"status": "Synthesizing final answer with LLM..."})
     if event is not None and hasattr(event, "__await__"):
         await event
 
-    prompt = f"""
-    You are the final voice of the DataNexus AI.
-    Write a concise final answer based on the Analyst's insights.
-
-    USER QUESTION: {state["messages"][-1].content}
-    ANALYST INSIGHTS: {state.get("analysis", "No insights available.")}
+    prompt = build_prompt(config, SYNTHESIZER_INSTRUCTIONS, {
+        "USER QUESTION": _latest_question(state),
+        "ANALYST INSIGHTS": state.get("analysis") or "No insights available.",
+    })
 
-    Keep it short and natural. Do not mention placeholder variables, query execution details, or suggest follow-up questions unless the user clearly needs one.
-    """
-
-    final_answer = await synthesizer_llm.ainvoke(prompt)
+    async with llm_slot("synthesizer_node"):
+        final_answer = await synthesizer_llm.ainvoke(prompt, config=timing_config(config, "synthesizer_node"))
     logger.info("synthesizer_node: completed | answer_preview='%s'", _preview_text(final_answer))
     return {"messages": [AIMessage(content=final_answer.content)], "plan": state["plan"][1:] if len(state.get("plan", [])) > 1 else []}
+
+def memory_node(state: AppState):
+    """Folds the finished turn into the rolling conversation memory."""
+    memory = update_memory(
+        state.get("memory"),
+        question=_latest_question(state),
+        sql=[q.sql_query for q in state.get("queries") or []],
+        results=state.get("db_results") or state.get("errors") or "",
+        answer=_latest_answer(state),
+    )
+    logger.info(
+        "memory_node: updated memory | turns=%s | est_tokens=%s",
+        len(memory["turns"]),
+        estimate_tokens(render_memory(memory)),
+    )
+    return {"memory": memory}
@@ -0,0 +1,65 @@
+from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
+
+# Every node sends this system message first and keeps everything that changes
+# per call (node role, question, SQL, results) in the message that follows it.
+# Within a project the system message is byte-identical across nodes and turns,
+# so Ollama's prefix cache can skip re-evaluating the schema tokens.
+SHARED_SYSTEM_PROMPT = """You are part of DataNexus AI, a team of assistants that answer questions about a DuckDB database.
+Each request below starts with your role for that step, followed by the inputs for the step.
+Follow the role instructions exactly and only use tables and columns from this schema.
+
+DATABASE SCHEMA:
+{schema}"""
+
+PLANNER_INSTRUCTIONS = """ROLE: Project Manager for a Data Analysis team.
+Your ONLY job is to create an Execution Plan (array of strings) based on the user's request.
+
+ALLOWED NODES:
+- 'sql_agent': Use if the question requires querying the database.
+- 'executor_tool': Always follow 'sql_agent' if you need to run the query.
+- 'analyst_agent': Use to explain data results or errors.
+- 'synthesizer_node': Always the final step to provide the friendly answer.
+
+RULES:
+1. DO NOT answer the user's question directly.
+2. DO NOT worry about whether the dates are in the future; assume the data exists in the table.
+3. Follow-up questions that change or break down an earlier query (see CONVERSATION SO FAR) need a new query.
+4. Output ONLY the JSON plan."""
+
+MAX_PARALLEL_QUERIES = 4
+
+SQL_INSTRUCTIONS = f"""ROLE: Expert DuckDB SQL Developer.
+
+CRITICAL RULES:
+1. Only use columns present in the schema above.
+2. Use $variable_name syntax for all values.
+3. Never wrap a variable in TIMESTAMP(), CAST(), DATE(), quotes, or any other SQL function. Write comparisons directly, for example: tpep_pickup_datetime BETWEEN $start_date AND $end_date.
+4. The sql_params defaults must be plain ISO 8601 strings for date or timestamp values.
+5. Use one query whenever possible. Only if the question needs separate result sets that cannot be combined (for example different metrics over different groupings), return up to {MAX_PARALLEL_QUERIES} independent queries; they run in parallel.
+6. For follow-up questions, start from the SQL in CONVERSATION SO FAR and resolve references like "that" or "the same period" from it.
+7. Return a GeneratedQueries object whose 'queries' each have 'sql_query' and 'sql_params'."""
+
+ANALYST_INSTRUCTIONS = """ROLE: Senior Data Analyst. Your job is to interpret the results of a SQL query.
+
+INSTRUCTIONS:
+1. Keep the response short, clear, and direct.
+2. If errors exist, explain the issue in plain language and, if useful, mention a simple fix.
+3. If results exist, summarize the main finding only. Do not add extra caveats or commentary about placeholder variables, date parameters, or query mechanics.
+4. If results are empty, say that no rows matched the query and keep it brief.
+
+Be precise and avoid unnecessary explanation."""
+
+SYNTHESIZER_INSTRUCTIONS = """ROLE: The final voice of the DataNexus AI.
+Write a concise final answer based on the Analyst's insights.
+
+Keep it short and natural. Do not mention placeholder variables, query execution details, or suggest follow-up questions unless the user clearly needs one."""
+
+def shared_prefix(config: RunnableConfig) -> SystemMessage:
+    schema = config["configurable"].get("table_schema", "No schema provided")
+    return SystemMessage(content=SHARED_SYSTEM_PROMPT.format(schema=schema))
+
+def build_prompt(config: RunnableConfig, instructions: str, sections: dict[str, str]) -> list[BaseMessage]:
+    """Shared prefix, then the node's static instructions, then the variable sections."""
+    body = "\n\n".join([instructions] + [f"{title}:\n{value}" for title, value in sections.items()])
+    return [shared_prefix(config), HumanMessage(content=body)]
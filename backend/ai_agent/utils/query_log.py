@@ -0,0 +1,333 @@
+"""
+Query log and slow-query profiles for DuckDB.
+
+The app's DuckDB queries run inside `record_query`, which logs their SQL,
+params, duration and row count and feeds the query metrics. Queries slower
+than SLOW_QUERY_MS are grouped per project by fingerprint (the SQL with its
+literals and whitespace normalised). A read-only one is then run again in the
+background under EXPLAIN ANALYZE with DuckDB's JSON profiling on, and its
+operator tree is kept with the fingerprint's stats. Each fingerprint's stats
+and latest profile are saved to projects/<project>/slow_queries/<fingerprint>.json,
+so they outlive restarts and the in-memory MAX_FINGERPRINTS limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable
+import duckdb
+from ai_agent.utils.metrics import DUCKDB_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("DATANEXUS_SLOW_QUERY_MS", "500"))
+# Set to 0 to log slow queries without profiling them.
+SLOW_QUERY_PROFILE = os.getenv("DATANEXUS_SLOW_QUERY_PROFILE", "1") != "0"
+# A fingerprint is profiled again at most this often; a profiling run is
+# interrupted after PROFILE_TIMEOUT seconds.
+PROFILE_INTERVAL = float(os.getenv("DATANEXUS_SLOW_QUERY_PROFILE_INTERVAL_SECONDS", "600"))
+PROFILE_TIMEOUT = float(os.getenv("DATANEXUS_SLOW_QUERY_PROFILE_TIMEOUT_SECONDS", "60"))
+# Fingerprints kept in memory per project; the least recently seen one is
+# dropped, and read back from its file if it is slow again.
+MAX_FINGERPRINTS = int(os.getenv("DATANEXUS_SLOW_QUERY_MAX_FINGERPRINTS", "200"))
+SQL_LOG_CHARS = 300
+PROJECTS_DIR = "projects"
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+def normalize_sql(sql: str) -> str:
+    """The SQL with comments dropped, literals replaced by ? and whitespace
+    collapsed, so runs that differ only in values share a fingerprint."""
+    sql = _COMMENT.sub(" ", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _VALUE_LIST.sub("(?)", sql)
+    return _SPACE.sub(" ", sql).strip().rstrip(";").strip().lower()
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:16]
+
+def _preview(sql: str) -> str:
+    sql = _SPACE.sub(" ", sql).strip()
+    return sql if len(sql) <= SQL_LOG_CHARS else sql[:SQL_LOG_CHARS] + "..."
+
+def is_read_only(cursor, sql: str) -> bool:
+    statements = cursor.extract_statements(sql)
+    return bool(statements) and all(s.type == duckdb.StatementType.SELECT for s in statements)
+
+def _operator(node: dict) -> dict:
+    return {
+        "operator": node.get("operator_name") or node.get("operator_type"),
+        "ms": round((node.get("operator_timing") or 0) * 1000, 3),
+        "rows": node.get("operator_cardinality"),
+        "rows_scanned": node.get("operator_rows_scanned"),
+        "info": node.get("extra_info") or {},
+        "children": [_operator(child) for child in node.get("children", [])],
+    }
+
+def profile_query(conn, sql: str, params: dict, setup: Callable | None = None) -> dict:
+    """Runs the query under EXPLAIN ANALYZE on its own cursor (the rows are
+    counted but not returned) and returns DuckDB's operator tree."""
+    cursor = conn.cursor()
+    timer = threading.Timer(PROFILE_TIMEOUT, cursor.interrupt)
+    timer.daemon = True
+    try:
+        if not is_read_only(cursor, sql):
+            raise ValueError("Only read-only queries are profiled")
+        if setup is not None:
+            setup(cursor)
+        cursor.execute("SET enable_profiling = 'no_output'")
+        timer.start()
+        started = time.perf_counter()
+        cursor.execute(f"EXPLAIN ANALYZE {sql}", params).fetchall()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        root = json.loads(cursor.get_profiling_information(format="json"))
+    finally:
+        timer.cancel()
+        cursor.close()
+
+    operators = [_operator(child) for child in root.get("children", [])]
+    # Drop the EXPLAIN_ANALYZE operator wrapping the query's own plan.
+    while len(operators) == 1 and operators[0]["operator"] == "EXPLAIN_ANALYZE":
+        operators = operators[0]["children"]
+    return {
+        "ms": round(elapsed_ms, 1),
+        "cpu_ms": round((root.get("cpu_time") or 0) * 1000, 1),
+        "rows_scanned": root.get("cumulative_rows_scanned"),
+        "peak_buffer_memory": root.get("system_peak_buffer_memory"),
+        "operators": operators,
+    }
+
+class SlowQuery:
+    """Slow runs of one query fingerprint within a project."""
+
+    def __init__(self, fingerprint: str, normalized_sql: str):
+        self.fingerprint = fingerprint
+        self.normalized_sql = normalized_sql
+        self.sql = ""
+        self.params: dict = {}
+        self.sources: set[str] = set()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.last_rows = None
+        self.last_seen = 0.0
+        self.profile: dict | None = None
+        self.profile_error: str | None = None
+        self.profiled_at: float | None = None
+        self.profiling = False
+
+    def add(self, source: str, sql: str, params: dict, ms: float, rows: int | None):
+        self.sql = sql
+        self.params = {k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v) for k, v in params.items()}
+        self.sources.add(source)
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.last_ms = ms
+        self.last_rows = rows
+        self.last_seen = time.time()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SlowQuery":
+        entry = cls(data["fingerprint"], data["normalized_sql"])
+        entry.sql = data["sql"]
+        entry.params = data["params"]
+        entry.sources = set(data["sources"])
+        entry.count = data["count"]
+        entry.total_ms = data["total_ms"]
+        entry.max_ms = data["max_ms"]
+        entry.last_ms = data["last_ms"]
+        entry.last_rows = data["last_rows"]
+        entry.last_seen = data["last_seen"]
+        entry.profile = data.get("profile")
+        entry.profile_error = data["profile_error"]
+        entry.profiled_at = data["profiled_at"]
+        return entry
+
+    def profile_due(self) -> bool:
+        return not self.profiling and (self.profiled_at is None or time.time() - self.profiled_at >= PROFILE_INTERVAL)
+
+    def as_dict(self, with_profile: bool = False) -> dict:
+        entry = {
+            "fingerprint": self.fingerprint,
+            "normalized_sql": self.normalized_sql,
+            "sql": self.sql,
+            "params": self.params,
+            "sources": sorted(self.sources),
+            "count": self.count,
+            "total_ms": round(self.total_ms, 1),
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1),
+            "last_rows": self.last_rows,
+            "last_seen": self.last_seen,
+            "profiled_at": self.profiled_at,
+            "profile_error": self.profile_error,
+            "has_profile": self.profile is not None,
+        }
+        if with_profile:
+            entry["profile"] = self.profile
+        return entry
+
+class QueryLog:
+    """Slow queries per project. Profiling and saving run one at a time on a
+    background thread, so profiling adds at most one query to DuckDB's load
+    and the files are written in order."""
+
+    def __init__(self, root: str = PROJECTS_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.projects: dict[str, dict[str, SlowQuery]] = {}
+        self.profiler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-profile")
+
+    def _dir(self, project: str) -> str:
+        # The project's folder, named as ProjectDataHandler names it.
+        return os.path.join(self.root, project.replace(" ", "_"), "slow_queries")
+
+    def _read(self, project: str, fp: str) -> dict | None:
+        if not re.fullmatch(r"[0-9a-f]+", fp):
+            return None
+        try:
+            with open(os.path.join(self._dir(project), f"{fp}.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning("query: unreadable slow query file | project=%s fingerprint=%s", project, fp)
+            return None
+
+    def _save(self, project: str, entry: SlowQuery):
+        # Taken when the write runs, so a queued write never undoes a newer one.
+        with self.lock:
+            data = entry.as_dict(with_profile=True)
+        directory = self._dir(project)
+        path = os.path.join(directory, f"{data['fingerprint']}.json")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("query: could not save slow query | project=%s fingerprint=%s", project, data["fingerprint"])
+
+    def record(self, conn, project: str | None, source: str, sql: str, params: dict, seconds: float,
+               rows: int | None, error: BaseException | None = None, setup: Callable | None = None):
+        DUCKDB_QUERY_SECONDS.labels(source).observe(seconds)
+        ms = seconds * 1000
+        slow = ms >= SLOW_QUERY_MS
+        if error is not None:
+            logger.info(
+                "query: failed | source=%s project=%s ms=%.1f params=%s error=%s sql='%s'",
+                source, project, ms, params, type(error).__name__, _preview(sql),
+            )
+            return
+        (logger.warning if slow else logger.info)(
+            "query: %s | source=%s project=%s ms=%.1f rows=%s params=%s sql='%s'",
+            "slow" if slow else "ok", source, project, ms, rows, params, _preview(sql),
+        )
+        if not slow or project is None:
+            return
+
+        fp = fingerprint(sql)
+        with self.lock:
+            entries = self.projects.setdefault(project, {})
+            entry = entries.get(fp)
+            if entry is None:
+                if len(entries) >= MAX_FINGERPRINTS:
+                    del entries[min(entries.values(), key=lambda e: e.last_seen).fingerprint]
+                # Carry on from the saved stats and profile of an earlier run.
+                saved = self._read(project, fp)
+                entry = entries[fp] = SlowQuery.from_dict(saved) if saved else SlowQuery(fp, normalize_sql(sql))
+            entry.add(source, sql, params, ms, rows)
+            profile = SLOW_QUERY_PROFILE and conn is not None and entry.profile_due()
+            if profile:
+                entry.profiling = True
+        if profile:
+            self.profiler.submit(self._profile, conn, project, entry, sql, params, setup)
+        else:
+            self.profiler.submit(self._save, project, entry)
+
+    def _profile(self, conn, project: str, entry: SlowQuery, sql: str, params: dict, setup: Callable | None):
+        profile, error = None, None
+        try:
+            profile = profile_query(conn, sql, params, setup)
+            logger.info("query: profiled slow query | project=%s fingerprint=%s ms=%.1f", project, entry.fingerprint, profile["ms"])
+        except Exception as e:
+            error = str(e)
+            logger.warning("query: could not profile slow query | project=%s fingerprint=%s error=%s", project, entry.fingerprint, e)
+        with self.lock:
+            entry.profiling = False
+            entry.profiled_at = time.time()
+            entry.profile_error = error
+            if profile is not None:
+                entry.profile = profile
+        self._save(project, entry)
+
+    def top(self, project: str, limit: int = 20, order_by: str = "total_ms") -> list[dict]:
+        """The project's saved slow fingerprints, worst first by `order_by`
+        (total_ms, max_ms, avg_ms or count), without their profiles."""
+        entries = []
+        try:
+            names = os.listdir(self._dir(project))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if name.endswith(".json"):
+                data = self._read(project, name[:-len(".json")])
+                if data is not None:
+                    data.pop("profile", None)
+                    entries.append(data)
+        return sorted(entries, key=lambda e: e[order_by], reverse=True)[:limit]
+
+    def get(self, project: str, fp: str) -> dict | None:
+        """One saved fingerprint's stats and profile."""
+        return self._read(project, fp)
+
+    def flush(self):
+        """Waits for the profiling runs and saves queued so far."""
+        self.profiler.submit(lambda: None).result()
+
+    def clear(self, project: str):
+        with self.lock:
+            self.projects.pop(project, None)
+
+    def close(self):
+        """Drops profiling runs that haven't started."""
+        self.profiler.shutdown(wait=False, cancel_futures=True)
+
+query_log = QueryLog()
+
+class RecordedQuery:
+    """Set `rows` once the result is known; it is logged with the query."""
+
+    def __init__(self):
+        self.rows: int | None = None
+
+@contextmanager
+def record_query(conn, project: str | None, source: str, sql: str, params: dict | None = None, setup: Callable | None = None):
+    """Times the DuckDB work in the block and records it in the query log.
+    `setup` prepares a profiling cursor the way the query's own cursor was
+    (e.g. pointing it at the table samples)."""
+    query = RecordedQuery()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield query
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        query_log.record(conn, project, source, sql, params or {}, time.perf_counter() - started, query.rows, error, setup)
@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Samples live in an in-memory catalog attached to the project database, so
+# they are shared by every cursor but never written to the project file.
+SAMPLE_CATALOG = "datanexus_samples"
+SAMPLE_PERCENT = float(os.getenv("DATANEXUS_PREVIEW_SAMPLE_PERCENT", "1"))
+# Tables smaller than this are fast enough to query in full.
+PREVIEW_MIN_ROWS = int(os.getenv("DATANEXUS_PREVIEW_MIN_ROWS", "1000000"))
+
+_refresh_task: asyncio.Task | None = None
+# Bumped by every path that writes to a project's tables: an UPDATE, or a
+# DELETE and INSERT of as many rows, leaves the table versions unchanged.
+_generation = itertools.count(1)
+_data_generations: dict[str | None, int] = {}
+
+def _attach(cursor):
+    cursor.execute(f"ATTACH IF NOT EXISTS ':memory:' AS {SAMPLE_CATALOG}")
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {SAMPLE_CATALOG}.main._versions (table_name VARCHAR PRIMARY KEY, version VARCHAR)")
+
+def table_versions(cursor, min_rows: int = 0) -> dict[str, str]:
+    """Base tables of the project with at least `min_rows` rows, and a version
+    key that changes when a table is replaced, altered or grows."""
+    rows = cursor.execute(
+        """SELECT table_name, table_oid, estimated_size, column_count
+           FROM duckdb_tables()
+           WHERE database_name = current_database() AND schema_name = 'main'
+             AND NOT temporary AND estimated_size >= ?""",
+        [min_rows],
+    ).fetchall()
+    return {name: f"{oid}:{size}:{columns}" for name, oid, size, columns in rows}
+
+def data_generation(project: str | None) -> int:
+    return _data_generations.get(project, 0)
+
+def bump_data_generation(project: str | None):
+    """Marks the project's data as changed by a write."""
+    _data_generations[project] = next(_generation)
+
+def _sample_versions(cursor) -> dict[str, str]:
+    return dict(cursor.execute(f"SELECT table_name, version FROM {SAMPLE_CATALOG}.main._versions").fetchall())
+
+def _refresh(conn):
+    cursor = conn.cursor()
+    try:
+        _attach(cursor)
+        database = cursor.execute("SELECT current_database()").fetchone()[0]
+        current = table_versions(cursor, PREVIEW_MIN_ROWS)
+        sampled = _sample_versions(cursor)
+        for table, version in current.items():
+            if sampled.get(table) == version:
+                continue
+            logger.info("sampling: building %s%% sample | table=%s", SAMPLE_PERCENT, table)
+            cursor.execute(
+                f'CREATE OR REPLACE TABLE {SAMPLE_CATALOG}.main."{table}" AS '
+                f'SELECT * FROM "{database}".main."{table}" USING SAMPLE reservoir({SAMPLE_PERCENT} PERCENT) REPEATABLE (42)'
+            )
+            cursor.execute(f"INSERT OR REPLACE INTO {SAMPLE_CATALOG}.main._versions VALUES (?, ?)", [table, version])
+        for table in sampled.keys() - current.keys():
+            cursor.execute(f'DROP TABLE IF EXISTS {SAMPLE_CATALOG}.main."{table}"')
+            cursor.execute(f"DELETE FROM {SAMPLE_CATALOG}.main._versions WHERE table_name = ?", [table])
+    finally:
+        cursor.close()
+
+def _ready_tables(conn) -> tuple[set[str], bool]:
+    cursor = conn.cursor()
+    try:
+        _attach(cursor)
+        current = table_versions(cursor, PREVIEW_MIN_ROWS)
+        sampled = _sample_versions(cursor)
+    finally:
+        cursor.close()
+    ready = {table for table, version in current.items() if sampled.get(table) == version}
+    stale = len(ready) != len(current) or len(sampled) != len(current)
+    return ready, stale
+
+async def _run_refresh(conn):
+    try:
+        await asyncio.to_thread(_refresh, conn)
+    except Exception:
+        logger.exception("sampling: failed to refresh table samples")
+
+async def ready_samples(conn) -> set[str]:
+    """Tables whose sample matches the current table version. Missing or
+    stale samples are rebuilt in the background and used by later runs, so a
+    question never waits for a sample to be built."""
+    global _refresh_task
+    ready, stale = await asyncio.to_thread(_ready_tables, conn)
+    if stale and (_refresh_task is None or _refresh_task.done()):
+        _refresh_task = asyncio.create_task(_run_refresh(conn))
+    return ready
+
+def referenced_tables(sql_query: str, tables: set[str]) -> list[str]:
+    return sorted(t for t in tables if re.search(rf'(?<![\w."]){re.escape(t)}(?![\w"])|"{re.escape(t)}"', sql_query, re.IGNORECASE))
+
+def use_samples(cursor):
+    """Resolves unqualified table names on this cursor to their samples first;
+    tables without a sample fall through to the project database."""
+    database = cursor.execute("SELECT current_database()").fetchone()[0]
+    cursor.execute(f"SET search_path = '{SAMPLE_CATALOG}.main,{database}.main'")
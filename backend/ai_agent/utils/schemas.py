@@ -18,3 +18,9 @@ class SQLVariable(BaseModel):
 class GeneratedQuery(BaseModel):
     sql_query: str = Field(description="The parameterized DuckDB SQL query using $variable_name syntax.")
     sql_params: List[SQLVariable] = Field(description="A dictionary of the variables and their exact values needed to execute this specific query. You need to set the name, type, default value and description for each variable.")
+
+class GeneratedQueries(BaseModel):
+    queries: List[GeneratedQuery] = Field(description="One GeneratedQuery per independent result set needed to answer the question. Use a single query unless the question asks for separate results that cannot be combined into one query.")
+
+class ChatTitles(BaseModel):
+    titles: List[str] = Field(description="One short title of at most 4 words per numbered message, in the same order.")
@@ -0,0 +1,148 @@
+import difflib
+import re
+import duckdb
+
+MAX_REPAIR_ATTEMPTS = 3
+FUZZY_CUTOFF = 0.75
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_MISSING_TABLE = re.compile(r'Table with name "?([^"\s!]+)"? does not exist')
+_SUGGESTED_TABLE = re.compile(r'Did you mean "([^"]+)"')
+_MISSING_COLUMN = re.compile(r'Referenced column "([^"]+)" not found')
+_MISSING_QUALIFIED_COLUMN = re.compile(r'Table "([^"]+)" does not have a column named "([^"]+)"')
+_SIMPLE_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[^0-9a-z]", "", name.lower())
+
+def _quote(name: str) -> str:
+    if _SIMPLE_IDENTIFIER.match(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+def _closest(name: str, candidates: list[str]) -> str | None:
+    normalized = {_normalize(c): c for c in candidates}
+    key = _normalize(name)
+    if key in normalized:
+        return normalized[key]
+    matches = difflib.get_close_matches(key, list(normalized), n=1, cutoff=FUZZY_CUTOFF)
+    return normalized[matches[0]] if matches else None
+
+def _words(name: str) -> str:
+    # A bare multi-word name may be written with any whitespace between words.
+    return r"\s+".join(re.escape(word) for word in name.split())
+
+def _sub_outside_literals(sql: str, pattern: re.Pattern, repl) -> str:
+    parts = []
+    last = 0
+    for literal in _STRING_LITERAL.finditer(sql):
+        parts.append(pattern.sub(repl, sql[last:literal.start()]))
+        parts.append(literal.group(0))
+        last = literal.end()
+    parts.append(pattern.sub(repl, sql[last:]))
+    return "".join(parts)
+
+def _replace_identifier(sql: str, wrong: str, right: str, after_dot: bool = False) -> str:
+    """Replaces `wrong` (quoted or bare) with `right` outside of string literals.
+    With `after_dot` it is also replaced where it follows a qualifier (t.wrong)."""
+    lookbehind = r'(?<![\w"$])' if after_dot else r'(?<![\w"$.])'
+    pattern = re.compile(r'"' + re.escape(wrong) + r'"|' + lookbehind + _words(wrong) + r'(?![\w"])', re.IGNORECASE)
+    return _sub_outside_literals(sql, pattern, lambda _: _quote(right))
+
+def _replace_qualified(sql: str, qualifier: str, wrong: str, right: str) -> str:
+    """Replaces the column `wrong` with `right` where it is qualified by `qualifier` (t.wrong)."""
+    pattern = re.compile(
+        r'((?<![\w"$.])' + re.escape(qualifier) + r'|"' + re.escape(qualifier) + r'")\s*\.\s*'
+        r'(?:"' + re.escape(wrong) + r'"|' + _words(wrong) + r'(?![\w"]))',
+        re.IGNORECASE,
+    )
+    return _sub_outside_literals(sql, pattern, lambda m: m.group(1) + "." + _quote(right))
+
+def load_schema_names(conn) -> tuple[list[str], list[str]]:
+    # Only the project's own tables; the attached sample catalog is internal.
+    rows = conn.execute(
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_catalog = current_database() AND table_schema = 'main' "
+        "ORDER BY table_name, ordinal_position"
+    ).fetchall()
+    tables = list(dict.fromkeys(r[0] for r in rows))
+    columns = list(dict.fromkeys(r[1] for r in rows))
+    return tables, columns
+
+def explain_sql(conn, sql_query: str, params: dict) -> str | None:
+    """Binds and plans the query with EXPLAIN without running it.
+    Returns the error message, or None if the query is valid."""
+    try:
+        conn.execute(f"EXPLAIN {sql_query}", params or None)
+        return None
+    except duckdb.Error as e:
+        return str(e)
+
+def _quote_spaced_columns(sql_query: str, columns: list[str]) -> str:
+    """Quotes bare or qualified (t.Pickup Borough) uses of multi-word columns."""
+    # Longest first, so "Fare Amount Total" is quoted before "Fare Amount".
+    for column in sorted(columns, key=len, reverse=True):
+        if not _SIMPLE_IDENTIFIER.match(column):
+            sql_query = _replace_identifier(sql_query, column, column, after_dot=True)
+    return sql_query
+
+def _fix_from_error(sql_query: str, error: str, tables: list[str], columns: list[str]) -> str | None:
+    if error.startswith("Parser Error"):
+        # Unquoted multi-word columns (common in CSV-derived tables) fail to parse.
+        spaced = _quote_spaced_columns(sql_query, columns)
+        return spaced if spaced != sql_query else None
+
+    missing_table = _MISSING_TABLE.search(error)
+    if missing_table:
+        match = _closest(missing_table.group(1), tables)
+        suggested = _SUGGESTED_TABLE.search(error)
+        if match is None and suggested and suggested.group(1) in tables:
+            match = suggested.group(1)
+        if match:
+            return _replace_identifier(sql_query, missing_table.group(1), match)
+
+    missing_column = _MISSING_COLUMN.search(error)
+    if missing_column:
+        wrong = missing_column.group(1)
+        # A bare multi-word column fails on its first word; quote the whole name.
+        spaced = _quote_spaced_columns(sql_query, [c for c in columns if c.lower().startswith(wrong.lower() + " ")])
+        if spaced != sql_query:
+            return spaced
+        match = _closest(wrong, columns)
+        if match:
+            return _replace_identifier(sql_query, wrong, match)
+
+    missing_qualified = _MISSING_QUALIFIED_COLUMN.search(error)
+    if missing_qualified:
+        qualifier, wrong = missing_qualified.groups()
+        spaced = _quote_spaced_columns(sql_query, [c for c in columns if c.lower().startswith(wrong.lower() + " ")])
+        if spaced != sql_query:
+            return spaced
+        match = _closest(wrong, columns)
+        if match:
+            return _replace_qualified(sql_query, qualifier, wrong, match)
+
+    return None
+
+def repair_sql(conn, sql_query: str, params: dict, max_attempts: int = MAX_REPAIR_ATTEMPTS) -> tuple[str, str | None, list[str]]:
+    """Validates a query and applies deterministic fixes (identifier quoting,
+    fuzzy table/column matching against the schema) until it binds.
+    Returns the final query, the remaining error (None when valid) and a
+    description of each applied fix."""
+    error = explain_sql(conn, sql_query, params)
+    if error is None:
+        return sql_query, None, []
+
+    tables, columns = load_schema_names(conn)
+    fixes = []
+    for _ in range(max_attempts):
+        fixed = _fix_from_error(sql_query, error, tables, columns)
+        if fixed is None or fixed == sql_query:
+            break
+        fixes.append(error.splitlines()[0])
+        sql_query = fixed
+        error = explain_sql(conn, sql_query, params)
+        if error is None:
+            break
+
+    return sql_query, error, fixes
@@ -1,7 +1,7 @@
 from typing import TypedDict, Annotated, Union
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
-from ai_agent.utils.schemas import SQLVariable
+from ai_agent.utils.schemas import GeneratedQuery
 from typing import List
 from ai_agent.utils.messages import CanvasMessage
 
@@ -11,9 +11,12 @@ class AppState(TypedDict):
     messages: Annotated[list[CustomMessage], add_messages]
     plan: list[str]
 
-    sql_query: str
-    sql_params: List[SQLVariable] | None
+    queries: List[GeneratedQuery]
 
-    db_results: list
+    db_results: str
     errors: str
     analysis: str
+    full_results_pending: bool
+
+    # Rolling summary of earlier turns, see ai_agent.utils.memory.
+    memory: dict
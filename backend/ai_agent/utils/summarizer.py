@@ -0,0 +1,79 @@
+import json
+import pandas as pd
+
+MAX_COLUMNS = 20
+TOP_K = 5
+SAMPLE_ROWS = 3
+MAX_VALUE_LEN = 40
+
+def _clip(value, max_len: int = MAX_VALUE_LEN):
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = str(value)
+    if len(text) <= max_len:
+        return text
+    return text[: max_len - 3] + "..."
+
+def _format_number(value) -> str:
+    if pd.isna(value):
+        return "null"
+    return f"{float(value):.6g}"
+
+def _describe_column(series: pd.Series) -> str:
+    nulls = int(series.isna().sum())
+    header = f"- {series.name} ({series.dtype}, nulls={nulls})"
+
+    if pd.api.types.is_bool_dtype(series):
+        values = series.dropna()
+    elif pd.api.types.is_numeric_dtype(series):
+        return (
+            f"{header}: min={_format_number(series.min())}"
+            f" max={_format_number(series.max())}"
+            f" mean={_format_number(series.mean())}"
+        )
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        return f"{header}: min={_clip(series.min())} max={_clip(series.max())}"
+    else:
+        values = series.dropna().astype(str)
+
+    if values.empty:
+        return f"{header}: no values"
+    counts = values.value_counts().head(TOP_K)
+    top = ", ".join(f"{_clip(k)!s} ({v})" for k, v in counts.items())
+    return f"{header}: distinct={values.nunique()} top={top}"
+
+def _format_rows(df: pd.DataFrame) -> str:
+    records = [
+        {str(k): _clip(v) for k, v in row.items()}
+        for row in df.to_dict(orient="records")
+    ]
+    return json.dumps(records, default=str)
+
+def summarize_results(df: pd.DataFrame) -> str:
+    """Builds a bounded-size text digest of a query result for LLM prompts.
+
+    The digest has a fixed number of columns, categories and sample rows,
+    so its size does not grow with the number of result rows."""
+    row_count, column_count = df.shape
+    lines = [f"Shape: {row_count} rows x {column_count} columns"]
+
+    columns = list(df.columns[:MAX_COLUMNS])
+    if column_count > MAX_COLUMNS:
+        lines.append(f"(showing the first {MAX_COLUMNS} columns)")
+
+    if row_count == 0:
+        lines.append("Columns: " + ", ".join(f"{c} ({df[c].dtype})" for c in columns))
+        lines.append("No rows returned.")
+        return "\n".join(lines)
+
+    lines.append("Columns:")
+    lines.extend(_describe_column(df[c]) for c in columns)
+
+    sample = df[columns]
+    if row_count <= SAMPLE_ROWS * 2:
+        lines.append(f"Rows: {_format_rows(sample)}")
+    else:
+        lines.append(f"First rows: {_format_rows(sample.head(SAMPLE_ROWS))}")
+        lines.append(f"Last rows: {_format_rows(sample.tail(SAMPLE_ROWS))}")
+
+    return "\n".join(lines)
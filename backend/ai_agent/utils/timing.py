@@ -0,0 +1,78 @@
+import logging
+import threading
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from ai_agent.utils.metrics import OLLAMA_REQUEST_SECONDS, OLLAMA_TOKENS, OLLAMA_TOKENS_PER_SECOND
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_totals: dict[str, dict[str, float]] = {}
+
+def _ms(value) -> float:
+    return (value or 0) / 1e6
+
+def ollama_timing(metadata: dict) -> dict:
+    """Extracts Ollama's timing fields (reported in nanoseconds) as milliseconds.
+    A small prompt_eval_count relative to the prompt means the prefix cache was hit."""
+    return {
+        "load_ms": _ms(metadata.get("load_duration")),
+        "prompt_eval_ms": _ms(metadata.get("prompt_eval_duration")),
+        "prompt_eval_count": metadata.get("prompt_eval_count") or 0,
+        "eval_ms": _ms(metadata.get("eval_duration")),
+        "eval_count": metadata.get("eval_count") or 0,
+        "total_ms": _ms(metadata.get("total_duration")),
+    }
+
+def record_timing(node: str, timing: dict):
+    with _lock:
+        totals = _totals.setdefault(node, {"calls": 0})
+        totals["calls"] += 1
+        for key, value in timing.items():
+            totals[key] = totals.get(key, 0) + value
+    OLLAMA_REQUEST_SECONDS.labels(node).observe(timing["total_ms"] / 1000)
+    OLLAMA_TOKENS.labels(node, "prompt").inc(timing["prompt_eval_count"])
+    OLLAMA_TOKENS.labels(node, "completion").inc(timing["eval_count"])
+    if timing["eval_ms"]:
+        OLLAMA_TOKENS_PER_SECOND.labels(node).observe(timing["eval_count"] / (timing["eval_ms"] / 1000))
+
+def get_llm_timings() -> dict:
+    """Per-node averages of the Ollama timings recorded since startup."""
+    with _lock:
+        return {
+            node: {"calls": int(t["calls"]), **{k: round(v / t["calls"], 2) for k, v in t.items() if k != "calls"}}
+            for node, t in _totals.items()
+        }
+
+class OllamaTimingHandler(AsyncCallbackHandler):
+    """Logs prompt-eval vs eval time from Ollama's response metadata for one node."""
+
+    def __init__(self, node: str):
+        self.node = node
+
+    async def on_llm_end(self, response: LLMResult, **kwargs):
+        metadata = {}
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                metadata = generation.generation_info or getattr(message, "response_metadata", None) or metadata
+        if "total_duration" not in metadata:
+            return
+
+        timing = ollama_timing(metadata)
+        record_timing(self.node, timing)
+        logger.info(
+            "%s: ollama timing | prompt_eval=%.0fms (%s tokens) | eval=%.0fms (%s tokens) | load=%.0fms",
+            self.node,
+            timing["prompt_eval_ms"],
+            timing["prompt_eval_count"],
+            timing["eval_ms"],
+            timing["eval_count"],
+            timing["load_ms"],
+        )
+
+def timing_config(config: RunnableConfig, node: str) -> RunnableConfig:
+    """The node's config with a timing handler added to its callbacks."""
+    return merge_configs(config, {"callbacks": [OllamaTimingHandler(node)]})
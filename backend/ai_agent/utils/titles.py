@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+TITLE_BATCH_SIZE = int(os.getenv("DATANEXUS_TITLE_BATCH_SIZE", "8"))
+# How long a chat waits for the model to be free before its keyword title is kept.
+TITLE_MAX_WAIT = float(os.getenv("DATANEXUS_TITLE_MAX_WAIT_SECONDS", "60"))
+IDLE_POLL_INTERVAL = 0.5
+MAX_TITLE_WORDS = 4
+MAX_TITLE_LEN = 60
+
+STOPWORDS = {
+    "a", "about", "above", "after", "all", "also", "an", "and", "any", "are", "as", "at", "be", "been",
+    "between", "but", "by", "can", "could", "did", "do", "does", "each", "for", "from", "get", "give",
+    "had", "has", "have", "how", "i", "if", "in", "into", "is", "it", "its", "just", "know", "let",
+    "list", "many", "me", "much", "my", "need", "of", "on", "or", "our", "over", "please", "show",
+    "so", "some", "tell", "than", "that", "the", "their", "them", "then", "there", "these", "this",
+    "those", "to", "was", "we", "were", "what", "when", "where", "which", "who", "why", "will", "with",
+    "would", "you", "your",
+}
+
+def heuristic_title(message: str) -> str:
+    """Instant title from the first few keywords of the message."""
+    words = re.findall(r"[A-Za-z0-9][A-Za-z0-9_'-]*", message)
+    keywords = []
+    for word in words:
+        if word.lower() in STOPWORDS or word.lower() in (k.lower() for k in keywords):
+            continue
+        keywords.append(word)
+        if len(keywords) == MAX_TITLE_WORDS:
+            break
+    if not keywords:
+        keywords = words[:MAX_TITLE_WORDS]
+    title = " ".join(w if w.isupper() else w.capitalize() for w in keywords)
+    return title[:MAX_TITLE_LEN] or "New Chat"
+
+def _clean_title(title: str) -> str:
+    return " ".join(title.replace('"', "").split())[:MAX_TITLE_LEN]
+
+async def _until_preempted(coro, preempted: asyncio.Event):
+    """Runs `coro`, cancelling it if `preempted` is set first. Returns its
+    result, or None if it was cancelled."""
+    task = asyncio.ensure_future(coro)
+    stop = asyncio.ensure_future(preempted.wait())
+    try:
+        await asyncio.wait({task, stop}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stop.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    return None if task.cancelled() else task.result()
+
+class TitleWorker:
+    """Generates chat titles in the background at low priority.
+
+    New chats get a keyword title right away. The worker then waits for the
+    model to have nothing else running or queued, and names every pending
+    chat in one batched LLM call. The call is cancelled as soon as a chat
+    request has to wait for the model, and the batch is retried later. Chats that wait longer than TITLE_MAX_WAIT
+    keep their keyword title. `on_title(thread_id, title, previous)` stores a
+    title and is run in a worker thread."""
+
+    def __init__(self, on_title: Callable[[str, str, str], None]):
+        self.on_title = on_title
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: asyncio.Task | None = None
+
+    def submit(self, thread_id: str, message: str) -> str:
+        """Queues a chat for an LLM title and returns its instant keyword title.
+
+        Must be called on the worker's event loop."""
+        fallback = heuristic_title(message)
+        self.queue.put_nowait((thread_id, message, fallback, time.monotonic()))
+        return fallback
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def _drain(self, batch: list):
+        while len(batch) < TITLE_BATCH_SIZE and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            try:
+                await self._process(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("TitleWorker: failed to generate titles | chats=%s", len(batch))
+
+    async def _process(self, batch: list):
+        # Imported here so main doesn't load the model clients at startup.
+        from ai_agent.utils.gateway import llm_gateway
+        self._drain(batch)
+        while True:
+            # Chats that waited too long keep their keyword title.
+            now = time.monotonic()
+            expired = [item for item in batch if now - item[3] > TITLE_MAX_WAIT]
+            if expired:
+                logger.info("TitleWorker: model busy, keeping keyword titles | chats=%s", len(expired))
+                batch[:] = [item for item in batch if item not in expired]
+                self._drain(batch)
+            if not batch:
+                return
+            async with llm_gateway.idle_slot() as preempted:
+                if preempted is not None:
+                    titles = await _until_preempted(self._generate([item[1] for item in batch]), preempted)
+                    if titles is not None:
+                        break
+                    # A chat is waiting for the model: it goes first, the batch is retried later.
+                    logger.info("TitleWorker: gave the model up to a chat | chats=%s", len(batch))
+            await asyncio.sleep(IDLE_POLL_INTERVAL)
+            self._drain(batch)
+
+        for (thread_id, _, fallback, _), title in zip(batch, titles):
+            title = _clean_title(title) or fallback
+            logger.info("TitleWorker: generated chat title '%s' | thread_id=%s", title, thread_id)
+            await asyncio.to_thread(self.on_title, thread_id, title, fallback)
+
+    async def _generate(self, messages: list[str]) -> list[str]:
+        numbered = "\n".join(f"{i}. {message}" for i, message in enumerate(messages, start=1))
+        prompt = (
+            f"Write a title of at most {MAX_TITLE_WORDS} words for each numbered chat message below. "
+            f"Return exactly {len(messages)} titles in the same order.\n\n{numbered}"
+        )
+        from ai_agent.utils.models import title_llm
+        result = await title_llm.ainvoke(prompt)
+        titles = list(result.titles)[: len(messages)]
+        # Missing titles keep the keyword title.
+        return titles + [""] * (len(messages) - len(titles))
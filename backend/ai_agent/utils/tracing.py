@@ -0,0 +1,113 @@
+import time
+from ai_agent.utils.messages import CanvasMessage
+
+TRACED_NODES = {"planner", "sql_agent", "sql_validator", "executor_tool", "analyst_agent", "synthesizer_node"}
+PERCENTILES = (50, 90, 99)
+
+class RunTracer:
+    """Builds a per-node trace of one agent run from its `astream_events` stream.
+
+    Each span records wall time, prompt/completion tokens, generation speed,
+    the attempt number (attempts > 1 are retries) and result row counts."""
+
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.open_spans: dict[str, dict] = {}
+        self.attempts: dict[str, int] = {}
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def _current_span(self, node: str | None) -> dict | None:
+        for span in reversed(list(self.open_spans.values())):
+            if span["node"] == node:
+                return span
+        return None
+
+    def observe(self, event: dict):
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if kind == "on_chain_start" and event["name"] == node and node in TRACED_NODES:
+            self.attempts[node] = self.attempts.get(node, 0) + 1
+            self.open_spans[event["run_id"]] = {
+                "node": node,
+                "attempt": self.attempts[node],
+                "start_ms": round(self._elapsed_ms(), 2),
+                "wall_ms": None,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "tokens_per_sec": None,
+                "rows": None,
+            }
+
+        elif kind == "on_chat_model_end":
+            span = self._current_span(node)
+            output = event["data"].get("output")
+            if span is None or output is None:
+                return
+            usage = getattr(output, "usage_metadata", None) or {}
+            span["prompt_tokens"] += usage.get("input_tokens", 0)
+            span["completion_tokens"] += usage.get("output_tokens", 0)
+            metadata = getattr(output, "response_metadata", None) or {}
+            if metadata.get("eval_duration") and metadata.get("eval_count"):
+                span["tokens_per_sec"] = round(metadata["eval_count"] / (metadata["eval_duration"] / 1e9), 2)
+
+        elif kind == "on_chain_end" and event["run_id"] in self.open_spans:
+            span = self.open_spans.pop(event["run_id"])
+            span["wall_ms"] = round(self._elapsed_ms() - span["start_ms"], 2)
+            if span["tokens_per_sec"] is None and span["completion_tokens"] and span["wall_ms"]:
+                span["tokens_per_sec"] = round(span["completion_tokens"] / (span["wall_ms"] / 1000), 2)
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                canvases = [m for m in output.get("messages", []) if isinstance(m, CanvasMessage)]
+                if canvases:
+                    span["rows"] = sum(len(m.content.get("rows", [])) for m in canvases)
+            self.spans.append(span)
+
+    def finish(self) -> dict:
+        return {
+            "thread_id": self.thread_id,
+            "total_ms": round(self._elapsed_ms(), 2),
+            "retries": {node: count - 1 for node, count in self.attempts.items() if count > 1},
+            "prompt_tokens": sum(s["prompt_tokens"] for s in self.spans),
+            "completion_tokens": sum(s["completion_tokens"] for s in self.spans),
+            "spans": self.spans,
+        }
+
+def _percentile(values: list[float], pct: int) -> float:
+    ordered = sorted(values)
+    index = max(0, -(-pct * len(ordered) // 100) - 1)
+    return ordered[index]
+
+def _describe(values: list[float]) -> dict:
+    values = [v for v in values if v is not None]
+    if not values:
+        return {}
+    return {f"p{p}": round(_percentile(values, p), 2) for p in PERCENTILES} | {"count": len(values)}
+
+def aggregate_traces(traces: list[dict]) -> dict:
+    """Percentiles of end-to-end and per-node latency and throughput over a set of traces."""
+    per_node: dict[str, dict[str, list]] = {}
+    for trace in traces:
+        for span in trace["spans"]:
+            stats = per_node.setdefault(span["node"], {"wall_ms": [], "tokens_per_sec": [], "retries": []})
+            stats["wall_ms"].append(span["wall_ms"])
+            stats["tokens_per_sec"].append(span["tokens_per_sec"])
+        for node, retries in trace.get("retries", {}).items():
+            per_node.setdefault(node, {"wall_ms": [], "tokens_per_sec": [], "retries": []})["retries"].append(retries)
+
+    return {
+        "runs": len(traces),
+        "total_ms": _describe([t["total_ms"] for t in traces]),
+        "nodes": {
+            node: {
+                "wall_ms": _describe(stats["wall_ms"]),
+                "tokens_per_sec": _describe(stats["tokens_per_sec"]),
+                "retries": sum(stats["retries"]),
+            }
+            for node, stats in per_node.items()
+        },
+    }
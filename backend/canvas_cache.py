@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from ai_agent.utils.metrics import CACHE_ENTRIES, CACHE_LOOKUPS, records_json
+from ai_agent.utils.query_log import record_query
+from ai_agent.utils.sampling import data_generation, referenced_tables, table_versions
+
+# Rows returned per canvas page unless the client asks for fewer.
+CANVAS_PAGE_SIZE = int(os.getenv("DATANEXUS_CANVAS_PAGE_SIZE", "500"))
+CANVAS_MAX_PAGE_SIZE = int(os.getenv("DATANEXUS_CANVAS_MAX_PAGE_SIZE", "5000"))
+CANVAS_CACHE_ENTRIES = int(os.getenv("DATANEXUS_CANVAS_CACHE_ENTRIES", "128"))
+
+class CanvasCache:
+    """LRU of canvas result pages and dashboard chart results keyed by
+    project, SQL hash, params, the versions of the tables the SQL reads, the
+    project's data generation, and the page window. A table that is replaced,
+    altered or changes size gets a new version, and any write bumps the
+    generation, so its entries miss."""
+
+    def __init__(self, max_entries: int = CANVAS_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple, dict | list] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> dict | list | None:
+        with self.lock:
+            page = self.entries.get(key)
+            if page is None:
+                CACHE_LOOKUPS.labels("canvas", "miss").inc()
+                return None
+            self.entries.move_to_end(key)
+        CACHE_LOOKUPS.labels("canvas", "hit").inc()
+        return page
+
+    def put(self, key: tuple, page: dict | list):
+        with self.lock:
+            self.entries[key] = page
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            CACHE_ENTRIES.labels("canvas").set(len(self.entries))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            CACHE_ENTRIES.labels("canvas").set(0)
+
+canvas_cache = CanvasCache()
+
+def _query_version(cursor, sql_query: str) -> str:
+    versions = table_versions(cursor)
+    return ",".join(f"{table}={versions[table]}" for table in referenced_tables(sql_query, set(versions)))
+
+def _cache_key(cursor, project: str, sql_query: str, params: dict, *window) -> tuple | None:
+    """None when the SQL reads no base table (e.g. only views), whose
+    changes the key couldn't see; such queries aren't cached."""
+    version = _query_version(cursor, sql_query)
+    if not version:
+        return None
+    return (
+        project,
+        hashlib.sha256(sql_query.encode()).hexdigest(),
+        json.dumps(params, sort_keys=True, default=str),
+        version,
+        data_generation(project),
+        *window,
+    )
+
+def fetch_chart_results(conn, project: str, sql_query: str, params: dict, source: str = "chart") -> list[dict]:
+    """All rows of a dashboard chart query; chart SQL already carries its own
+    LIMIT. The startup warm-up calls this for every widget, so the first
+    dashboard load is served from the cache. `source` labels the query in the
+    metrics."""
+    cursor = conn.cursor()
+    try:
+        key = _cache_key(cursor, project, sql_query, params, "chart")
+        results = canvas_cache.get(key) if key is not None else None
+        if results is not None:
+            return results
+        with record_query(conn, project, source, sql_query, params) as recorded:
+            df = cursor.execute(sql_query, params).df()
+            recorded.rows = len(df)
+    finally:
+        cursor.close()
+    results = records_json(df, source)
+    if key is not None:
+        canvas_cache.put(key, results)
+    return results
+
+def fetch_canvas_page(conn, project: str, sql_query: str, params: dict, offset: int = 0, limit: int = CANVAS_PAGE_SIZE, source: str = "canvas") -> dict:
+    """One page of a canvas query. The SQL is wrapped in LIMIT/OFFSET so only
+    the requested rows are materialised and serialised."""
+    limit = max(1, min(limit, CANVAS_MAX_PAGE_SIZE))
+    offset = max(0, offset)
+    sql_query = sql_query.strip().rstrip(";")
+
+    cursor = conn.cursor()
+    try:
+        key = _cache_key(cursor, project, sql_query, params, offset, limit)
+        page = canvas_cache.get(key) if key is not None else None
+        if page is not None:
+            return {**page, "cached": True}
+
+        # One extra row tells whether another page exists.
+        page_sql = f"SELECT * FROM ({sql_query}) AS canvas_page LIMIT {limit + 1} OFFSET {offset}"
+        with record_query(conn, project, source, page_sql, params) as recorded:
+            df = cursor.execute(page_sql, params).df()
+            recorded.rows = len(df)
+    finally:
+        cursor.close()
+
+    page = {
+        "columns": list(df.columns),
+        "results": records_json(df.head(limit), source),
+        "offset": offset,
+        "has_more": len(df) > limit,
+    }
+    if key is not None:
+        canvas_cache.put(key, page)
+    return {**page, "cached": False}
@@ -0,0 +1,45 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine
+
+DATABASE_PATH = "database.db"
+# Connections kept open per engine; requests beyond this wait up to
+# SQLITE_POOL_TIMEOUT seconds for one instead of opening more files.
+SQLITE_POOL_SIZE = int(os.getenv("DATANEXUS_SQLITE_POOL_SIZE", "8"))
+SQLITE_POOL_TIMEOUT = float(os.getenv("DATANEXUS_SQLITE_POOL_TIMEOUT", "30"))
+SQLITE_MMAP_BYTES = int(os.getenv("DATANEXUS_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+]
+
+def _apply_pragmas(dbapi_conn, _record):
+    cursor = dbapi_conn.cursor()
+    for pragma in CONNECTION_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def _pool_args() -> dict:
+    return {"pool_size": SQLITE_POOL_SIZE, "max_overflow": 0, "pool_timeout": SQLITE_POOL_TIMEOUT}
+
+def create_sqlite_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, **_pool_args())
+    event.listen(engine, "connect", _apply_pragmas)
+    return engine
+
+def create_async_sqlite_engine(path: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", **_pool_args())
+    event.listen(engine.sync_engine, "connect", _apply_pragmas)
+    return engine
+
+# Sync engine for the threadpool endpoints, admin and background work.
+engine = create_sqlite_engine(DATABASE_PATH)
+
+# Async engine for async endpoints, so they don't block the event loop on commits.
+async_engine = create_async_sqlite_engine(DATABASE_PATH)
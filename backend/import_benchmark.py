@@ -0,0 +1,138 @@
+"""Import-time benchmark for the backend.
+
+Runs `python -X importtime -c "import main"` in fresh interpreters and reports
+the total import time and the packages that take most of it. Fails (exit 1)
+when the median exceeds the budget, or when `import main` loads one of the
+packages that must stay off the startup path, naming the chain that did.
+
+The default budget of 1500 ms leaves headroom over the ~970 ms `import main`
+takes on a development machine. For a tighter guard on one machine, record a
+baseline with --json and compare later runs against it with --baseline; the
+run then fails when the median is more than --margin above the baseline's.
+
+Usage:
+    python import_benchmark.py
+    python import_benchmark.py --runs 10 --budget-ms 1200 --top 20
+    python import_benchmark.py --json baseline.json
+    python import_benchmark.py --baseline baseline.json --margin 0.2
+    python import_benchmark.py --module admin --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Loaded in the background or on first use (see ai_agent/__init__.py); an
+# eager import of any of these from `main` is a startup regression.
+DEFERRED_PACKAGES = ("langgraph", "langchain_core", "langchain_ollama", "ollama", "langsmith", "pandas")
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _parse(stderr: str) -> list[tuple[int, int, int, str]]:
+    """(self_us, cumulative_us, depth, module) per line, in the order Python
+    prints them: a module's imports come before the module itself."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        entries.append((int(self_us), int(cumulative_us), (len(name) - len(stripped) - 1) // 2, stripped.strip()))
+    return entries
+
+def _import_chain(entries: list, index: int) -> list[str]:
+    """The module at `index` followed by each module that imported it."""
+    chain = [entries[index][3]]
+    depth = entries[index][2]
+    for _, _, d, name in entries[index + 1:]:
+        if d < depth:
+            chain.append(name)
+            depth = d
+    return chain
+
+def measure(module: str) -> list[tuple[int, int, int, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return _parse(result.stderr)
+
+def run(args) -> dict:
+    totals = []
+    entries = []
+    for _ in range(args.runs):
+        entries = measure(args.module)
+        totals.append(sum(cumulative for _, cumulative, depth, _ in entries if depth == 0) / 1000)
+
+    packages: dict[str, int] = {}
+    for self_us, _, _, name in entries:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]
+
+    deferred = {}
+    for i, (_, _, _, name) in enumerate(entries):
+        package = name.split(".")[0]
+        if package in DEFERRED_PACKAGES and package not in deferred:
+            deferred[package] = _import_chain(entries, i)
+
+    median = statistics.median(totals)
+    return {
+        "module": args.module,
+        "runs": args.runs,
+        "median_ms": round(median, 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "budget_ms": args.budget_ms,
+        "modules_loaded": len(entries),
+        "top_packages_ms": {package: round(us / 1000, 1) for package, us in top},
+        "deferred_loaded": deferred,
+    }
+
+def print_report(result: dict):
+    print(f"import {result['module']}: median {result['median_ms']} ms "
+          f"(min {result['min_ms']}, max {result['max_ms']}, {result['runs']} runs, budget {result['budget_ms']} ms)")
+    print(f"{result['modules_loaded']} modules loaded")
+    print(f"\n{'package':<28}{'self ms':>10}")
+    for package, ms in result["top_packages_ms"].items():
+        print(f"{package:<28}{ms:>10}")
+    for package, chain in result["deferred_loaded"].items():
+        print(f"\n{package} loaded via: " + " <- ".join(chain))
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the backend")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time; the median is reported")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Fail when the median import time exceeds this")
+    parser.add_argument("--baseline", help="Results file from an earlier --json run to compare against instead of the budget")
+    parser.add_argument("--margin", type=float, default=0.25, help="Allowed slowdown over the baseline median (0.25 = 25%%)")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list by self time")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            args.budget_ms = round(json.load(f)["median_ms"] * (1 + args.margin), 1)
+
+    result = run(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if result["median_ms"] > args.budget_ms:
+        failures.append(f"median import time {result['median_ms']} ms is over the {args.budget_ms:.0f} ms budget"
+                        + (f" ({args.margin:.0%} over {args.baseline})" if args.baseline else ""))
+    if args.module == "main" and result["deferred_loaded"]:
+        failures.append("deferred packages loaded at startup: " + ", ".join(result["deferred_loaded"]))
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# The snapshot is rewritten once edits pause for this long, or right away
+# once this many edits are waiting in the log.
+LAYOUT_SAVE_DELAY = float(os.getenv("DATANEXUS_LAYOUT_SAVE_DELAY_SECONDS", "2"))
+LAYOUT_LOG_MAX_ENTRIES = int(os.getenv("DATANEXUS_LAYOUT_LOG_MAX_ENTRIES", "500"))
+
+def atomic_write_json(path: str, data: dict):
+    """Writes to a temp file next to `path` and renames it over `path`, so
+    readers see either the old or the new file, never a partial one."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+class LayoutStore:
+    """Dashboard layout of one project, kept in memory.
+
+    The snapshot file holds {"project_name", "widgets"}. Each widget edit is
+    appended to a log next to it as one JSON line, so an edit costs the same
+    however large the dashboard is. The snapshot is rewritten atomically once
+    edits pause, then the log is emptied. Replaying the log is idempotent, so
+    a crash between the two loses nothing. If either file is changed on disk
+    by something else, the layout is reloaded."""
+
+    def __init__(self, path: str, project_name: str):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".log"
+        self.project_name = project_name
+        self.lock = threading.RLock()
+        self.widgets: dict[str, dict] = {}
+        self.log_entries = 0
+        self.signature = None
+        self.cached: dict | None = None
+        self.timer: threading.Timer | None = None
+
+    def _stat(self) -> tuple:
+        signature = []
+        for path in (self.path, self.log_path):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    @staticmethod
+    def _apply(widgets: dict, entry: dict):
+        if entry["op"] == "save":
+            widgets[entry["widget"]["id"]] = entry["widget"]
+        elif entry["op"] == "delete":
+            widgets.pop(entry["id"], None)
+
+    def _load(self):
+        widgets = {}
+        try:
+            with open(self.path, "r") as f:
+                for widget in json.load(f).get("widgets") or []:
+                    widgets[widget["id"]] = widget
+        except FileNotFoundError:
+            pass
+        entries = []
+        torn = False
+        try:
+            with open(self.log_path, "r") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash mid-append.
+                        torn = True
+                        continue
+                    # The next append would be glued onto an unterminated line.
+                    torn = torn or not line.endswith("\n")
+        except FileNotFoundError:
+            pass
+        for entry in entries:
+            self._apply(widgets, entry)
+        if torn:
+            self._rewrite_log(entries)
+        self.widgets = widgets
+        self.log_entries = len(entries)
+        self.cached = None
+        self.signature = self._stat()
+
+    def _rewrite_log(self, entries: list[dict]):
+        """Replaces the log with its intact entries, so edits appended after a
+        crash start on a line of their own."""
+        logger.warning("LayoutStore: dropping a torn line from the edit log | path=%s", self.log_path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.log_path) or ".", prefix=".tmp-", suffix=".log")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in entries)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.log_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _refresh(self):
+        if self.signature is None or self._stat() != self.signature:
+            self._load()
+
+    def layout(self) -> dict:
+        with self.lock:
+            self._refresh()
+            if self.cached is None:
+                self.cached = {"project_name": self.project_name, "widgets": list(self.widgets.values())}
+            return self.cached
+
+    def save_widget(self, widget: dict):
+        """Adds a widget, or replaces the one with the same id in place."""
+        self._edit({"op": "save", "widget": widget})
+
+    def delete_widget(self, widget_id: str):
+        self._edit({"op": "delete", "id": widget_id})
+
+    def _edit(self, entry: dict):
+        with self.lock:
+            self._refresh()
+            self._apply(self.widgets, entry)
+            self.cached = None
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.log_entries += 1
+            self.signature = self._stat()
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        delay = 0 if self.log_entries >= LAYOUT_LOG_MAX_ENTRIES else LAYOUT_SAVE_DELAY
+        self.timer = threading.Timer(delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """Writes the snapshot and empties the log."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self._refresh()
+            if not self.log_entries:
+                return
+            try:
+                atomic_write_json(self.path, {"project_name": self.project_name, "widgets": list(self.widgets.values())})
+                open(self.log_path, "w").close()
+            except OSError:
+                logger.exception("LayoutStore: failed to write snapshot | path=%s", self.path)
+                return
+            logger.info("LayoutStore: wrote snapshot | widgets=%s edits=%s", len(self.widgets), self.log_entries)
+            self.log_entries = 0
+            self.signature = self._stat()
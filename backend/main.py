@@ -1,26 +1,42 @@
-from fastapi import FastAPI, Depends, BackgroundTasks
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List
 import duckdb
 from typing import Annotated
-from sqlmodel import SQLModel, Field, Session, create_engine, select
+from sqlmodel import SQLModel, Field, Session, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Index, bindparam, tuple_, update
 from datetime import datetime
 from contextlib import asynccontextmanager
 import admin
+from database import engine, async_engine
+from admin_search import ensure_search_indexes
 from functools import wraps
+import inspect
 import json
 import uuid
 from fastapi.responses import StreamingResponse
 import pathlib
 import os
-from ai_agent import init_agent, get_agent, close_agent
-from langchain_core.messages import HumanMessage, AIMessage
-from ai_agent.utils import synthesizer_llm
-from ai_agent.utils.messages import CanvasMessage
+# The agent stack (LangGraph, LangChain, Ollama) is imported where it's used
+# and loaded in the background, so the API is up before it has loaded.
+import ai_agent
+from ai_agent.utils.titles import TitleWorker, heuristic_title
+from ai_agent.runs import start_run, finish_run, cancel_run
+from layout_store import LayoutStore, atomic_write_json
+from canvas_cache import CANVAS_PAGE_SIZE, fetch_canvas_page, fetch_chart_results
+from warmup import WARMUP_ENABLED, schema_context, warm_up_project, warmup_progress
+from ai_agent.utils.metrics import CONTENT_TYPE, SSE_STREAM_SECONDS, HTTPMetricsMiddleware, records_json, render as render_metrics
+from ai_agent.utils.query_log import SLOW_QUERY_MS, is_read_only, query_log, record_query
+from ai_agent.utils.sampling import bump_data_generation
+from sse import TextCoalescer, idle_frame, idle_timeout, sse_frame
 import logging
 import sys
+import time
+import asyncio
+import threading
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,11 +48,8 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-sqlite_url = "sqlite:///database.db"
-connect_args = {"check_same_thread" : False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
-
 selected_project = None
+selected_project_id = None
 
 class Project(SQLModel, table=True):
     id : int | None = Field(default=None, primary_key=True)
@@ -44,12 +57,22 @@ class Project(SQLModel, table=True):
     created_at : datetime = Field(default_factory=datetime.now)
 
 class ChatSession(SQLModel, table=True):
+    # Serves the per-project chat list, newest first, and its cursor paging.
+    __table_args__ = (Index("ix_chatsession_project_recent", "project_id", "last_message_time", "id"),)
+
     id: str = Field(primary_key=True)
     project_id: int = Field(foreign_key="project.id")
     name: str = Field(default="New Chat")
     created_at: datetime = Field(default_factory=datetime.now)
     last_message_time: datetime = Field(default_factory=datetime.now)
 
+class AgentTrace(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    thread_id: str = Field(index=True)
+    created_at: datetime = Field(default_factory=datetime.now)
+    total_ms: float
+    trace: str
+
 class DataIngestionRequest(BaseModel):
     file_path: str
 
@@ -88,53 +111,35 @@ class ProjectDashboardLayout(BaseModel):
     project_name: str
     widgets: List[GraphLayout] | None = None
 
-class ProjectDataHandler: # handles the JSON file for a project that stores dashboard layout and other metadata
+class ProjectDataHandler: # handles the dashboard layout and other metadata of a project
     def __init__(self, project_name: str):
         self.project_name = project_name
         self.folder_path = project_name.replace(' ', '_')
         self.file_path = f"projects/{self.folder_path}/dashboard_layout.json"
+        self.store = LayoutStore(self.file_path, project_name)
 
     def create_new_project_file(self):
         layout = ProjectDashboardLayout(project_name=self.project_name)
         os.makedirs("projects/" + self.folder_path, exist_ok=True)
         path = pathlib.Path(self.file_path)
         if not path.exists():
-            with open(self.file_path, "w") as f:
-                json.dump(layout.dict(), f, indent=4)
+            atomic_write_json(self.file_path, layout.dict())
 
     def load_layout(self) -> ProjectDashboardLayout:
-        try:
-            with open(self.file_path, "r") as f:
-                data = json.load(f)
-                return ProjectDashboardLayout(**data)
-        except FileNotFoundError:
-            return ProjectDashboardLayout(project_name=self.project_name)
+        return ProjectDashboardLayout(**self.store.layout())
+
+    def layout_dict(self) -> dict:
+        """The layout as stored; cached in memory until it changes."""
+        return self.store.layout()
 
     def save_layout(self, layout: GraphLayout):
-        os.makedirs(self.folder_path, exist_ok=True)
-        current_data: ProjectDashboardLayout = self.load_layout()
-        with open(self.file_path, "w") as f:
-            if current_data.widgets is None:
-                current_data.widgets = [layout]
-            else:
-                # Check if widget with same ID already exists, if so replace it
-                existing_widget = next((w for w in current_data.widgets if w.id == layout.id), None)
-                if existing_widget:
-                    current_data.widgets = [w if w.id != layout.id else layout for w in current_data.widgets]
-                else:
-                    current_data.widgets.append(layout)
-            json.dump(current_data.dict(), f, indent=4)
+        self.store.save_widget(layout.dict())
 
     def delete_widget(self, widget_id: str):
-        os.makedirs(self.folder_path, exist_ok=True)
-        current_data: ProjectDashboardLayout = self.load_layout()
-        with open(self.file_path, "w") as f:
-            current_data.widgets = [w for w in current_data.widgets if w.id != widget_id]
-            json.dump(current_data.dict(), f, indent=4)
+        self.store.delete_widget(widget_id)
 
-sqlite_url = "sqlite:///database.db"
-connect_args = {"check_same_thread" : False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+    def close(self):
+        self.store.flush()
 
 DEFAULT_CONFIG_PATH = "app_config.json"
 
@@ -174,6 +179,9 @@ def generate_chart_sql(graph: GraphLayout) -> str:
 
     return final_sql
 
+def chart_variables(graph: GraphLayout) -> dict:
+    return {var.name: var.default for var in graph.config.variables} if graph.config.variables else {}
+
 def save_active_project(project_id: int):
     with open(DEFAULT_CONFIG_PATH, "w") as f:
         json.dump({"last_project_id": project_id}, f)
@@ -189,12 +197,15 @@ def load_active_project():
     return None
 
 def initialize_project_connection(project: Project):
-    global conn, selected_project, project_data_handler
+    global conn, selected_project, selected_project_id, project_data_handler
     logger.info(f"Initializing connection for project: {project.name}")
+    if project_data_handler is not None:
+        project_data_handler.close()
     folder_path = project.name.replace(" ", "_")
     project_data_handler = ProjectDataHandler(project_name=project.name)
     conn = duckdb.connect(f"projects/{folder_path}/project.duckdb", read_only=False)
     selected_project = project.name
+    selected_project_id = project.id
     logger.info(f"Project connection established for: {project.name}")
 
 def get_session():
@@ -203,23 +214,47 @@ def get_session():
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
 conn = None
 project_data_handler = None
 
+def _project_missing():
+    if not conn or not project_data_handler:
+        logger.warning("Attempted to run a function requiring a project, but no project is selected.")
+        return JSONResponse({"error" : "Project not selected."}, status_code=401)
+    return None
+
 def require_project(func):
+    # FastAPI awaits the wrapper of an async endpoint, so it must be async too.
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return _project_missing() or await func(*args, **kwargs)
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        global conn, project_data_handler
-        if not conn or not project_data_handler:
-            logger.warning("Attempted to run a function requiring a project, but no project is selected.")
-            return JSONResponse({"error" : "Project not selected."}, status_code=401)
-        return func(*args, **kwargs)
+        return _project_missing() or func(*args, **kwargs)
     return wrapper
 
+async def load_agent():
+    await ai_agent.ready()
+    from ai_agent.utils.gateway import warm_up
+    await warm_up()
+
 @asynccontextmanager
 async def lifespan(app : FastAPI):
     logger.info("Starting up application...")
     SQLModel.metadata.create_all(engine)
+    # create_all skips indexes added to tables that already exist.
+    for index in ChatSession.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    ensure_search_indexes(engine)
 
     # Try to restore last session
     last_project_id = load_active_project()
@@ -231,14 +266,34 @@ async def lifespan(app : FastAPI):
                 initialize_project_connection(project)
                 logger.info(f"Restored session for project: {project.name}")
 
-    logger.info("Initializing AI agent...")
-    await init_agent()
+    # Warm the restored project's dashboard in the background; /ready reports progress.
+    project_warm_up_task = None
+    if WARMUP_ENABLED and conn is not None:
+        widgets = project_data_handler.load_layout().widgets or []
+        widget_queries = [(w.title, generate_chart_sql(w), chart_variables(w)) for w in widgets]
+        project_warm_up_task = asyncio.create_task(warm_up_project(conn, selected_project, widget_queries))
+
+    # Load the agent, then preload the model, in the background so readiness
+    # isn't blocked on either; agent endpoints wait for the load.
+    warm_up_task = asyncio.create_task(load_agent())
+    title_worker.start()
+    activity_task = asyncio.create_task(flush_chat_activity_periodically())
     logger.info("Application startup complete.")
 
     yield
 
     logger.info("Shutting down application...")
-    await close_agent()
+    warm_up_task.cancel()
+    if project_warm_up_task is not None:
+        project_warm_up_task.cancel()
+    activity_task.cancel()
+    flush_chat_activity()
+    await title_worker.stop()
+    await ai_agent.close()
+    if project_data_handler is not None:
+        project_data_handler.close()
+    query_log.close()
+    await async_engine.dispose()
     logger.info("Application shutdown complete.")
 
 app = FastAPI(lifespan=lifespan)
@@ -255,6 +310,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so its timings include the other middleware.
+app.add_middleware(HTTPMetricsMiddleware)
 
 @app.get("/")
 def index(session: SessionDep):
@@ -279,11 +336,8 @@ def create_new_project(request: CreateProjectRequest, session: SessionDep):
     session.commit()
     session.refresh(project)
 
-    global project_data_handler
-    project_data_handler = ProjectDataHandler(project_name=project.name)
-
     # Initialize connection and persistent storage handlers
-    project_data_handler.create_new_project_file()
+    ProjectDataHandler(project_name=project.name).create_new_project_file()
     initialize_project_connection(project)
 
     # Save as active session
@@ -316,6 +370,7 @@ def ingest_data(request: DataIngestionRequest):
             conn.execute(f"CREATE TABLE \"{table_name}\" AS SELECT * FROM read_json('{file_path}')")
         elif file_extension == "parquet":
             conn.execute(f"CREATE TABLE \"{table_name}\" AS SELECT * FROM read_parquet('{file_path}')")
+        bump_data_generation(selected_project)
 
         return {"message": f"Data ingested successfully into table '{table_name}'."}
     except Exception as e:
@@ -336,8 +391,7 @@ def select_current_project(project_id: int, session: SessionDep):
 @require_project
 def get_dashboard_layout():
     global project_data_handler
-    layout = project_data_handler.load_layout()
-    return JSONResponse(layout.dict())
+    return JSONResponse(project_data_handler.layout_dict())
 
 @app.get("/project/sql/dashboard")
 @require_project
@@ -350,11 +404,17 @@ def get_project_dashboard():
 @require_project
 def gettabledata(table_name : str, offset : int = 0, limit : int = 100):
     global conn
-    df = conn.execute(f"SELECT * FROM {table_name} LIMIT {limit} OFFSET {offset};").df()
-    rows = json.loads(df.to_json(orient='records'))
+    page_sql = f"SELECT * FROM {table_name} LIMIT {limit} OFFSET {offset};"
+    with record_query(conn, selected_project, "table", page_sql) as recorded:
+        df = conn.execute(page_sql).df()
+        recorded.rows = len(df)
+    rows = records_json(df, "table")
 
     if offset == 0:
-        row_count = conn.execute(f"SELECT COUNT(*) from {table_name};").fetchall()
+        count_sql = f"SELECT COUNT(*) from {table_name};"
+        with record_query(conn, selected_project, "table_count", count_sql) as recorded:
+            row_count = conn.execute(count_sql).fetchall()
+            recorded.rows = 1
         return JSONResponse({"rows" : rows, "row_count" : row_count})
 
     return JSONResponse({"rows" : rows})
@@ -363,8 +423,16 @@ def gettabledata(table_name : str, offset : int = 0, limit : int = 100):
 @require_project
 def execute_sql(query_str: str):
     global conn
-    df = conn.execute(query_str).df()
-    results = json.loads(df.to_json(orient='records'))
+    with record_query(conn, selected_project, "sql", query_str) as recorded:
+        writes = not is_read_only(conn, query_str)
+        try:
+            df = conn.execute(query_str).df()
+        finally:
+            # Statements that ran before a failing one have still written.
+            if writes:
+                bump_data_generation(selected_project)
+        recorded.rows = len(df)
+    results = records_json(df, "sql")
 
     return JSONResponse({"results" : results})
 
@@ -427,9 +495,8 @@ def save_graph_layout(request: GraphLayout):
 def execute_chart_sql(graph: GraphLayout):
     global conn
     sql = generate_chart_sql(graph)
-    variables = {var.name: var.default for var in graph.config.variables} if graph.config.variables else {}
-    df = conn.execute(sql, variables).df()
-    results = json.loads(df.to_json(orient='records'))
+    # Widgets the startup warm-up already ran are served from its results.
+    results = fetch_chart_results(conn, selected_project, sql, chart_variables(graph))
     return JSONResponse({"results" : results})
 
 @app.post("/delete-graph-widget")
@@ -439,150 +506,341 @@ def delete_graph_widget(request: DeleteWidgetRequest):
     project_data_handler.delete_widget(request.widget_id)
     return JSONResponse({"message": "Graph widget deleted successfully."})
 
-async def generate_chat_name(thread_id: str, first_message: str, session: Session):
-    prompt = f"Summarize this into a 3-word title: {first_message}. Output ONLY the title."
-
-    title = await synthesizer_llm.ainvoke(prompt)
-    title = title.content.strip().replace('"', '')
-
-    logger.info(f"Generated chat title: '{title}' for thread_id: {thread_id} based on first message: '{first_message}'")
-
-    db_session = session
-    chat = db_session.get(ChatSession, thread_id)
-    if chat:
-        chat.name = title
-        db_session.add(chat)
-        db_session.commit()
-        db_session.refresh(chat)
+def save_chat_name(thread_id: str, title: str, previous: str):
+    """Stores a generated title unless the chat was renamed in the meantime."""
+    with Session(engine) as db_session:
+        chat = db_session.get(ChatSession, thread_id)
+        if chat and chat.name == previous:
+            chat.name = title
+            db_session.add(chat)
+            db_session.commit()
+
+title_worker = TitleWorker(save_chat_name)
+
+# Chat activity times are buffered and written in one statement every few
+# seconds instead of a commit per message.
+CHAT_ACTIVITY_FLUSH_SECONDS = float(os.getenv("DATANEXUS_CHAT_ACTIVITY_FLUSH_SECONDS", "5"))
+pending_chat_activity: dict[str, datetime] = {}
+chat_activity_lock = threading.Lock()
+
+def touch_chat(thread_id: str):
+    with chat_activity_lock:
+        pending_chat_activity[thread_id] = datetime.now()
+
+def flush_chat_activity():
+    """Writes buffered last_message_time updates in a single executemany."""
+    with chat_activity_lock:
+        if not pending_chat_activity:
+            return
+        pending = dict(pending_chat_activity)
+        pending_chat_activity.clear()
+
+    table = ChatSession.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("thread_id"))
+        .values(last_message_time=bindparam("touched_at"))
+    )
+    try:
+        with engine.begin() as connection:
+            connection.execute(statement, [{"thread_id": t, "touched_at": at} for t, at in pending.items()])
+    except Exception:
+        # Keep the updates for the next flush unless a newer one arrived meanwhile.
+        with chat_activity_lock:
+            for thread_id, touched_at in pending.items():
+                pending_chat_activity.setdefault(thread_id, touched_at)
+        raise
+
+async def flush_chat_activity_periodically():
+    while True:
+        await asyncio.sleep(CHAT_ACTIVITY_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(flush_chat_activity)
+        except Exception:
+            logger.exception("Failed to save chat activity times")
 
 @app.post("/create-ai-chat")
 @require_project
-def create_ai_chat(message: str, background_tasks: BackgroundTasks, session: SessionDep):
-    project = session.exec(select(Project).where(Project.name == selected_project)).first()
-
+async def create_ai_chat(message: str, session: AsyncSessionDep):
     thread_id = str(uuid.uuid4())
 
-    new_chat = ChatSession(id=thread_id, project_id=project.id, name="New Chat")
+    # The chat gets a keyword title now; the title worker replaces it with an
+    # LLM title once the model has nothing more urgent to do.
+    new_chat = ChatSession(id=thread_id, project_id=selected_project_id, name=heuristic_title(message))
     session.add(new_chat)
-    session.commit()
+    await session.commit()
 
-    background_tasks.add_task(generate_chat_name, thread_id, message, session)
+    # Runs on the event loop: the title worker's asyncio queue isn't thread-safe.
+    title_worker.submit(thread_id, message)
 
     return JSONResponse({"thread_id": thread_id})
 
 class ChatRequest(BaseModel):
     thread_id: str
     message: str
+    include_trace: bool = False
+    # Let the analyst answer from the sampled preview instead of waiting for the full query.
+    fast_mode: bool = False
+
+async def save_trace(trace: dict):
+    async with AsyncSession(async_engine) as db_session:
+        db_session.add(AgentTrace(thread_id=trace["thread_id"], total_ms=trace["total_ms"], trace=json.dumps(trace)))
+        await db_session.commit()
 
 @app.post("/send-ai-message")
 @require_project
-async def send_ai_message(request: ChatRequest, session: SessionDep):
+async def send_ai_message(request: ChatRequest, session: AsyncSessionDep):
     global conn
-    schema_info = conn.execute("DESCRIBE;").df().to_string()
+    await ai_agent.ready()
+    from langchain_core.messages import HumanMessage
+    from ai_agent.utils.nodes import discard_full_results
+    from ai_agent.utils.tracing import RunTracer
+    schema_info = await asyncio.to_thread(schema_context, conn, selected_project)
 
     config = {
         "configurable" : {
             "thread_id" : request.thread_id,
             "conn": conn,
-            "table_schema": schema_info
+            "project": selected_project,
+            "table_schema": schema_info,
+            "fast_mode": request.fast_mode
         }
     }
 
     new_input = {"messages": [HumanMessage(content=request.message)]}
 
-    chat = session.get(ChatSession, request.thread_id)
-    chat.last_message_time = datetime.now()
-    session.add(chat)
-    session.commit()
+    chat = await session.get(ChatSession, request.thread_id)
+    touch_chat(request.thread_id)
+    # Read once here; a title generated during the run is sent when it ends.
+    chat_name = chat.name
 
     async def event_generator():
-        name_sent = False
+        tracer = RunTracer(request.thread_id)
+        coalescer = TextCoalescer()
+        stream_started = last_sent = time.monotonic()
 
-        async for event in get_agent().astream_events(new_input, config=config, version="v2"):
-            if not name_sent:
-                if chat and chat.name != "New Chat":
-                    yield f"data: {json.dumps({'type': 'chat_name_update', 'data': chat.name})}\n\n"
-                    name_sent = True
+        if chat_name != "New Chat":
+            yield sse_frame("chat_name_update", chat_name)
 
-            if event["event"] == "on_chat_model_stream" and event["metadata"].get("langgraph_node") == "synthesizer_node":
-                chunk = event["data"]["chunk"].content
-                if chunk:
-                    yield f"data: {json.dumps({'type': 'text', 'data': chunk})}\n\n"
+        run = await start_run(request.thread_id, ai_agent.get_agent().astream_events(new_input, config=config, version="v2"))
 
-            elif event["event"] == "on_custom_event":
-                if event["name"] == "render_canvas_table":
-                    canvas_payload = event["data"]
-                    yield f"data: {json.dumps({'type': 'canvas_table', 'data': canvas_payload})}\n\n"
-
-                elif event["name"] == "status":
-                    yield f"data: {json.dumps({'type': 'status', 'data': event['data']['status']})}\n\n"
+        try:
+            while True:
+                try:
+                    event = await run.next_event(idle_timeout(coalescer, last_sent))
+                except StopAsyncIteration:
+                    break
+
+                frames = []
+                if event is None:
+                    # Idle: send text that is due, otherwise keep the connection alive.
+                    frame = idle_frame(coalescer, last_sent)
+                    if frame is not None:
+                        frames.append(frame)
+                else:
+                    tracer.observe(event)
+
+                    if event["event"] == "on_chat_model_stream" and event["metadata"].get("langgraph_node") == "synthesizer_node":
+                        chunk = event["data"]["chunk"].content
+                        if chunk and coalescer.add(chunk):
+                            frames.append(coalescer.flush())
+
+                    elif event["event"] == "on_custom_event" and event["name"] in ("render_canvas_table", "status", "llm_queue"):
+                        # Keep frames in order: buffered text goes out first.
+                        pending_text = coalescer.flush()
+                        if pending_text is not None:
+                            frames.append(pending_text)
+                        if event["name"] == "render_canvas_table":
+                            frames.append(sse_frame("canvas_table", event["data"]))
+                        elif event["name"] == "status":
+                            frames.append(sse_frame("status", event["data"]["status"]))
+                        else:
+                            frames.append(sse_frame("queue", event["data"]))
+
+                if frames:
+                    yield "".join(frames)
+                    last_sent = time.monotonic()
+        finally:
+            outcome = "cancelled" if run.cancelled else "completed" if run.done else "disconnected"
+            SSE_STREAM_SECONDS.labels(outcome).observe(time.monotonic() - stream_started)
+            if not run.done:
+                logger.info(f"Client disconnected, cancelling agent run for thread_id: {request.thread_id}")
+            finish_run(run)
+            discard_full_results(request.thread_id)
+
+        pending_text = coalescer.flush()
+        if pending_text is not None:
+            yield pending_text
+
+        async with AsyncSession(async_engine) as db_session:
+            latest = await db_session.get(ChatSession, request.thread_id)
+            if latest is not None and latest.name != chat_name:
+                yield sse_frame("chat_name_update", latest.name)
+
+        if run.cancelled:
+            logger.info(f"Agent run cancelled for thread_id: {request.thread_id}")
+            yield sse_frame("cancelled", request.thread_id)
+
+        trace = tracer.finish()
+        logger.info(f"Agent run finished for thread_id: {request.thread_id} in {trace['total_ms']:.0f} ms")
+        try:
+            await save_trace(trace)
+        except Exception:
+            logger.exception(f"Failed to save agent trace for thread_id: {request.thread_id}")
+        if request.include_trace:
+            yield sse_frame("trace", trace)
 
         yield "data: [DONE]\n\n"
 
+        try:
+            await ai_agent.sync_thread_history(request.thread_id)
+        except Exception:
+            logger.exception(f"Failed to save chat history for thread_id: {request.thread_id}")
+        try:
+            await ai_agent.prune_thread(request.thread_id)
+        except Exception:
+            logger.exception(f"Failed to prune checkpoints for thread_id: {request.thread_id}")
+
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+@app.post("/cancel-ai-run/{thread_id}")
+@require_project
+def cancel_ai_run(thread_id: str):
+    """Stops the agent run streaming for a thread, if any."""
+    if cancel_run(thread_id):
+        return JSONResponse({"message": "Run cancelled"})
+    return JSONResponse({"error": "No active run for this chat"}, status_code=404)
+
 @app.get("/get-chat-sessions")
 @require_project
-def get_chat_sessions(session: SessionDep):
-    project = session.exec(select(Project).where(Project.name == selected_project)).first()
-    if not project:
-        return JSONResponse([], status_code=200)
+def get_chat_sessions(session: SessionDep, limit: int = 50, before: str | None = None):
+    """Returns the project's `limit` most recently active chats older than the
+    `before` cursor; pass the returned `before` back to load the next page.
+    Each page is a range scan on ix_chatsession_project_recent."""
+    # Pending activity changes the order, so it is written first.
+    flush_chat_activity()
+    limit = max(1, min(limit, 200))
+
+    query = select(ChatSession).where(ChatSession.project_id == selected_project_id)
+    if before:
+        try:
+            last_time, chat_id = before.split("|", 1)
+            query = query.where(tuple_(ChatSession.last_message_time, ChatSession.id) < (datetime.fromisoformat(last_time), chat_id))
+        except ValueError:
+            return JSONResponse({"error": "Invalid cursor."}, status_code=400)
+
     chats = session.exec(
-        select(ChatSession)
-        .where(ChatSession.project_id == project.id)
-        .order_by(ChatSession.last_message_time.desc())
+        query.order_by(ChatSession.last_message_time.desc(), ChatSession.id.desc()).limit(limit + 1)
     ).all()
-    return JSONResponse([{"id": c.id, "name": c.name, "last_message_at": c.last_message_time.isoformat()} for c in chats])
+    next_before = None
+    if len(chats) > limit:
+        chats = chats[:limit]
+        next_before = f"{chats[-1].last_message_time.isoformat()}|{chats[-1].id}"
+    return JSONResponse({
+        "sessions": [{"id": c.id, "name": c.name, "last_message_at": c.last_message_time.isoformat()} for c in chats],
+        "before": next_before,
+    })
 
 @app.get("/get-chat-messages/{thread_id}")
 @require_project
-async def get_chat_messages(thread_id: str):
-    """Read message history directly from LangGraph's checkpointer — no duplicate storage."""
-    config = {"configurable": {"thread_id": thread_id, "conn": conn}}
+async def get_chat_messages(thread_id: str, limit: int = 50, before: int | None = None):
+    """Returns the newest `limit` history entries older than message index
+    `before`; pass the returned `before` back to page further into the past.
+    Each page is a range read on the chat_messages table, which is filled
+    from the checkpoint when a turn finishes."""
+    limit = max(1, min(limit, 200))
     try:
-        state = await get_agent().aget_state(config)
-        messages = state.values.get("messages", [])
+        await ai_agent.ready()
+        messages, next_before = await ai_agent.get_thread_history(thread_id, limit, before)
     except Exception:
-        return JSONResponse([])
-
-    result = []
-    for m in messages:
-        if isinstance(m, HumanMessage):
-            content = m.content if isinstance(m.content, str) else str(m.content)
-            result.append({"role": "user", "content": content})
-        elif isinstance(m, AIMessage):
-            content = m.content if isinstance(m.content, str) else ""
-            if content:
-                result.append({"role": "assistant", "content": content})
-        elif isinstance(m, CanvasMessage):
-            result.append({"role": "canvas", "sql_query": m.sql_data.sql_query, "sql_params": [var.model_dump_json() for var in m.sql_data.sql_params]})
-    return JSONResponse(result)
+        logger.exception(f"Failed to load chat history for thread_id: {thread_id}")
+        return JSONResponse({"messages": [], "before": None})
+
+    return JSONResponse({"messages": messages, "before": next_before})
+
+@app.get("/ready")
+def ready():
+    """The app serves requests as soon as it starts; warm-up and the agent's
+    background load run alongside."""
+    return JSONResponse({"ready": True, "project": selected_project, "agent": ai_agent.state, "warmup": warmup_progress.as_dict()})
+
+@app.get("/metrics")
+def metrics():
+    """Request, DuckDB, cache, stream and Ollama metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/slow-queries")
+@require_project
+def slow_queries(limit: int = 20, order_by: str = "total_ms"):
+    """The project's queries slower than SLOW_QUERY_MS, grouped by fingerprint,
+    worst first by total_ms, max_ms, avg_ms or count."""
+    if order_by not in ("total_ms", "max_ms", "avg_ms", "count"):
+        return JSONResponse({"error": "order_by must be total_ms, max_ms, avg_ms or count."}, status_code=400)
+    return JSONResponse({
+        "threshold_ms": SLOW_QUERY_MS,
+        "queries": query_log.top(selected_project, max(1, min(limit, 200)), order_by),
+    })
+
+@app.get("/slow-queries/{fingerprint}")
+@require_project
+def slow_query_profile(fingerprint: str):
+    """One slow query's stats and its EXPLAIN ANALYZE operator profile."""
+    entry = query_log.get(selected_project, fingerprint)
+    if entry is None:
+        return JSONResponse({"error": "No slow query with this fingerprint."}, status_code=404)
+    return JSONResponse(entry)
+
+@app.get("/agent/llm-timings")
+def llm_timings():
+    """Average Ollama prompt-eval vs eval time per agent node since startup."""
+    from ai_agent.utils.timing import get_llm_timings
+    return JSONResponse(get_llm_timings())
+
+@app.get("/agent/traces/stats")
+def agent_trace_stats(session: SessionDep, limit: int = 500):
+    """Latency, throughput and retry percentiles over the most recent agent runs."""
+    from ai_agent.utils.tracing import aggregate_traces
+    rows = session.exec(select(AgentTrace).order_by(AgentTrace.id.desc()).limit(limit)).all()
+    return JSONResponse(aggregate_traces([json.loads(r.trace) for r in rows]))
+
+@app.get("/agent/traces/{thread_id}")
+def agent_traces(thread_id: str, session: SessionDep, limit: int = 20):
+    rows = session.exec(
+        select(AgentTrace)
+        .where(AgentTrace.thread_id == thread_id)
+        .order_by(AgentTrace.id.desc())
+        .limit(limit)
+    ).all()
+    return JSONResponse([{"created_at": r.created_at.isoformat(), **json.loads(r.trace)} for r in rows])
 
 class ExecuteCanvasQueryRequest(BaseModel):
     sql_query: str
     sql_params: list[dict]
+    offset: int = 0
+    limit: int = CANVAS_PAGE_SIZE
 
 @app.post("/execute-canvas-query")
 @require_project
 def execute_canvas_query(request: ExecuteCanvasQueryRequest):
     global conn
     params = {p["name"]: p["default"] for p in request.sql_params} if request.sql_params else {}
-    df = conn.execute(request.sql_query, params).df()
-    results = json.loads(df.to_json(orient='records'))
-    return JSONResponse({"results": results})
+    page = fetch_canvas_page(conn, selected_project, request.sql_query, params, request.offset, request.limit)
+    return JSONResponse(page)
 
 @app.post("/delete-chat-session/{thread_id}")
 @require_project
-def delete_chat_session(thread_id: str, session: SessionDep):
-    chat = session.get(ChatSession, thread_id)
+async def delete_chat_session(thread_id: str, session: AsyncSessionDep):
+    chat = await session.get(ChatSession, thread_id)
     if chat:
-        session.delete(chat)
-        session.commit()
-    config = {"configurable": {"thread_id": thread_id, "conn": conn}}
+        await session.delete(chat)
+    await session.exec(delete(AgentTrace).where(AgentTrace.thread_id == thread_id))
+    await session.commit()
     try:
-        get_agent().delete_state(config)
-    except Exception:
-        pass
+        await ai_agent.ready()
+        await ai_agent.delete_thread(thread_id)
+    except Exception as e:
+        logger.exception(f"Failed to delete checkpoints for thread_id: {thread_id}")
+        return JSONResponse({"error": f"Chat session deleted but its history could not be removed: {e}"}, status_code=500)
     return JSONResponse({"message": "Chat session deleted"})
 
 @app.post("/rename-chat-session/{thread_id}")
@@ -0,0 +1,223 @@
+"""
+Ollama-compatible stub server for tests and benchmarks.
+
+Implements the subset of the Ollama HTTP API used by ChatOllama and the LLM
+gateway (/api/chat, /api/generate, /api/tags, /api/show, /api/ps, /api/version)
+with canned responses and simulated model-load, prompt-eval and generation time.
+
+    python ollama_stub.py --port 11435 --eval-rate 40
+    OLLAMA_HOST=http://127.0.0.1:11435 python -m uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uvicorn
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_TEXT = "This is a stub response from the local Ollama mock server."
+
+# Structured outputs keyed by the JSON schema title sent in `format`.
+DEFAULT_RESPONSES = {
+    "text": DEFAULT_TEXT,
+    "ExecutionPlan": {"plan": ["sql_agent", "executor_tool", "analyst_agent", "synthesizer_node"]},
+    "GeneratedQueries": {"queries": [{"sql_query": "SELECT 1 AS value", "sql_params": []}]},
+    "ChatTitles": {"titles": ["Stub Chat Title"]},
+}
+
+class StubSettings:
+    def __init__(
+        self,
+        responses: dict | None = None,
+        load_delay: float = 2.0,
+        prompt_eval_rate: float = 2000.0,
+        eval_rate: float = 50.0,
+        parallel: int = 1,
+    ):
+        self.responses = {**DEFAULT_RESPONSES, **(responses or {})}
+        self.load_delay = load_delay
+        self.prompt_eval_rate = prompt_eval_rate
+        self.eval_rate = eval_rate
+        self.parallel = parallel
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def _parse_keep_alive(value) -> float:
+    """Return keep-alive in seconds; negative means forever."""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for suffix in ("ms", "s", "m", "h"):
+        if value.endswith(suffix):
+            return float(value[: -len(suffix)]) * units[suffix]
+    return float(value)
+
+def _example_from_schema(schema: dict, defs: dict):
+    """Build a minimal instance that satisfies a JSON schema."""
+    if "$ref" in schema:
+        return _example_from_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"]
+        return _example_from_schema(options[0], defs) if options else None
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {k: _example_from_schema(v, defs) for k, v in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    if kind == "integer" or kind == "number":
+        return 0
+    if kind == "boolean":
+        return False
+    return "stub"
+
+def create_app(settings: StubSettings) -> FastAPI:
+    app = FastAPI(title="Ollama stub")
+    semaphore = asyncio.Semaphore(settings.parallel)
+    loaded_until: dict[str, float] = {}
+
+    async def _ensure_loaded(model: str, keep_alive) -> int:
+        """Simulate model load time; returns load duration in ns."""
+        now = time.monotonic()
+        expiry = loaded_until.get(model)
+        load_ns = 0
+        if expiry is None or (expiry >= 0 and expiry < now):
+            await asyncio.sleep(settings.load_delay)
+            load_ns = int(settings.load_delay * 1e9)
+        ttl = _parse_keep_alive(keep_alive)
+        loaded_until[model] = -1 if ttl < 0 else time.monotonic() + ttl
+        return load_ns
+
+    def _response_text(body: dict) -> str:
+        fmt = body.get("format")
+        if isinstance(fmt, dict):
+            canned = settings.responses.get(fmt.get("title", ""))
+            if canned is None:
+                canned = _example_from_schema(fmt, fmt.get("$defs", {}))
+            return json.dumps(canned)
+        if fmt == "json":
+            return json.dumps({"response": settings.responses["text"]})
+        return settings.responses["text"]
+
+    def _prompt_text(body: dict) -> str:
+        if "messages" in body:
+            return "".join(str(m.get("content", "")) for m in body["messages"])
+        return (body.get("system") or "") + (body.get("prompt") or "")
+
+    async def _generate(body: dict, chat: bool):
+        model = body.get("model", "")
+        prompt = _prompt_text(body)
+        text = _response_text(body)
+        stream = body.get("stream", True)
+
+        async with semaphore:
+            started = time.monotonic()
+            load_ns = await _ensure_loaded(model, body.get("keep_alive"))
+
+            prompt_tokens = _count_tokens(prompt)
+            prompt_eval_s = prompt_tokens / settings.prompt_eval_rate
+            await asyncio.sleep(prompt_eval_s)
+
+            pieces = [p + " " for p in text.split(" ")]
+            pieces[-1] = pieces[-1][:-1]
+            chunks = []
+            eval_started = time.monotonic()
+            for piece in pieces:
+                await asyncio.sleep(1 / settings.eval_rate)
+                chunks.append(piece)
+            eval_ns = int((time.monotonic() - eval_started) * 1e9)
+
+            final = {
+                "model": model,
+                "created_at": _now(),
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int((time.monotonic() - started) * 1e9),
+                "load_duration": load_ns,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_eval_s * 1e9),
+                "eval_count": len(pieces),
+                "eval_duration": eval_ns,
+            }
+
+        def _chunk(content: str) -> dict:
+            if chat:
+                return {"model": model, "created_at": _now(), "message": {"role": "assistant", "content": content}, "done": False}
+            return {"model": model, "created_at": _now(), "response": content, "done": False}
+
+        if not stream:
+            final.update(_chunk("".join(chunks)))
+            final["done"] = True
+            return JSONResponse(final)
+
+        async def lines():
+            for content in chunks:
+                yield json.dumps(_chunk(content)) + "\n"
+            yield json.dumps({**_chunk(""), **final}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/api/version")
+    def version():
+        return {"version": "0.0.0-stub"}
+
+    @app.get("/api/tags")
+    def tags():
+        return {"models": [{"name": name, "model": name} for name in loaded_until]}
+
+    @app.get("/api/ps")
+    def ps():
+        now = time.monotonic()
+        return {"models": [{"name": n, "model": n} for n, exp in loaded_until.items() if exp < 0 or exp >= now]}
+
+    @app.post("/api/show")
+    async def show(request: Request):
+        body = await request.json()
+        return {"modelfile": "", "parameters": "", "template": "", "details": {}, "model_info": {}, "capabilities": ["completion"], "model": body.get("model")}
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await _generate(await request.json(), chat=True)
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        if not body.get("prompt"):
+            # Empty prompt: load (or unload with keep_alive=0) without generating.
+            load_ns = await _ensure_loaded(body.get("model", ""), body.get("keep_alive"))
+            return JSONResponse({"model": body.get("model"), "created_at": _now(), "response": "", "done": True, "done_reason": "load", "load_duration": load_ns})
+        return await _generate(body, chat=False)
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--responses", help="JSON file with canned responses keyed by schema title, plus 'text'")
+    parser.add_argument("--load-delay", type=float, default=2.0, help="Seconds to simulate loading a cold model")
+    parser.add_argument("--prompt-eval-rate", type=float, default=2000.0, help="Prompt tokens per second")
+    parser.add_argument("--eval-rate", type=float, default=50.0, help="Generated tokens per second")
+    parser.add_argument("--parallel", type=int, default=1, help="Requests processed at once, like OLLAMA_NUM_PARALLEL")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r") as f:
+            responses = json.load(f)
+
+    settings = StubSettings(responses, args.load_delay, args.prompt_eval_rate, args.eval_rate, args.parallel)
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
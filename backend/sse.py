@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+# Streamed text is sent once this much has been buffered or the oldest
+# buffered chunk is this old, whichever comes first. 0 sends every chunk.
+SSE_COALESCE_MS = float(os.getenv("DATANEXUS_SSE_COALESCE_MS", "50"))
+SSE_COALESCE_BYTES = int(os.getenv("DATANEXUS_SSE_COALESCE_BYTES", "512"))
+# An SSE comment is sent after this long without any frame so proxies and
+# browsers keep the connection open while the model is busy.
+SSE_HEARTBEAT_SECONDS = float(os.getenv("DATANEXUS_SSE_HEARTBEAT_SECONDS", "15"))
+
+HEARTBEAT = ": keep-alive\n\n"
+
+def sse_frame(frame_type: str, data) -> str:
+    return f"data: {json.dumps({'type': frame_type, 'data': data})}\n\n"
+
+class TextCoalescer:
+    """Buffers streamed text chunks so several tokens go out as one SSE frame."""
+
+    def __init__(self, window_ms: float = SSE_COALESCE_MS, max_bytes: int = SSE_COALESCE_BYTES):
+        self.window = window_ms / 1000
+        self.max_bytes = max_bytes
+        self.chunks: list[str] = []
+        self.size = 0
+        self.started = 0.0
+
+    def add(self, chunk: str) -> bool:
+        """Buffers a chunk; returns True when the buffer should be flushed now."""
+        if not self.chunks:
+            self.started = time.monotonic()
+        self.chunks.append(chunk)
+        self.size += len(chunk.encode())
+        return self.size >= self.max_bytes or self.time_left() == 0
+
+    def time_left(self) -> float | None:
+        """Seconds until the buffered text is due, or None if nothing is buffered."""
+        if not self.chunks:
+            return None
+        return max(0.0, self.window - (time.monotonic() - self.started))
+
+    def flush(self) -> str | None:
+        if not self.chunks:
+            return None
+        frame = sse_frame("text", "".join(self.chunks))
+        self.chunks = []
+        self.size = 0
+        return frame
+
+def idle_timeout(coalescer: TextCoalescer, last_sent: float) -> float:
+    """Seconds to wait for the next event before buffered text is due or a
+    heartbeat is, given the monotonic time the last frame was sent."""
+    heartbeat_left = max(0.0, SSE_HEARTBEAT_SECONDS - (time.monotonic() - last_sent))
+    text_left = coalescer.time_left()
+    return heartbeat_left if text_left is None else min(text_left, heartbeat_left)
+
+def idle_frame(coalescer: TextCoalescer, last_sent: float) -> str | None:
+    """What to send when no event came within idle_timeout: buffered text that
+    is due, otherwise a heartbeat once the stream has been quiet for
+    SSE_HEARTBEAT_SECONDS."""
+    frame = coalescer.flush() if coalescer.time_left() == 0 else None
+    if frame is None and time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+        frame = HEARTBEAT
+    return frame
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The backend runs from its own directory (uvicorn main:app), so its modules
+# are imported as top-level names.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
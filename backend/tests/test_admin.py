@@ -0,0 +1,147 @@
+import html
+import re
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy import inspect as sqlalchemy_inspect
+import admin
+import admin_bulk
+
+@pytest.fixture
+def eng(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'admin.db'}")
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items (name) VALUES (:name)"), [{"name": f"item {i}"} for i in range(1, 92)])
+    admin.init(eng)
+    yield eng
+    if admin._row_counts.worker is not None:
+        admin._row_counts.worker.join()
+    admin._row_counts.retain(set())
+    admin_bulk._export_stats.clear()
+    admin.init(None)
+    eng.dispose()
+
+@pytest.fixture
+def client(eng):
+    app = FastAPI()
+    app.include_router(admin.router)
+    return TestClient(app)
+
+def _page(client, url):
+    body = client.get(url).text
+    shown = re.search(r"Showing (\d+)–(\d+) of (\d+)", body).groups()
+    ids = [int(i) for i in re.findall(r"<td>item (\d+)</td>", body)]
+    prev = re.search(r'<a href="([^"]+)">‹</a>', body)
+    return tuple(map(int, shown)), ids, html.unescape(prev.group(1)) if prev else None
+
+def test_first_view_is_not_blocked_on_a_count(client):
+    body = client.get("/admin/table/items?per_page=25").text
+    assert "Counting records…" in body
+    assert re.search(r"Showing 1–25(?! of)", body)
+
+    # The count is taken in the background and shown from then on.
+    admin._row_counts.worker.join()
+    assert "91 records" in client.get("/admin/table/items?per_page=25").text
+
+def test_last_page_lines_up_with_page_offsets(client):
+    client.get("/admin/table/items")
+    admin._row_counts.worker.join()
+    shown, ids, prev = _page(client, "/admin/table/items?per_page=25&last=1")
+    assert shown == (76, 91, 91)
+    assert ids == list(range(76, 92))
+
+    # Going back from the last page with ?before= keeps the same page boundaries.
+    shown, ids, prev = _page(client, prev)
+    assert shown == (51, 75, 91)
+    assert ids == list(range(51, 76))
+    for start in (26, 1):
+        shown, ids, prev = _page(client, prev)
+        assert shown == (start, start + 24, 91)
+        assert ids == list(range(start, start + 25))
+    assert prev is None
+
+def test_export_reports_throughput(client):
+    assert client.get("/admin/api/table/items/export/stats").status_code == 404
+    lines = client.get("/admin/api/table/items/export?format=ndjson").text.splitlines()
+    assert len(lines) == 91
+
+    stats = client.get("/admin/api/table/items/export/stats").json()
+    assert (stats["format"], stats["rows"]) == ("ndjson", 91)
+    assert stats["rows_per_second"] > 0
+
+def test_schema_is_inspected_again_only_after_ddl(client, eng, monkeypatch):
+    inspected = []
+    monkeypatch.setattr(admin, "inspect", lambda e: inspected.append(e) or sqlalchemy_inspect(e))
+
+    for url in ("/admin/", "/admin/table/items", "/admin/table/items/new", "/admin/table/items/3", "/admin/"):
+        assert client.get(url).status_code == 200
+    assert len(inspected) == 1
+
+    # DDL from another connection bumps the schema version.
+    with eng.begin() as conn:
+        conn.execute(text("ALTER TABLE items ADD COLUMN price REAL"))
+        conn.execute(text("CREATE TABLE tags (id INTEGER PRIMARY KEY)"))
+    assert client.post("/admin/api/table/items", json={"name": "priced", "price": 2.5}).status_code == 200
+    assert len(inspected) == 2
+    assert "tags" in client.get("/admin/api/row-counts").json()["counts"]
+
+def test_row_counts_are_estimated_then_exact_and_kept_current(client, eng):
+    with eng.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_items_name ON items (name)"))
+        conn.execute(text("ANALYZE"))
+        conn.execute(text("INSERT INTO items (name) VALUES ('item 92')"))
+
+    counts = client.get("/admin/api/row-counts").json()["counts"]
+    assert counts["items"] == {"count": 91, "exact": False}
+
+    client.get("/admin/")
+    admin._row_counts.worker.join()
+    counts = client.get("/admin/api/row-counts").json()["counts"]
+    assert counts["items"] == {"count": 92, "exact": True}
+
+    client.post("/admin/api/table/items", json={"name": "item 93"})
+    client.delete("/admin/api/table/items/1")
+    client.delete("/admin/api/table/items/2")
+    counts = client.get("/admin/api/row-counts").json()["counts"]
+    assert counts["items"] == {"count": 91, "exact": True}
+
+def _search(client, table, query):
+    body = client.get(f"/admin/table/{table}", params={"search": query}).text
+    return re.findall(r"<td>(note [^<]*)</td>", body)
+
+def test_search_index_is_keyed_by_primary_key(client, eng):
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE notes (id TEXT PRIMARY KEY, body TEXT, seen_at DATETIME)"))
+        conn.execute(text("INSERT INTO notes VALUES (:id, :body, NULL)"),
+                      [{"id": f"n{i}", "body": f"note {word}"} for i, word in enumerate(["apple", "pear", "plum", "fig"])])
+    assert client.post("/admin/api/table/notes/search-index").status_code == 200
+
+    with eng.begin() as conn:
+        # VACUUM may renumber the rowids of a table without an INTEGER PRIMARY KEY.
+        conn.execute(text("DELETE FROM notes WHERE id IN ('n0', 'n2')"))
+    with eng.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    with eng.begin() as conn:
+        conn.execute(text("UPDATE notes SET body = 'note cherry' WHERE id = 'n3'"))
+        conn.execute(text("DELETE FROM notes WHERE id = 'n1'"))
+        conn.execute(text("INSERT INTO notes VALUES ('n4', 'note apple pie', NULL)"))
+
+    assert _search(client, "notes", "cherry") == ["note cherry"]
+    assert _search(client, "notes", "apple") == ["note apple pie"]
+    assert _search(client, "notes", "pear") == _search(client, "notes", "fig") == []
+
+def test_timestamp_updates_do_not_touch_the_search_index(client, eng):
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE notes (id TEXT PRIMARY KEY, body TEXT, seen_at DATETIME)"))
+        conn.execute(text("INSERT INTO notes VALUES ('n1', 'note apple', NULL)"))
+    client.post("/admin/api/table/notes/search-index")
+
+    statements = []
+    with eng.begin() as conn:
+        conn.connection.driver_connection.set_trace_callback(statements.append)
+        conn.execute(text("UPDATE notes SET seen_at = CURRENT_TIMESTAMP WHERE id = 'n1'"))
+        conn.connection.driver_connection.set_trace_callback(None)
+    assert not any("notes_fts" in s for s in statements)
+    assert _search(client, "notes", "apple") == ["note apple"]
@@ -0,0 +1,39 @@
+import argparse
+import asyncio
+import pytest
+import agent_benchmark
+from agent_benchmark import QUESTION_SETS, Script, ScriptedChatModel
+from ai_agent.utils import nodes
+from ai_agent.utils.schemas import ExecutionPlan
+
+@pytest.fixture(autouse=True)
+def real_models(monkeypatch):
+    # install_fake_models replaces the node models; put them back afterwards.
+    for name in ("router_llm", "sql_generator_llm", "analyst_llm", "synthesizer_llm"):
+        monkeypatch.setattr(nodes, name, getattr(nodes, name))
+
+def test_sync_invoke_returns_the_scripted_output():
+    script = Script()
+    script.load(QUESTION_SETS["basic"]["questions"][0])
+    model = ScriptedChatModel(script=script, prompt_eval_rate=1e6, eval_rate=1e6)
+
+    plan = model.with_structured_output(ExecutionPlan).invoke("plan this")
+    assert plan == ExecutionPlan(plan=QUESTION_SETS["basic"]["questions"][0]["plan"])
+    message = model.invoke("answer this")
+    assert message.content == script.responses["text"]
+    assert message.usage_metadata["output_tokens"] > 0
+
+def test_report_has_node_timings_and_checkpoint_volume(tmp_path):
+    args = argparse.Namespace(
+        rows=20000, iterations=1, warmup=0, sets="basic", questions=None, latency_ms=0.0,
+        prompt_eval_rate=1e6, eval_rate=1e6, workdir=str(tmp_path), keep=False, json=None,
+    )
+    [result] = asyncio.run(agent_benchmark.run_benchmark(args))
+
+    assert result["set"] == "basic"
+    assert result["runs"] == len(QUESTION_SETS["basic"]["questions"])
+    for node in ("planner", "sql_agent", "executor_tool", "analyst_agent", "synthesizer_node"):
+        assert result["nodes"][node]["wall_ms"]["p50"] >= 0
+    assert result["total_ms"]["p50"] > 0
+    assert result["checkpoint_bytes_per_run"] > 0
+    assert result["checkpoint_rows_per_run"] > 0
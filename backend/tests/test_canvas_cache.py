@@ -0,0 +1,44 @@
+import asyncio
+import duckdb
+import pytest
+from canvas_cache import canvas_cache, fetch_canvas_page, fetch_chart_results
+from ai_agent.utils.nodes import run_query
+
+@pytest.fixture
+def conn():
+    canvas_cache.clear()
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE fares AS SELECT range AS id, 10.0 AS amount FROM range(4)")
+    yield conn
+    conn.close()
+    canvas_cache.clear()
+
+def test_page_is_cached(conn):
+    first = fetch_canvas_page(conn, "p", "SELECT * FROM fares ORDER BY id", {}, 2, 2)
+    second = fetch_canvas_page(conn, "p", "SELECT * FROM fares ORDER BY id", {}, 2, 2)
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["results"] == first["results"]
+
+def test_update_invalidates_cached_pages(conn):
+    sql = "SELECT * FROM fares ORDER BY id"
+    fetch_canvas_page(conn, "p", sql, {}, 0, 2)
+    fetch_canvas_page(conn, "p", sql, {}, 2, 2)
+    # Same size and columns, so only the write itself can tell the pages are stale.
+    asyncio.run(run_query(conn, "UPDATE fares SET amount = 99.0", {}, project="p"))
+
+    page = fetch_canvas_page(conn, "p", sql, {}, 2, 2)
+    assert page["cached"] is False
+    assert [row["amount"] for row in page["results"]] == [99.0, 99.0]
+
+def test_views_are_not_cached(conn):
+    conn.execute("CREATE VIEW big_fares AS SELECT * FROM fares WHERE amount > 5")
+    fetch_canvas_page(conn, "p", "SELECT * FROM big_fares", {})
+    assert fetch_canvas_page(conn, "p", "SELECT * FROM big_fares", {})["cached"] is False
+
+def test_warmed_chart_results_are_served_until_a_write(conn):
+    sql = "SELECT SUM(amount) AS total FROM fares"
+    warmed = fetch_chart_results(conn, "p", sql, {}, source="warmup")
+    assert fetch_chart_results(conn, "p", sql, {}) is warmed
+
+    asyncio.run(run_query(conn, "UPDATE fares SET amount = 1.0", {}, project="p"))
+    assert fetch_chart_results(conn, "p", sql, {}) == [{"total": 4.0}]
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+import duckdb
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+import main
+from database import _apply_pragmas
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", _apply_pragmas)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(main.Project(id=1, name="test"))
+        session.add(main.Project(id=2, name="other"))
+        session.commit()
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(main, "engine", engine)
+    monkeypatch.setattr(main, "conn", duckdb.connect())
+    monkeypatch.setattr(main, "project_data_handler", object())
+    monkeypatch.setattr(main, "selected_project_id", 1)
+    main.app.dependency_overrides[main.get_session] = get_session
+    main.pending_chat_activity.clear()
+    yield engine
+    main.app.dependency_overrides.clear()
+    main.pending_chat_activity.clear()
+    main.conn.close()
+    engine.dispose()
+
+@pytest.fixture
+def client(engine):
+    return TestClient(main.app)
+
+def add_chats(engine, count: int, project_id: int = 1) -> list[str]:
+    start = datetime(2025, 1, 1)
+    with Session(engine) as session:
+        for i in range(count):
+            session.add(main.ChatSession(id=f"chat-{project_id}-{i}", project_id=project_id, last_message_time=start + timedelta(minutes=i)))
+        session.commit()
+    # Newest first.
+    return [f"chat-{project_id}-{i}" for i in reversed(range(count))]
+
+def test_sessions_are_paged_newest_first(client, engine):
+    expected = add_chats(engine, 5)
+    add_chats(engine, 3, project_id=2)
+
+    seen = []
+    before = None
+    while True:
+        params = {"limit": 2} | ({"before": before} if before else {})
+        page = client.get("/get-chat-sessions", params=params).json()
+        assert len(page["sessions"]) <= 2
+        seen += [chat["id"] for chat in page["sessions"]]
+        before = page["before"]
+        if before is None:
+            break
+
+    assert seen == expected
+
+def test_chats_with_the_same_time_are_not_skipped(client, engine):
+    with Session(engine) as session:
+        for chat_id in ("a", "b", "c"):
+            session.add(main.ChatSession(id=chat_id, project_id=1, last_message_time=datetime(2025, 1, 1)))
+        session.commit()
+
+    first = client.get("/get-chat-sessions", params={"limit": 2}).json()
+    second = client.get("/get-chat-sessions", params={"limit": 2, "before": first["before"]}).json()
+
+    assert [c["id"] for c in first["sessions"] + second["sessions"]] == ["c", "b", "a"]
+    assert second["before"] is None
+
+def test_invalid_cursor_is_rejected(client, engine):
+    assert client.get("/get-chat-sessions", params={"before": "yesterday"}).status_code == 400
+
+def test_activity_is_written_in_one_flush(client, engine):
+    chats = add_chats(engine, 3)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    main.touch_chat(chats[-1])
+    main.touch_chat(chats[-2])
+    assert [s for s in statements if s.startswith("UPDATE")] == []
+
+    # Listing flushes first, so the touched chats come out on top.
+    page = client.get("/get-chat-sessions").json()
+    updates = [s for s in statements if s.startswith("UPDATE chatsession")]
+    assert len(updates) == 1
+    assert [c["id"] for c in page["sessions"]] == [chats[-2], chats[-1], chats[0]]
+    assert main.pending_chat_activity == {}
+
+def test_failed_flush_keeps_newer_activity(engine, monkeypatch):
+    main.touch_chat("a")
+    main.touch_chat("b")
+    touched_at = main.pending_chat_activity["a"]
+
+    class Broken:
+        def begin(self):
+            # A message arrives while the write is failing.
+            main.touch_chat("b")
+            raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(main, "engine", Broken())
+    with pytest.raises(RuntimeError):
+        main.flush_chat_activity()
+
+    assert main.pending_chat_activity["a"] == touched_at
+    assert main.pending_chat_activity["b"] > touched_at
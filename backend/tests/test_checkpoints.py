@@ -0,0 +1,75 @@
+import asyncio
+from typing import Annotated, TypedDict
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+from ai_agent import checkpoints
+from ai_agent.agent import build_serializer, history_entry
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+def answer(state: State):
+    return {"messages": [AIMessage(content=f"answer to {state['messages'][-1].content}")]}
+
+def build_graph(saver):
+    graph = StateGraph(State)
+    graph.add_node("answer", answer)
+    graph.set_entry_point("answer")
+    graph.add_edge("answer", END)
+    return graph.compile(checkpointer=saver)
+
+async def chat(tmp_path, turns: int, scenario):
+    conn = await checkpoints.connect(str(tmp_path / "checkpoints.db"))
+    saver = AsyncSqliteSaver(conn, serde=build_serializer())
+    await saver.setup()
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "t"}}
+    try:
+        for turn in range(turns):
+            await graph.ainvoke({"messages": [HumanMessage(content=f"q{turn}")]}, config)
+        return await scenario(saver, graph, config)
+    finally:
+        await conn.close()
+
+async def checkpoint_count(saver) -> int:
+    async with saver.conn.execute("SELECT count(*) FROM checkpoints WHERE thread_id = 't'") as cur:
+        return (await cur.fetchone())[0]
+
+def test_prune_keeps_the_newest_checkpoints(tmp_path):
+    async def scenario(saver, graph, config):
+        assert await checkpoint_count(saver) > 3
+        await checkpoints.prune_thread(saver, "t", keep=3)
+        assert await checkpoint_count(saver) == 3
+        # The thread still resumes from its newest state.
+        state = await graph.aget_state(config)
+        assert len(state.values["messages"]) == 8
+
+    asyncio.run(chat(tmp_path, 4, scenario))
+
+def test_history_is_paged_from_the_message_table(tmp_path):
+    async def scenario(saver, graph, config):
+        assert await checkpoints.sync_messages(saver, "t", history_entry) == 10
+        # Nothing new since the last sync.
+        assert await checkpoints.sync_messages(saver, "t", history_entry) == 0
+
+        page, before = await checkpoints.read_messages(saver, "t", 4)
+        assert [m["content"] for m in page] == ["q3", "answer to q3", "q4", "answer to q4"]
+        assert before == 6
+        page, before = await checkpoints.read_messages(saver, "t", 4, before)
+        assert [m["content"] for m in page] == ["q1", "answer to q1", "q2", "answer to q2"]
+        page, before = await checkpoints.read_messages(saver, "t", 4, before)
+        assert [m["content"] for m in page] == ["q0", "answer to q0"]
+        assert before is None
+
+        # A later turn is appended after the rows already copied.
+        await graph.ainvoke({"messages": [HumanMessage(content="q5")]}, config)
+        assert await checkpoints.sync_messages(saver, "t", history_entry) == 2
+        page, _ = await checkpoints.read_messages(saver, "t", 2)
+        assert [m["role"] for m in page] == ["user", "assistant"]
+
+        await checkpoints.delete_thread(saver, "t")
+        assert await checkpoints.read_messages(saver, "t", 4) == ([], None)
+
+    asyncio.run(chat(tmp_path, 5, scenario))
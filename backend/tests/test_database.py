@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+import database
+
+PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store")
+EXPECTED = ("wal", 1, 5000, database.SQLITE_MMAP_BYTES, -16000, 2)
+
+def read_pragmas(conn) -> tuple:
+    return tuple(conn.execute(text(f"PRAGMA {name}")).scalar() for name in PRAGMAS)
+
+def test_every_pooled_connection_is_tuned(tmp_path):
+    engine = database.create_sqlite_engine(str(tmp_path / "database.db"))
+    with engine.connect() as first, engine.connect() as second:
+        assert read_pragmas(first) == EXPECTED
+        assert read_pragmas(second) == EXPECTED
+    assert engine.pool.size() == database.SQLITE_POOL_SIZE
+    engine.dispose()
+
+def test_async_engine_is_tuned(tmp_path):
+    engine = database.create_async_sqlite_engine(str(tmp_path / "database.db"))
+
+    async def pragmas():
+        async with engine.connect() as conn:
+            return await conn.run_sync(read_pragmas)
+
+    assert asyncio.run(pragmas()) == EXPECTED
+    asyncio.run(engine.dispose())
+
+def test_pool_waits_instead_of_opening_more_connections(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "SQLITE_POOL_SIZE", 2)
+    monkeypatch.setattr(database, "SQLITE_POOL_TIMEOUT", 0.1)
+    engine = database.create_sqlite_engine(str(tmp_path / "database.db"))
+    with engine.connect(), engine.connect():
+        with pytest.raises(PoolTimeout):
+            engine.connect()
+    engine.dispose()
@@ -0,0 +1,61 @@
+import asyncio
+from ai_agent.utils.gateway import LLMGateway
+
+def test_slots_are_granted_in_arrival_order_with_queue_positions():
+    async def scenario():
+        gateway = LLMGateway(1)
+        order, positions = [], {}
+        release = asyncio.Event()
+
+        async def request(name: str):
+            async def on_queued(position: int):
+                positions.setdefault(name, []).append(position)
+            async with gateway.slot(on_queued=on_queued):
+                order.append(name)
+                if name == "first":
+                    await release.wait()
+
+        first = asyncio.create_task(request("first"))
+        await asyncio.sleep(0)
+        waiting = []
+        for name in ("second", "third", "fourth"):
+            waiting.append(asyncio.create_task(request(name)))
+            await asyncio.sleep(0)
+        assert (gateway.active, gateway.queued) == (1, 3)
+
+        release.set()
+        await asyncio.gather(first, *waiting)
+        return order, positions, gateway
+
+    order, positions, gateway = asyncio.run(scenario())
+    assert order == ["first", "second", "third", "fourth"]
+    assert positions == {"second": [1], "third": [2], "fourth": [3]}
+    assert (gateway.active, gateway.queued) == (0, 0)
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        gateway = LLMGateway(1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with gateway.slot():
+                await release.wait()
+
+        async def wait_for_slot():
+            async with gateway.slot():
+                pass
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait_for_slot())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert gateway.queued == 0
+
+        release.set()
+        await holder
+        return gateway
+
+    gateway = asyncio.run(scenario())
+    assert (gateway.active, gateway.queued, gateway.idle) == (0, 0, True)
@@ -0,0 +1,26 @@
+import layout_store
+from layout_store import LayoutStore
+
+def widget_ids(path):
+    return [w["id"] for w in LayoutStore(path, "p").layout()["widgets"]]
+
+def test_edit_after_torn_log_line_is_kept(tmp_path, monkeypatch):
+    # Keep edits in the log so the test sees what a restart replays.
+    monkeypatch.setattr(layout_store, "LAYOUT_SAVE_DELAY", 3600)
+    path = str(tmp_path / "dashboard_layout.json")
+    LayoutStore(path, "p").save_widget({"id": "a"})
+    # A crash in the middle of appending the next edit.
+    with open(tmp_path / "dashboard_layout.log", "a") as f:
+        f.write('{"op": "save", "widget": {"id": "x"')
+
+    LayoutStore(path, "p").save_widget({"id": "b"})
+    assert widget_ids(path) == ["a", "b"]
+
+def test_edit_after_unterminated_log_line_is_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(layout_store, "LAYOUT_SAVE_DELAY", 3600)
+    path = str(tmp_path / "dashboard_layout.json")
+    with open(tmp_path / "dashboard_layout.log", "w") as f:
+        f.write('{"op": "save", "widget": {"id": "a"}}')
+
+    LayoutStore(path, "p").save_widget({"id": "b"})
+    assert widget_ids(path) == ["a", "b"]
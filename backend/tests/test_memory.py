@@ -0,0 +1,22 @@
+from ai_agent.utils.memory import MAX_QUESTION_LEN, MEMORY_TOKEN_BUDGET, estimate_tokens, render_memory, update_memory
+
+def test_memory_stays_within_the_token_budget():
+    memory = None
+    for turn in range(60):
+        memory = update_memory(
+            memory,
+            f"Question {turn}: " + "how did revenue change by borough and vendor " * 20,
+            [f"SELECT borough, sum(fare) FROM trips WHERE vendor_id = {turn} GROUP BY borough " * 5] * 2,
+            "Shape: 5 rows x 2 columns " * 40,
+            "Revenue grew in every borough, most of all in Manhattan. " * 20,
+        )
+        assert estimate_tokens(render_memory(memory)) <= MEMORY_TOKEN_BUDGET
+
+    # The newest turn is kept in detail, the oldest only as folded questions.
+    assert memory["turns"][-1]["question"].startswith("Question 59:")
+    assert memory["turns"][-1]["answer"]
+    assert "Question 0:" not in render_memory(memory)
+
+def test_question_is_clipped_to_its_own_limit():
+    memory = update_memory(None, "x" * 1000, [], "", "")
+    assert len(memory["turns"][0]["question"]) == MAX_QUESTION_LEN
@@ -0,0 +1,44 @@
+import re
+import duckdb
+import pytest
+from fastapi.testclient import TestClient
+import main
+from ai_agent.utils.query_log import record_query
+
+@pytest.fixture
+def client():
+    # No lifespan: no project is restored and nothing is loaded in the background.
+    return TestClient(main.app)
+
+def sample(body: str, metric: str, **labels) -> float | None:
+    wanted = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    match = re.search(rf"^{re.escape(metric)}\{{{re.escape(wanted)}\}} (\S+)$", body, re.M)
+    return float(match.group(1)) if match else None
+
+def test_requests_are_labelled_by_route_template(client):
+    before = client.get("/metrics").text
+    count = "datanexus_http_request_duration_seconds_count"
+    labels = {"method": "GET", "route": "/get-chat-messages/{thread_id}", "status": "401"}
+    seen = sample(before, count, **labels) or 0
+
+    for thread_id in ("a", "b", "c"):
+        assert client.get(f"/get-chat-messages/{thread_id}").status_code == 401
+    client.get("/no-such-route")
+    body = client.get("/metrics").text
+
+    assert sample(body, count, **labels) == seen + 3
+    assert sample(body, count, method="GET", route="unmatched", status="404") >= 1
+    assert 'thread_id="a"' not in body and "/get-chat-messages/a" not in body
+
+def test_duckdb_queries_are_labelled_by_source(client):
+    conn = duckdb.connect()
+    with record_query(conn, None, "metrics_test", "SELECT 42") as recorded:
+        recorded.rows = len(conn.execute("SELECT 42").fetchall())
+    conn.close()
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE datanexus_duckdb_query_duration_seconds histogram" in body
+    assert sample(body, "datanexus_duckdb_query_duration_seconds_count", source="metrics_test") == 1
+    assert sample(body, "datanexus_duckdb_query_duration_seconds_bucket", source="metrics_test", le="+Inf") == 1
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+from agent_benchmark import QUESTION_SETS, SCRIPT, generate_dataset, install_fake_models, run_question, table_schema
+from ai_agent.agent import RECURSION_LIMIT, build_serializer, workflow
+from ai_agent.utils import nodes
+from ai_agent.utils.messages import CanvasMessage
+
+@pytest.fixture(autouse=True)
+def fake_models(monkeypatch):
+    for name in ("router_llm", "sql_generator_llm", "analyst_llm", "synthesizer_llm"):
+        monkeypatch.setattr(nodes, name, getattr(nodes, name))
+    install_fake_models(SCRIPT, 0.0, 1e6, 1e6)
+
+@pytest.fixture
+def agent():
+    return workflow.compile(checkpointer=MemorySaver(serde=build_serializer())).with_config({"recursion_limit": RECURSION_LIMIT})
+
+@pytest.fixture
+def conn():
+    conn = generate_dataset(":memory:", 2000)
+    yield conn
+    conn.close()
+
+def ask(agent, conn, question: dict):
+    """Runs one scripted question and returns the thread's final state."""
+    SCRIPT.load(question)
+    asyncio.run(run_question(agent, conn, table_schema(conn), "t", question))
+    state = asyncio.run(agent.aget_state({"configurable": {"thread_id": "t"}}))
+    return state.values
+
+def test_independent_queries_run_at_the_same_time(agent, conn, monkeypatch):
+    running, overlap = [0], [0]
+    lock = threading.Lock()
+    fetch = nodes._fetch_df
+
+    def slow_fetch(*args):
+        with lock:
+            running[0] += 1
+            overlap[0] = max(overlap[0], running[0])
+        try:
+            time.sleep(0.1)
+            return fetch(*args)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(nodes, "_fetch_df", slow_fetch)
+    values = ask(agent, conn, QUESTION_SETS["parallel"]["questions"][0])
+
+    assert overlap[0] == 2
+    canvases = [m for m in values["messages"] if isinstance(m, CanvasMessage)]
+    assert len(canvases) == 2
+    assert canvases[0].sql_data.sql_params[0].default.startswith("2025-01")
+    assert canvases[1].sql_data.sql_params[0].default.startswith("2025-02")
+    assert all(c.content["columns"] for c in canvases)
+
+def test_a_failing_query_is_reported_by_its_position(conn):
+    # Stop after the executor; with errors the router would send the plan
+    # back to the scripted SQL agent, which answers the same way every time.
+    agent = workflow.compile(checkpointer=MemorySaver(serde=build_serializer()), interrupt_after=["executor_tool"])
+    question = {
+        "question": "Trips and a broken query",
+        "queries": [
+            {"sql_query": "SELECT count(*) AS trips FROM trips", "sql_params": []},
+            {"sql_query": "SELECT CAST('vendor ' || vendor_id AS INTEGER) AS vendor FROM trips", "sql_params": []},
+        ],
+        "plan": ["sql_agent", "executor_tool", "analyst_agent", "synthesizer_node"],
+    }
+    values = ask(agent, conn, question)
+    assert values["errors"].startswith("Query 2:")
+    assert "Conversion Error" in values["errors"]
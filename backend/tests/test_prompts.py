@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any
+import duckdb
+import pytest
+from langchain_core.messages import SystemMessage
+from langgraph.checkpoint.memory import MemorySaver
+from agent_benchmark import QUESTION_SETS, Script, ScriptedChatModel, run_question
+from ai_agent.agent import RECURSION_LIMIT, build_serializer, workflow
+from ai_agent.utils import nodes
+from ai_agent.utils.schemas import ExecutionPlan, GeneratedQueries
+from ai_agent.utils.timing import ollama_timing
+
+class RecordingChatModel(ScriptedChatModel):
+    """Scripted model that keeps the messages of every call."""
+
+    calls: Any
+
+    async def _agenerate(self, messages, *args, **kwargs):
+        self.calls.append(messages)
+        return await super()._agenerate(messages, *args, **kwargs)
+
+    async def _astream(self, messages, *args, **kwargs):
+        self.calls.append(messages)
+        async for chunk in super()._astream(messages, *args, **kwargs):
+            yield chunk
+
+@pytest.fixture
+def model(monkeypatch):
+    model = RecordingChatModel(script=Script(), calls=[], prompt_eval_rate=1e6, eval_rate=1e6)
+    monkeypatch.setattr(nodes, "router_llm", model.with_structured_output(ExecutionPlan))
+    monkeypatch.setattr(nodes, "sql_generator_llm", model.with_structured_output(GeneratedQueries))
+    monkeypatch.setattr(nodes, "analyst_llm", model)
+    monkeypatch.setattr(nodes, "synthesizer_llm", model)
+    return model
+
+def test_every_node_and_turn_shares_the_system_prefix(model):
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE trips AS SELECT range AS trip_id, range % 3 + 1 AS vendor_id, 10.0 AS fare, TIMESTAMP '2025-01-01' AS pickup_at FROM range(50)")
+    schema = conn.execute("DESCRIBE;").df().to_string()
+    agent = workflow.compile(checkpointer=MemorySaver(serde=build_serializer())).with_config({"recursion_limit": RECURSION_LIMIT})
+
+    async def chat():
+        for question in QUESTION_SETS["follow_up"]["questions"][:2]:
+            model.script.load(question)
+            await run_question(agent, conn, schema, "t", question)
+
+    asyncio.run(chat())
+    conn.close()
+    calls = model.calls
+
+    # Planner, SQL agent, analyst and synthesizer, on both turns.
+    assert len(calls) == 8
+    prefixes = {messages[0].content for messages in calls}
+    assert all(isinstance(messages[0], SystemMessage) for messages in calls)
+    assert len(prefixes) == 1
+    assert schema in prefixes.pop()
+    # The question only appears after the shared prefix.
+    assert all("split that by vendor" not in messages[0].content for messages in calls)
+
+def test_ollama_timing_is_reported_in_milliseconds():
+    timing = ollama_timing({
+        "prompt_eval_duration": 250_000_000, "prompt_eval_count": 12,
+        "eval_duration": 2_000_000_000, "eval_count": 80, "total_duration": 2_300_000_000,
+    })
+    assert timing == {
+        "load_ms": 0, "prompt_eval_ms": 250.0, "prompt_eval_count": 12,
+        "eval_ms": 2000.0, "eval_count": 80, "total_ms": 2300.0,
+    }
@@ -0,0 +1,56 @@
+import duckdb
+import pytest
+from ai_agent.utils import query_log as query_log_module
+from ai_agent.utils.query_log import QueryLog, fingerprint, normalize_sql
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE fares AS SELECT range AS id, range * 1.5 AS amount FROM range(100)")
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def log(tmp_path):
+    log = QueryLog(root=str(tmp_path))
+    yield log
+    log.close()
+
+def test_queries_differing_only_in_literals_share_a_fingerprint():
+    first = "SELECT * FROM fares WHERE id = 1 AND name = 'a'  -- first run"
+    second = "select *\n  from fares where id = 42 and name = 'it''s';"
+    assert normalize_sql(first) == "select * from fares where id = ? and name = ?"
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint("SELECT * FROM fares WHERE id IN (1, 2, 3)") == fingerprint("SELECT * FROM fares WHERE id IN (4)")
+    assert fingerprint("SELECT id FROM fares") != fingerprint("SELECT amount FROM fares")
+
+def test_only_queries_over_the_threshold_are_profiled(conn, log, monkeypatch):
+    monkeypatch.setattr(query_log_module, "SLOW_QUERY_MS", 500)
+    sql = "SELECT sum(amount) FROM fares WHERE id > 10"
+    log.record(conn, "p", "sql", sql, {}, 0.499, 1)
+    log.flush()
+    assert log.top("p") == []
+
+    log.record(conn, "p", "sql", sql, {}, 0.5, 1)
+    log.record(conn, "p", "sql", sql.replace("10", "20"), {}, 0.7, 1)
+    log.flush()
+    [entry] = log.top("p")
+    assert (entry["fingerprint"], entry["count"], entry["max_ms"]) == (fingerprint(sql), 2, 700.0)
+    assert entry["has_profile"] and "profile" not in entry
+    assert log.get("p", fingerprint(sql))["profile"]["operators"]
+
+def test_profiles_are_read_back_after_a_restart(conn, log, tmp_path, monkeypatch):
+    monkeypatch.setattr(query_log_module, "SLOW_QUERY_MS", 500)
+    sql = "SELECT count(*) FROM fares"
+    log.record(conn, "my project", "sql", sql, {}, 0.6, 1)
+    log.flush()
+    assert (tmp_path / "my_project" / "slow_queries" / f"{fingerprint(sql)}.json").exists()
+
+    restarted = QueryLog(root=str(tmp_path))
+    try:
+        assert restarted.get("my project", fingerprint(sql))["profile"] is not None
+        restarted.record(None, "my project", "sql", sql, {}, 0.8, 1)
+        restarted.flush()
+        assert restarted.top("my project")[0]["count"] == 2
+    finally:
+        restarted.close()
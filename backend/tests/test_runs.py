@@ -0,0 +1,64 @@
+import asyncio
+from ai_agent import runs
+from ai_agent.runs import cancel_run, finish_run, start_run
+
+async def events(log: list, name: str, cleanup: float = 0.0):
+    try:
+        for i in range(1000):
+            log.append(f"{name} {i}")
+            yield {"event": "step", "data": i}
+            await asyncio.sleep(0.01)
+    finally:
+        # A node still finishing its checkpoint write after being cancelled.
+        log.append(f"{name} stopping")
+        await asyncio.shield(asyncio.sleep(cleanup))
+        log.append(f"{name} stopped")
+
+def test_new_run_starts_after_the_previous_one_has_stopped():
+    async def scenario():
+        log = []
+        first = await start_run("t", events(log, "first", cleanup=0.05))
+        assert await first.next_event() == {"event": "step", "data": 0}
+
+        second = await start_run("t", events(log, "second"))
+        assert first.cancelled and first.done
+        assert await second.next_event() == {"event": "step", "data": 0}
+        finish_run(second)
+        return log
+
+    log = asyncio.run(scenario())
+    # Nothing from the second run until the first has finished stopping.
+    assert log.index("first stopped") < log.index("second 0")
+
+def test_start_run_gives_up_waiting_after_the_timeout(monkeypatch):
+    monkeypatch.setattr(runs, "RUN_CANCEL_TIMEOUT", 0.05)
+
+    async def scenario():
+        log = []
+        first = await start_run("t", events(log, "first", cleanup=1))
+        await first.next_event()
+        second = await start_run("t", events(log, "second"))
+        assert not first.done
+        await second.next_event()
+        finish_run(second)
+        await first.wait()
+        return log
+
+    log = asyncio.run(scenario())
+    assert log.index("second 0") < log.index("first stopped")
+
+def test_cancel_run_stops_the_active_run():
+    async def scenario():
+        log = []
+        run = await start_run("t", events(log, "run"))
+        await run.next_event()
+        assert cancel_run("t")
+        # Events already queued may still arrive, but the stream ends.
+        async for _ in run.events():
+            pass
+        assert run.cancelled and run.done
+        assert not cancel_run("t")
+        finish_run(run)
+        assert not cancel_run("t")
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import duckdb
+import pytest
+from ai_agent.utils.sampling import SAMPLE_CATALOG
+from ai_agent.utils.sql_repair import load_schema_names, repair_sql
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.execute('CREATE TABLE trips ("Pickup Borough" VARCHAR, "Fare Amount" DOUBLE, id INTEGER)')
+    conn.execute("INSERT INTO trips VALUES ('Queens', 12.5, 1), ('Bronx', 8.0, 2)")
+    yield conn
+    conn.close()
+
+def test_valid_query_is_unchanged(conn):
+    sql, error, fixes = repair_sql(conn, "SELECT id FROM trips", {})
+    assert (sql, error, fixes) == ("SELECT id FROM trips", None, [])
+
+def test_quotes_unquoted_multi_word_columns(conn):
+    sql, error, fixes = repair_sql(conn, "SELECT Pickup Borough, sum(Fare Amount) FROM trips GROUP BY Pickup Borough", {})
+    assert error is None
+    assert sql == 'SELECT "Pickup Borough", sum("Fare Amount") FROM trips GROUP BY "Pickup Borough"'
+    assert fixes
+
+def test_quotes_qualified_multi_word_columns(conn):
+    sql, error, _ = repair_sql(conn, "SELECT t.Pickup Borough FROM trips t WHERE t.id = 1", {})
+    assert error is None
+    assert sql == 'SELECT t."Pickup Borough" FROM trips t WHERE t.id = 1'
+
+def test_fixes_alias_qualified_column_name(conn):
+    sql, error, _ = repair_sql(conn, "SELECT t.Fare_Amount FROM trips t WHERE t.id = 2", {})
+    assert error is None
+    assert sql == 'SELECT t."Fare Amount" FROM trips t WHERE t.id = 2'
+
+def test_fixes_table_qualified_column_name(conn):
+    sql, error, _ = repair_sql(conn, "SELECT trips.pickup_borough FROM trips", {})
+    assert error is None
+    assert sql == 'SELECT trips."Pickup Borough" FROM trips'
+
+def test_leaves_string_literals_alone(conn):
+    sql, error, _ = repair_sql(conn, "SELECT Pickup Borough FROM trips WHERE 'Pickup Borough' <> ''", {})
+    assert error is None
+    assert sql == """SELECT "Pickup Borough" FROM trips WHERE 'Pickup Borough' <> ''"""
+
+def test_reports_unfixable_errors(conn):
+    sql, error, _ = repair_sql(conn, "SELECT t.nothing_like_it FROM trips t", {})
+    assert error is not None
+    assert sql == "SELECT t.nothing_like_it FROM trips t"
+
+def test_sample_catalog_is_not_a_repair_candidate(conn):
+    conn.execute(f"ATTACH ':memory:' AS {SAMPLE_CATALOG}")
+    conn.execute(f"CREATE TABLE {SAMPLE_CATALOG}.main._versions (table_name VARCHAR, version VARCHAR)")
+    tables, columns = load_schema_names(conn)
+    assert tables == ["trips"]
+    assert columns == ["Pickup Borough", "Fare Amount", "id"]
@@ -0,0 +1,46 @@
+import json
+import time
+import sse
+from sse import HEARTBEAT, TextCoalescer, idle_frame, idle_timeout
+
+def text_of(frame: str) -> str:
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    payload = json.loads(frame[len("data: "):])
+    assert payload["type"] == "text"
+    return payload["data"]
+
+def test_chunks_are_sent_together_once_the_buffer_is_full():
+    coalescer = TextCoalescer(window_ms=10_000, max_bytes=8)
+    assert coalescer.add("abc") is False
+    assert coalescer.add("def") is False
+    assert coalescer.add("gh") is True
+    assert text_of(coalescer.flush()) == "abcdefgh"
+    assert coalescer.flush() is None
+    assert coalescer.time_left() is None
+
+def test_chunks_are_due_once_the_window_has_passed():
+    coalescer = TextCoalescer(window_ms=20, max_bytes=10_000)
+    assert coalescer.add("a") is False
+    assert 0 < coalescer.time_left() <= 0.02
+    time.sleep(0.03)
+    assert coalescer.time_left() == 0
+    assert coalescer.add("b") is True
+
+def test_zero_window_sends_every_chunk():
+    coalescer = TextCoalescer(window_ms=0, max_bytes=10_000)
+    assert coalescer.add("a") is True
+
+def test_idle_stream_flushes_due_text_before_a_heartbeat(monkeypatch):
+    monkeypatch.setattr(sse, "SSE_HEARTBEAT_SECONDS", 0.05)
+    coalescer = TextCoalescer(window_ms=20, max_bytes=10_000)
+    last_sent = time.monotonic()
+    assert 0.04 < idle_timeout(coalescer, last_sent) <= 0.05
+    assert idle_frame(coalescer, last_sent) is None
+
+    coalescer.add("partial")
+    # Buffered text is due before the heartbeat.
+    assert idle_timeout(coalescer, last_sent) <= 0.02
+    time.sleep(0.06)
+    assert text_of(idle_frame(coalescer, last_sent)) == "partial"
+    assert idle_frame(coalescer, last_sent) == HEARTBEAT
+    assert idle_frame(coalescer, time.monotonic()) is None
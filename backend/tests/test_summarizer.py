@@ -0,0 +1,31 @@
+import pandas as pd
+from ai_agent.utils.summarizer import MAX_COLUMNS, MAX_VALUE_LEN, SAMPLE_ROWS, TOP_K, summarize_results
+
+def test_digest_size_does_not_grow_with_rows():
+    def frame(rows):
+        return pd.DataFrame({
+            "borough": [f"borough {i % 7}" for i in range(rows)],
+            "fare": [i * 0.5 for i in range(rows)],
+        })
+    small, large = summarize_results(frame(1_000)), summarize_results(frame(100_000))
+    assert "Shape: 100000 rows x 2 columns" in large
+    # Only the numbers in it get longer.
+    assert len(large) < len(small) + 50
+
+def test_digest_limits_columns_categories_rows_and_values():
+    df = pd.DataFrame({f"c{i}": [f"{'v' * 100}{j % 9}" for j in range(50)] for i in range(MAX_COLUMNS + 5)})
+    digest = summarize_results(df)
+
+    assert f"(showing the first {MAX_COLUMNS} columns)" in digest
+    assert f"- c{MAX_COLUMNS - 1} " in digest and f"- c{MAX_COLUMNS} " not in digest
+    first_column = next(line for line in digest.splitlines() if line.startswith("- c0 "))
+    assert first_column.count("(") - 1 == TOP_K
+    assert "v" * (MAX_VALUE_LEN + 1) not in digest
+    assert digest.count("First rows:") == 1 and digest.count("Last rows:") == 1
+    first_rows = next(line for line in digest.splitlines() if line.startswith("First rows:"))
+    assert first_rows.count("{") == SAMPLE_ROWS
+
+def test_small_and_empty_results():
+    assert "Rows: " in summarize_results(pd.DataFrame({"n": [1, 2]}))
+    empty = summarize_results(pd.DataFrame({"n": pd.Series([], dtype="int64")}))
+    assert "No rows returned." in empty and "n (int64)" in empty
@@ -0,0 +1,37 @@
+import asyncio
+from ai_agent.utils import titles
+from ai_agent.utils.gateway import llm_gateway
+from ai_agent.utils.titles import TitleWorker, heuristic_title
+
+def test_heuristic_title_keeps_the_first_keywords():
+    assert heuristic_title("What is the average fare by borough in January?") == "Average Fare Borough January"
+
+def test_chat_is_not_blocked_by_a_title_batch(monkeypatch):
+    monkeypatch.setattr(titles, "IDLE_POLL_INTERVAL", 0.01)
+    saved = []
+
+    async def scenario():
+        worker = TitleWorker(lambda *title: saved.append(title))
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def generate(messages):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        worker._generate = generate
+        worker.start()
+        worker.submit("t1", "Revenue by borough")
+        await asyncio.wait_for(started.wait(), 1)
+
+        # The chat gets the model right away and the title call is cancelled.
+        async with llm_gateway.slot():
+            assert cancelled.is_set()
+            assert llm_gateway.background == set()
+        await worker.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert saved == []
@@ -0,0 +1,55 @@
+from langchain_core.messages import AIMessage
+from ai_agent.utils.messages import CanvasMessage
+from ai_agent.utils.schemas import GeneratedQuery
+from ai_agent.utils.tracing import RunTracer, aggregate_traces
+
+def start(run_id: str, node: str) -> dict:
+    return {"event": "on_chain_start", "name": node, "run_id": run_id, "metadata": {"langgraph_node": node}}
+
+def end(run_id: str, node: str, output=None) -> dict:
+    return {"event": "on_chain_end", "name": node, "run_id": run_id, "metadata": {"langgraph_node": node}, "data": {"output": output}}
+
+def model_end(node: str, prompt: int, completion: int, eval_ns: int) -> dict:
+    output = AIMessage(
+        content="...",
+        usage_metadata={"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion},
+        response_metadata={"eval_count": completion, "eval_duration": eval_ns},
+    )
+    return {"event": "on_chat_model_end", "run_id": "llm", "metadata": {"langgraph_node": node}, "data": {"output": output}}
+
+def test_spans_record_tokens_throughput_rows_and_retries():
+    tracer = RunTracer("t")
+    tracer.observe(start("1", "sql_agent"))
+    tracer.observe(model_end("sql_agent", 900, 40, 2_000_000_000))
+    tracer.observe(end("1", "sql_agent"))
+    # A second attempt at the same node is a retry.
+    tracer.observe(start("2", "sql_agent"))
+    tracer.observe(end("2", "sql_agent"))
+    canvas = CanvasMessage(content={"columns": ["n"], "rows": [[1], [2], [3]]}, sql_data=GeneratedQuery(sql_query="SELECT n", sql_params=[]))
+    tracer.observe(start("3", "executor_tool"))
+    tracer.observe(end("3", "executor_tool", {"messages": [canvas]}))
+    # Events of untraced nodes and subchains are ignored.
+    tracer.observe(start("4", "memory"))
+    tracer.observe(end("4", "memory"))
+
+    trace = tracer.finish()
+    assert [(s["node"], s["attempt"]) for s in trace["spans"]] == [("sql_agent", 1), ("sql_agent", 2), ("executor_tool", 1)]
+    first = trace["spans"][0]
+    assert (first["prompt_tokens"], first["completion_tokens"], first["tokens_per_sec"]) == (900, 40, 20.0)
+    assert trace["spans"][2]["rows"] == 3
+    assert trace["retries"] == {"sql_agent": 1}
+    assert (trace["prompt_tokens"], trace["completion_tokens"]) == (900, 40)
+    assert all(s["wall_ms"] >= 0 for s in trace["spans"])
+
+def test_aggregate_reports_percentiles_per_node():
+    traces = [
+        {"total_ms": ms, "retries": {}, "spans": [{"node": "planner", "wall_ms": ms, "tokens_per_sec": None}]}
+        for ms in range(1, 101)
+    ]
+    traces[0]["retries"] = {"planner": 2}
+    stats = aggregate_traces(traces)
+    assert stats["runs"] == 100
+    assert stats["total_ms"] == {"p50": 50, "p90": 90, "p99": 99, "count": 100}
+    assert stats["nodes"]["planner"]["wall_ms"]["p90"] == 90
+    assert stats["nodes"]["planner"]["tokens_per_sec"] == {}
+    assert stats["nodes"]["planner"]["retries"] == 2
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from canvas_cache import fetch_chart_results
+from ai_agent.utils.metrics import CACHE_LOOKUPS
+from ai_agent.utils.query_log import record_query
+from ai_agent.utils.sampling import SAMPLE_CATALOG, table_versions
+
+logger = logging.getLogger(__name__)
+
+# Set to 0 to skip warming the restored project at startup.
+WARMUP_ENABLED = os.getenv("DATANEXUS_WARMUP", "1") != "0"
+TABLE_PREVIEW_ROWS = 100
+
+_schema_lock = threading.Lock()
+_schema_cache: dict[tuple, str] = {}
+
+def schema_context(conn, project: str) -> str:
+    """DESCRIBE output given to the agent, rebuilt only when a table changes."""
+    cursor = conn.cursor()
+    try:
+        key = (project, tuple(sorted(table_versions(cursor).items())))
+        with _schema_lock:
+            schema = _schema_cache.get(key)
+        if schema is not None:
+            CACHE_LOOKUPS.labels("schema", "hit").inc()
+            return schema
+        CACHE_LOOKUPS.labels("schema", "miss").inc()
+        schema_df = cursor.execute("DESCRIBE;").df()
+    finally:
+        cursor.close()
+    schema = schema_df[schema_df["database"] != SAMPLE_CATALOG].to_string()
+    with _schema_lock:
+        _schema_cache.clear()
+        _schema_cache[key] = schema
+    return schema
+
+class WarmUpProgress:
+    """State of the startup warm-up, reported by the readiness endpoint."""
+
+    def __init__(self):
+        self.state = "disabled" if not WARMUP_ENABLED else "idle"
+        self.project = None
+        self.total = 0
+        self.done = 0
+        self.current = None
+        self.failed: list[str] = []
+        self.started = None
+        self.elapsed_ms = None
+
+    def as_dict(self) -> dict:
+        elapsed = self.elapsed_ms
+        if elapsed is None and self.started is not None:
+            elapsed = (time.perf_counter() - self.started) * 1000
+        return {
+            "state": self.state,
+            "project": self.project,
+            "steps_total": self.total,
+            "steps_done": self.done,
+            "current": self.current,
+            "failed": self.failed,
+            "elapsed_ms": round(elapsed) if elapsed is not None else None,
+        }
+
+warmup_progress = WarmUpProgress()
+
+def _list_tables(conn) -> list[str]:
+    cursor = conn.cursor()
+    try:
+        return sorted(table_versions(cursor))
+    finally:
+        cursor.close()
+
+def _run(conn, project: str, sql: str, params: dict | None = None):
+    """Runs a query and drops its rows; reading them pulls the tables' pages
+    into DuckDB's buffer pool, so the real request is served from memory."""
+    cursor = conn.cursor()
+    try:
+        with record_query(conn, project, "warmup", sql, params) as recorded:
+            recorded.rows = len(cursor.execute(sql, params or {}).fetchall())
+    finally:
+        cursor.close()
+
+def _profile_table(conn, project: str, table_name: str):
+    # The table viewer's first page and row count.
+    _run(conn, project, f"SELECT * FROM {table_name} LIMIT {TABLE_PREVIEW_ROWS} OFFSET 0;")
+    _run(conn, project, f"SELECT COUNT(*) from {table_name};")
+
+async def warm_up_project(conn, project: str, widget_queries: list[tuple[str, str, dict]]):
+    """Prefetches the agent's schema context, then, in order, the dashboard's
+    widget results in layout order (top widgets first) into the canvas cache
+    that /execute-chart-sql serves from, and each table's first page and row
+    count so their data is in DuckDB's buffer pool. Runs in the background;
+    the app is ready meanwhile.
+    `widget_queries` holds (title, sql, params) per widget."""
+    progress = warmup_progress
+    progress.state = "running"
+    progress.project = project
+    progress.done = 0
+    progress.failed = []
+    progress.started = time.perf_counter()
+    progress.elapsed_ms = None
+    logger.info("warm_up_project: starting | project=%s widgets=%s", project, len(widget_queries))
+
+    try:
+        tables = await asyncio.to_thread(_list_tables, conn)
+        steps = [("schema", lambda: schema_context(conn, project))]
+        steps += [(f"widget:{title}", lambda sql=sql, params=params: fetch_chart_results(conn, project, sql, params, source="warmup"))
+                  for title, sql, params in widget_queries]
+        steps += [(f"table:{table}", lambda table=table: _profile_table(conn, project, table)) for table in tables]
+        progress.total = len(steps)
+
+        for name, step in steps:
+            progress.current = name
+            try:
+                await asyncio.to_thread(step)
+            except Exception:
+                logger.exception("warm_up_project: step failed | step=%s", name)
+                progress.failed.append(name)
+            progress.done += 1
+        progress.state = "done"
+    except asyncio.CancelledError:
+        progress.state = "cancelled"
+        raise
+    except Exception:
+        logger.exception("warm_up_project: failed | project=%s", project)
+        progress.state = "failed"
+    finally:
+        progress.current = None
+        progress.elapsed_ms = (time.perf_counter() - progress.started) * 1000
+        logger.info(
+            "warm_up_project: %s | steps=%s/%s failed=%s elapsed_ms=%.0f",
+            progress.state, progress.done, progress.total, len(progress.failed), progress.elapsed_ms,
+        )
@@ -1,9 +1,13 @@
-import { X, LayoutDashboard, Table2, Rows } from "lucide-react";
+import { useState } from "react";
+import { X, LayoutDashboard, Table2, Rows, Loader2 } from "lucide-react";
 import VirtualDataTable from "./VirtualDataTable";
 
 export interface CanvasData {
   rows: Record<string, unknown>[];
   columns: string[];
+  // Set for history canvases fetched page by page from the server.
+  hasMore?: boolean;
+  onLoadMore?: () => Promise<void>;
 }
 
 interface AICanvasProps {
@@ -13,6 +17,15 @@ interface AICanvasProps {
 }
 
 export default function AICanvas({ data, onClose, onAddToDashboard }: AICanvasProps) {
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const loadMore = async () => {
+    if (!data.onLoadMore) return;
+    setLoadingMore(true);
+    try { await data.onLoadMore(); }
+    finally { setLoadingMore(false); }
+  };
+
   return (
     <div className="flex-1 flex flex-col h-full overflow-hidden bg-white fade-up">
       {/* Header */}
@@ -26,13 +39,23 @@ export default function AICanvas({ data, onClose, onAddToDashboard }: AICanvasPr
             <div className="flex items-center gap-2 mt-0.5">
               <Rows className="w-3 h-3 text-on-surface-variant" />
               <p className="text-xs text-on-surface-variant">
-                {data.rows.length.toLocaleString()} rows · {data.columns.length} columns
+                {data.rows.length.toLocaleString()}{data.hasMore ? "+" : ""} rows · {data.columns.length} columns
               </p>
             </div>
           </div>
         </div>
 
         <div className="flex items-center gap-2">
+          {data.hasMore && data.onLoadMore && (
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="flex items-center gap-2 px-3 py-2 rounded-lg text-xs font-semibold text-primary hover:bg-primary/8 transition-colors disabled:opacity-60"
+            >
+              {loadingMore && <Loader2 className="w-3.5 h-3.5 animate-spin" />}
+              Load more rows
+            </button>
+          )}
           <button
             onClick={onAddToDashboard}
             className="flex items-center gap-2 px-4 py-2 rounded-lg bg-primary text-white text-xs font-semibold hover:bg-primary/90 transition-colors shadow-sm"
@@ -1,7 +1,7 @@
 import { useState, useEffect, useRef, useCallback } from "react";
 import {
   X, Plus, ChevronLeft, Send, Loader2, MessageSquare,
-  Sparkles, Database, Table2, ChevronDown, ChevronUp, Pencil, Trash2,
+  Sparkles, Database, Table2, ChevronDown, ChevronUp, Pencil, Trash2, Square, Zap,
 } from "lucide-react";
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
@@ -27,6 +27,9 @@ interface Message {
   sql_query?: string;
   sql_params?: any[];
   canvas_data?: Record<string, unknown>;
+  // Set while a canvas shows a preview computed from table samples.
+  approximate?: boolean;
+  sample_percent?: number | null;
   isStreaming?: boolean;
 }
 
@@ -38,6 +41,22 @@ interface AIChatPanelProps {
 
 type PanelView = "threads" | "chat";
 
+// First page of a history canvas, fetched when the canvas scrolls into view.
+interface CanvasPage {
+  rows: Record<string, unknown>[];
+  columns: string[];
+  hasMore: boolean;
+}
+
+const CANVAS_PAGE_SIZE = 500;
+
+interface HistoryEntry {
+  role: "user" | "assistant" | "canvas";
+  content?: string;
+  sql_query?: string;
+  sql_params?: any[];
+}
+
 function formatThreadDate(thread: Thread) {
   const dateValue = thread.last_message_at ?? thread.created_at;
   if (!dateValue) return "No activity yet";
@@ -61,16 +80,20 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
 
   const [panelView, setPanelView] = useState<PanelView>("threads");
   const [threads, setThreads] = useState<Thread[]>([]);
+  const [threadsBefore, setThreadsBefore] = useState<string | null>(null);
   const [activeThreadId, setActiveThreadId] = useState<string | null>(null);
   const [panelWidth, setPanelWidth] = useState(380);
   const [isResizingPanel, setIsResizingPanel] = useState(false);
   const [messages, setMessages] = useState<Message[]>([]);
   const [inputValue, setInputValue] = useState("");
   const [isStreaming, setIsStreaming] = useState(false);
+  const [fastMode, setFastMode] = useState(false);
   const [statusText, setStatusText] = useState<string | null>(null);
   const [loadingThreads, setLoadingThreads] = useState(false);
   const [loadingMessages, setLoadingMessages] = useState(false);
+  const [historyBefore, setHistoryBefore] = useState<number | null>(null);
   const [loadingCanvas, setLoadingCanvas] = useState<Record<string, boolean>>({});
+  const [canvasPages, setCanvasPages] = useState<Record<string, CanvasPage>>({});
   const [threadActionLoading, setThreadActionLoading] = useState<Record<string, boolean>>({});
   const [renameTarget, setRenameTarget] = useState<Thread | null>(null);
   const [deleteTarget, setDeleteTarget] = useState<Thread | null>(null);
@@ -79,9 +102,18 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
   const messagesEndRef = useRef<HTMLDivElement | null>(null);
   const statusTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const inputRef = useRef<HTMLTextAreaElement | null>(null);
+  const streamAbortRef = useRef<AbortController | null>(null);
+  const canvasRequestsRef = useRef<Record<string, Promise<CanvasPage>>>({});
 
   useEffect(() => { if (isOpen) loadThreads(); }, [isOpen]);
 
+  // Closing the panel or unmounting drops the stream; the backend cancels the run on disconnect.
+  useEffect(() => {
+    if (!isOpen) streamAbortRef.current?.abort();
+  }, [isOpen]);
+
+  useEffect(() => () => streamAbortRef.current?.abort(), []);
+
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages, statusText]);
@@ -113,46 +145,78 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
     };
   }, [isResizingPanel]);
 
+  const fetchThreads = async (before: string | null) => {
+    const res = await api.get<{ sessions: Thread[]; before: string | null }>(
+      "/get-chat-sessions",
+      { params: before === null ? {} : { before } }
+    );
+    setThreadsBefore(res.data.before);
+    return Array.isArray(res.data.sessions) ? res.data.sessions : [];
+  };
+
   const loadThreads = async () => {
     setLoadingThreads(true);
     try {
-      const res = await api.get<Thread[]>("/get-chat-sessions");
-      setThreads(Array.isArray(res.data) ? res.data : []);
-    } catch { setThreads([]); }
+      setThreads(await fetchThreads(null));
+    } catch { setThreads([]); setThreadsBefore(null); }
     finally { setLoadingThreads(false); }
   };
 
+  const loadOlderThreads = async () => {
+    if (threadsBefore === null) return;
+    try {
+      const older = await fetchThreads(threadsBefore);
+      setThreads((prev) => [...prev, ...older.filter((t) => !prev.some((p) => p.id === t.id))]);
+    } catch { /* silent */ }
+  };
+
+  const fetchHistory = async (threadId: string, before: number | null) => {
+    const msgRes = await api.get<{ messages: HistoryEntry[]; before: number | null }>(
+      `/get-chat-messages/${threadId}`,
+      { params: before === null ? {} : { before } }
+    );
+    const entries = msgRes.data.messages.map((m, i) => {
+      let parsedParams = m.sql_params;
+      if (Array.isArray(m.sql_params)) {
+         parsedParams = m.sql_params.map(p => typeof p === "string" ? JSON.parse(p) : p);
+      }
+      return {
+        id: `hist-${before ?? "latest"}-${i}`,
+        role: m.role,
+        content: m.content || "",
+        sql_query: m.sql_query,
+        sql_params: parsedParams,
+      };
+    });
+    setHistoryBefore(msgRes.data.before);
+    return entries;
+  };
+
   const openThread = async (thread: Thread) => {
     setActiveThreadId(thread.id);
     setPanelView("chat");
     setLoadingMessages(true);
     setMessages([]);
+    setHistoryBefore(null);
+    // History message ids repeat between threads.
+    setCanvasPages({});
+    canvasRequestsRef.current = {};
 
-    // Fetch messages (from LangGraph)
+    // Fetch the most recent page of messages (from LangGraph)
     try {
-      const msgRes = await api.get<{ role: "user" | "assistant" | "canvas"; content?: string; sql_query?: string; sql_params?: any[] }[]>(
-        `/get-chat-messages/${thread.id}`
-      );
-
-      setMessages(
-        msgRes.data.map((m, i) => {
-          let parsedParams = m.sql_params;
-          if (Array.isArray(m.sql_params)) {
-             parsedParams = m.sql_params.map(p => typeof p === "string" ? JSON.parse(p) : p);
-          }
-          return {
-            id: `hist-${i}`,
-            role: m.role,
-            content: m.content || "",
-            sql_query: m.sql_query,
-            sql_params: parsedParams,
-          };
-        })
-      );
+      setMessages(await fetchHistory(thread.id, null));
     } catch { /* silent */ }
     finally { setLoadingMessages(false); }
   };
 
+  const loadEarlierMessages = async () => {
+    if (!activeThreadId || historyBefore === null) return;
+    try {
+      const earlier = await fetchHistory(activeThreadId, historyBefore);
+      setMessages((prev) => [...earlier, ...prev]);
+    } catch { /* silent */ }
+  };
+
   const showStatus = useCallback((text: string) => {
     setStatusText(text);
     if (statusTimerRef.current) clearTimeout(statusTimerRef.current);
@@ -168,12 +232,17 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
     ]);
 
     let accContent = "";
+    let stopped = false;
+    streamAbortRef.current?.abort();
+    const controller = new AbortController();
+    streamAbortRef.current = controller;
 
     try {
       const response = await fetch(`${API_BASE}/send-ai-message`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ thread_id: threadId, message: userMessage }),
+        body: JSON.stringify({ thread_id: threadId, message: userMessage, fast_mode: fastMode }),
+        signal: controller.signal,
       });
 
       if (!response.body) throw new Error("No body");
@@ -201,6 +270,8 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
               );
             } else if (ev.type === "status") {
               showStatus(ev.data);
+            } else if (ev.type === "queue") {
+              showStatus(`Waiting for the model (position ${ev.data.position} in queue)...`);
             } else if (ev.type === "canvas_table") {
               // Surface canvas to parent immediately; we also add to messages
               const payload = ev.data;
@@ -211,10 +282,23 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
                 (rows.length > 0 ? Object.keys(rows[0]) : []);
               onCanvasData({ rows, columns });
 
-              setMessages((prev) => [
-                ...prev,
-                { id: `live-${Date.now()}`, role: "canvas", sql_query: payload.sql_query, sql_params: payload.sql_params, canvas_data: { rows, columns } },
-              ]);
+              // A preview canvas is replaced in place when its full results arrive.
+              const canvas: Message = {
+                id: payload.canvas_id ?? `live-${Date.now()}`,
+                role: "canvas",
+                sql_query: payload.sql_query,
+                sql_params: payload.sql_params,
+                canvas_data: { rows, columns },
+                approximate: payload.approximate,
+                sample_percent: payload.sample_percent,
+              };
+              setMessages((prev) =>
+                prev.some((m) => m.id === canvas.id)
+                  ? prev.map((m) => m.id === canvas.id ? canvas : m)
+                  : [...prev, canvas]
+              );
+            } else if (ev.type === "cancelled") {
+              stopped = true;
             } else if (ev.type === "chat_name_update") {
               setThreads((prev) =>
                 prev.map((t) => t.id === threadId ? { ...t, name: ev.data } : t)
@@ -224,12 +308,14 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
         }
       }
     } catch (err) {
-      console.error("Stream error:", err);
+      if (controller.signal.aborted) stopped = true;
+      else console.error("Stream error:", err);
     } finally {
+      if (streamAbortRef.current === controller) streamAbortRef.current = null;
       setMessages((prev) =>
         prev.map((m) =>
           m.id === streamId
-            ? { ...m, content: accContent || "Sorry, something went wrong.", isStreaming: false }
+            ? { ...m, content: accContent || (stopped ? "Generation stopped." : "Sorry, something went wrong."), isStreaming: false }
             : m
         )
       );
@@ -271,7 +357,18 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
     if (e.key === "Enter" && !e.shiftKey) { e.preventDefault(); handleSend(); }
   };
 
+  const stopStreaming = async () => {
+    if (!activeThreadId) return;
+    try {
+      await api.post(`/cancel-ai-run/${activeThreadId}`);
+    } catch {
+      // No run left on the server; drop the local stream anyway.
+      streamAbortRef.current?.abort();
+    }
+  };
+
   const backToThreads = () => {
+    streamAbortRef.current?.abort();
     setPanelView("threads");
     setActiveThreadId(null);
     setMessages([]);
@@ -345,23 +442,67 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
     }
 
     if (msg.sql_query) {
-      setLoadingCanvas(prev => ({ ...prev, [msg.id]: true }));
+      const cached = canvasPages[msg.id];
+      if (cached) {
+        showCanvasPage(msg, cached);
+        return;
+      }
       try {
-        const res = await api.post<{ results: Record<string, unknown>[] }>(`/execute-canvas-query`, {
-          sql_query: msg.sql_query,
-          sql_params: msg.sql_params || []
-        });
-        const rows = res.data.results || [];
-        const columns = rows.length > 0 ? Object.keys(rows[0]) : [];
-        onCanvasData({ rows, columns });
+        showCanvasPage(msg, await loadFirstCanvasPage(msg));
       } catch (err) {
         console.error("Failed to execute canvas query:", err);
-      } finally {
-        setLoadingCanvas(prev => ({ ...prev, [msg.id]: false }));
       }
     }
   };
 
+  const fetchCanvasPage = async (msg: Message, offset: number): Promise<CanvasPage> => {
+    const res = await api.post<{ results: Record<string, unknown>[]; columns: string[]; has_more: boolean }>(`/execute-canvas-query`, {
+      sql_query: msg.sql_query,
+      sql_params: msg.sql_params || [],
+      offset,
+      limit: CANVAS_PAGE_SIZE,
+    });
+    return { rows: res.data.results || [], columns: res.data.columns || [], hasMore: res.data.has_more };
+  };
+
+  // History canvases load their first page when scrolled into view, so opening one is instant.
+  const loadFirstCanvasPage = (msg: Message): Promise<CanvasPage> => {
+    const pending = canvasRequestsRef.current[msg.id];
+    if (pending) return pending;
+    setLoadingCanvas(prev => ({ ...prev, [msg.id]: true }));
+    const request = fetchCanvasPage(msg, 0)
+      .then((page) => {
+        setCanvasPages(prev => ({ ...prev, [msg.id]: page }));
+        return page;
+      })
+      .catch((err) => {
+        delete canvasRequestsRef.current[msg.id];
+        throw err;
+      })
+      .finally(() => setLoadingCanvas(prev => ({ ...prev, [msg.id]: false })));
+    canvasRequestsRef.current[msg.id] = request;
+    return request;
+  };
+
+  const prefetchCanvas = (msg: Message) => {
+    if (msg.canvas_data || !msg.sql_query || canvasPages[msg.id]) return;
+    loadFirstCanvasPage(msg).catch((err) => console.error("Failed to prefetch canvas:", err));
+  };
+
+  const showCanvasPage = (msg: Message, page: CanvasPage) => {
+    onCanvasData({
+      rows: page.rows,
+      columns: page.columns,
+      hasMore: page.hasMore,
+      onLoadMore: async () => {
+        const next = await fetchCanvasPage(msg, page.rows.length);
+        const merged = { rows: [...page.rows, ...next.rows], columns: page.columns, hasMore: next.hasMore };
+        setCanvasPages(prev => ({ ...prev, [msg.id]: merged }));
+        showCanvasPage(msg, merged);
+      },
+    });
+  };
+
   if (!isOpen) return null;
 
   const activeThread = threads.find((t) => t.id === activeThreadId);
@@ -453,6 +594,8 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
         <ThreadList
           threads={threads}
           loading={loadingThreads}
+          hasOlder={threadsBefore !== null}
+          onLoadOlder={loadOlderThreads}
           onOpen={openThread}
           onRename={openRenameView}
           onDelete={openDeleteView}
@@ -466,13 +609,20 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
           isStreaming={isStreaming}
           statusText={statusText}
           loadingCanvas={loadingCanvas}
+          canvasPages={canvasPages}
           inputValue={inputValue}
+          fastMode={fastMode}
           inputRef={inputRef}
           messagesEndRef={messagesEndRef}
+          hasEarlier={historyBefore !== null}
+          onLoadEarlier={loadEarlierMessages}
           onInputChange={setInputValue}
+          onToggleFastMode={() => setFastMode((v) => !v)}
           onKeyDown={handleKeyDown}
           onSend={handleSend}
+          onStop={stopStreaming}
           onViewSnapshot={viewSnapshot}
+          onCanvasVisible={prefetchCanvas}
         />
       )}
 
@@ -538,10 +688,12 @@ export default function AIChatPanel({ isOpen, onClose, onCanvasData }: AIChatPan
 // ─── Thread list ───────────────────────────────────────────────────────────────
 
 function ThreadList({
-  threads, loading, onOpen, onRename, onDelete, actionLoading, onNewChat,
+  threads, loading, hasOlder, onLoadOlder, onOpen, onRename, onDelete, actionLoading, onNewChat,
 }: {
   threads: Thread[];
   loading: boolean;
+  hasOlder: boolean;
+  onLoadOlder: () => void;
   onOpen: (t: Thread) => void;
   onRename: (t: Thread) => void;
   onDelete: (t: Thread) => void;
@@ -613,6 +765,14 @@ function ThreadList({
           </div>
         </button>
       ))}
+      {hasOlder && (
+        <button
+          onClick={onLoadOlder}
+          className="self-center mt-1 px-3 py-1.5 rounded-full text-[11px] font-medium text-primary hover:bg-primary/8 transition-colors"
+        >
+          Load older chats
+        </button>
+      )}
     </div>
   );
 }
@@ -620,22 +780,29 @@ function ThreadList({
 // ─── Chat view ─────────────────────────────────────────────────────────────────
 
 function ChatView({
-  messages, loading, isStreaming, statusText, loadingCanvas,
-  inputValue, inputRef, messagesEndRef,
-  onInputChange, onKeyDown, onSend, onViewSnapshot,
+  messages, loading, isStreaming, statusText, loadingCanvas, canvasPages,
+  inputValue, fastMode, inputRef, messagesEndRef, hasEarlier,
+  onLoadEarlier, onInputChange, onToggleFastMode, onKeyDown, onSend, onStop, onViewSnapshot, onCanvasVisible,
 }: {
   messages: Message[];
   loading: boolean;
   isStreaming: boolean;
   statusText: string | null;
   loadingCanvas: Record<string, boolean>;
+  canvasPages: Record<string, CanvasPage>;
   inputValue: string;
+  fastMode: boolean;
   inputRef: React.RefObject<HTMLTextAreaElement | null>;
   messagesEndRef: React.RefObject<HTMLDivElement | null>;
+  hasEarlier: boolean;
+  onLoadEarlier: () => void;
   onInputChange: (v: string) => void;
+  onToggleFastMode: () => void;
   onKeyDown: (e: React.KeyboardEvent<HTMLTextAreaElement>) => void;
   onSend: () => void;
+  onStop: () => void;
   onViewSnapshot: (msg: Message) => void;
+  onCanvasVisible: (msg: Message) => void;
 }) {
   return (
     <>
@@ -653,7 +820,26 @@ function ChatView({
             <p className="text-xs text-on-surface-variant">Ask questions about your data, generate SQL, or explore trends.</p>
           </div>
         ) : (
-          messages.map((msg) => <MessageBubble key={msg.id} message={msg} loadingCanvas={loadingCanvas[msg.id]} onViewCanvas={() => onViewSnapshot(msg)} />)
+          <>
+            {hasEarlier && (
+              <button
+                onClick={onLoadEarlier}
+                className="self-center px-3 py-1.5 rounded-full text-[11px] font-medium text-primary hover:bg-primary/8 transition-colors"
+              >
+                Load earlier messages
+              </button>
+            )}
+            {messages.map((msg) => (
+              <MessageBubble
+                key={msg.id}
+                message={msg}
+                loadingCanvas={loadingCanvas[msg.id]}
+                canvasPage={canvasPages[msg.id]}
+                onViewCanvas={() => onViewSnapshot(msg)}
+                onCanvasVisible={() => onCanvasVisible(msg)}
+              />
+            ))}
+          </>
         )}
 
         {statusText && (
@@ -683,11 +869,20 @@ function ChatView({
             style={{ minHeight: "22px", maxHeight: "128px" }}
           />
           <button
-            onClick={onSend}
-            disabled={!inputValue.trim() || isStreaming}
+            onClick={onToggleFastMode}
+            disabled={isStreaming}
+            title={fastMode ? "Fast mode on: answer from a sample preview of large tables" : "Fast mode off: answer from full query results"}
+            className={`w-8 h-8 rounded-lg flex items-center justify-center transition-all shrink-0 disabled:opacity-40 ${fastMode ? "bg-primary/15 text-primary" : "text-on-surface-variant hover:text-primary hover:bg-primary/8"}`}
+          >
+            <Zap className={`w-3.5 h-3.5 ${fastMode ? "fill-current" : ""}`} />
+          </button>
+          <button
+            onClick={isStreaming ? onStop : onSend}
+            disabled={!isStreaming && !inputValue.trim()}
+            title={isStreaming ? "Stop generating" : "Send"}
             className="w-8 h-8 rounded-lg bg-primary text-white flex items-center justify-center hover:bg-primary/90 disabled:opacity-40 disabled:cursor-not-allowed transition-all shrink-0 shadow-sm"
           >
-            {isStreaming ? <Loader2 className="w-3.5 h-3.5 animate-spin" /> : <Send className="w-3.5 h-3.5" />}
+            {isStreaming ? <Square className="w-3 h-3 fill-current" /> : <Send className="w-3.5 h-3.5" />}
           </button>
         </div>
         <p className="text-[10px] text-on-surface-variant/50 mt-1.5 text-center">
@@ -700,8 +895,29 @@ function ChatView({
 
 // ─── Message bubble ────────────────────────────────────────────────────────────
 
-function MessageBubble({ message, loadingCanvas, onViewCanvas }: { message: Message; loadingCanvas?: boolean; onViewCanvas?: () => void }) {
+function MessageBubble({ message, loadingCanvas, canvasPage, onViewCanvas, onCanvasVisible }: {
+  message: Message;
+  loadingCanvas?: boolean;
+  canvasPage?: CanvasPage;
+  onViewCanvas?: () => void;
+  onCanvasVisible?: () => void;
+}) {
   const [sqlExpanded, setSqlExpanded] = useState(false);
+  const bubbleRef = useRef<HTMLDivElement | null>(null);
+  const needsFetch = message.role === "canvas" && !message.canvas_data && !canvasPage;
+
+  useEffect(() => {
+    const el = bubbleRef.current;
+    if (!needsFetch || !el || !onCanvasVisible) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) {
+        observer.disconnect();
+        onCanvasVisible();
+      }
+    });
+    observer.observe(el);
+    return () => observer.disconnect();
+  }, [needsFetch]);
 
   const displayContent = message.content ? message.content.replace(/```sql[\s\S]*?```/gi, "").trim() : "";
   const sqlCode = message.content ? message.content.match(/```sql\n?([\s\S]*?)```/i)?.[1]?.trim() : message.sql_query;
@@ -717,7 +933,7 @@ function MessageBubble({ message, loadingCanvas, onViewCanvas }: { message: Mess
   }
 
   if (message.role === "canvas") {
-    const payload = message.canvas_data;
+    const payload = message.canvas_data ?? (canvasPage ? { rows: canvasPage.rows, columns: canvasPage.columns } : undefined);
     let rowsCount = 0;
     let colsCount = 0;
 
@@ -728,7 +944,7 @@ function MessageBubble({ message, loadingCanvas, onViewCanvas }: { message: Mess
     }
 
     return (
-      <div className="flex flex-col gap-1.5 fade-up" style={{ animationDuration: "0.25s" }}>
+      <div ref={bubbleRef} className="flex flex-col gap-1.5 fade-up" style={{ animationDuration: "0.25s" }}>
         <div className="max-w-[95%] rounded-2xl rounded-tl-sm bg-surface-container border border-outline-variant px-3 py-3">
           <div className="flex items-center gap-1.5 mb-3 px-1">
             <div className="w-5 h-5 rounded-full bg-primary/10 flex items-center justify-center">
@@ -747,7 +963,10 @@ function MessageBubble({ message, loadingCanvas, onViewCanvas }: { message: Mess
                <div className="min-w-0">
                  <span className="block truncate">Query Results</span>
                  {payload ? (
-                   <span className="block text-[10px] text-on-surface-variant font-normal mt-0.5">{rowsCount.toLocaleString()} rows · {colsCount} columns</span>
+                   <span className="block text-[10px] text-on-surface-variant font-normal mt-0.5">
+                     {rowsCount.toLocaleString()}{canvasPage?.hasMore ? "+" : ""} rows · {colsCount} columns
+                     {message.approximate && ` · Preview from a ${message.sample_percent ?? 1}% sample`}
+                   </span>
                  ) : (
                    <span className="block text-[10px] text-on-surface-variant font-normal mt-0.5 truncate max-w-[200px]">{message.sql_query}</span>
                  )}